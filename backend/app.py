@@ -1,18 +1,29 @@
 from fastapi import FastAPI, HTTPException, Request
-from stocks import INDIA_STOCKS, US_STOCKS, is_valid_stock
-from fundamentals import get_fundamentals
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from stocks import symbol_registry, is_valid_stock, get_full_symbol
+from fundamentals import fundamentals_cache, get_fundamentals_async, statements_from_result
+from statement_store import STATEMENTS
+from fundamentals_warmer import FUNDAMENTALS_WARMER, fundamentals_warmer
+from fundamentals_screener import fundamentals_screener
 from fastapi.middleware.cors import CORSMiddleware
 from routers.option_strategies import router as strategy_router
 from routers.users import router as user_router
-import asyncio
-from concurrent.futures import Executor, ThreadPoolExecutor
 from routers.live_signal import router as signals_router
 from database import test_db_connection
 import logging
 import time
-from collections import defaultdict
+from functools import lru_cache
+from typing import Optional
 
 from news_analysis import AdvancedStockAnalyzer
+from price_store import INTERVALS
+from models.analysis import BatchAnalyzeRequest
+from metrics import metrics
+from concurrency import AdmissionRejected, admission_stats, endpoint_limits, run_blocking
+from starlette.concurrency import iterate_in_threadpool
+from data_providers import get_data_provider
+from rate_limiting import rate_limiter
+from serialization import EncodedCache, FastJSONResponse, analysis_json, cached_json_response, dumps, encode_body, with_fields
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -20,10 +31,8 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Stock Sage API", version="1.0.0")
 
-# Rate limiting storage (in production, use Redis)
-request_counts = defaultdict(list)
-RATE_LIMIT_REQUESTS = 1000  # requests per window (increased)
-RATE_LIMIT_WINDOW = 3600   # 1 hour in seconds
+# Largest watchlist accepted by /analyze/batch
+MAX_BATCH_SYMBOLS = 50
 
 @app.on_event("startup")
 async def startup_event():
@@ -32,14 +41,22 @@ async def startup_event():
     db_connected = await test_db_connection()
     if not db_connected:
         logger.warning("⚠️ Database connection failed, but continuing startup...")
+    if FUNDAMENTALS_WARMER:
+        fundamentals_warmer.start()
     logger.info("✅ Stock Sage API started successfully")
 
-# Initialize the analyzer (singleton pattern)
-analyzer = AdvancedStockAnalyzer()
+@app.on_event("shutdown")
+async def shutdown_event():
+    await get_data_provider().aclose()
 
-# Thread pool for async operations
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Endpoint at capacity: tell the client when to come back instead of queueing it"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after)})
 
-executor = ThreadPoolExecutor(max_workers=10)
+# Initialize the analyzer (singleton pattern)
+analyzer = AdvancedStockAnalyzer()
 
 # CORS configuration for production
 import os
@@ -56,14 +73,6 @@ origins = [
 
 # Remove API key requirement
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
 @app.middleware("http")
 async def add_security_headers(request, call_next):
     response = await call_next(request)
@@ -71,59 +80,73 @@ async def add_security_headers(request, call_next):
     response.headers["Cross-Origin-Embedder-Policy"] = "unsafe-none"  # Changed from require-corp
     return response
 
-# Rate limiting middleware
+# Per-client rate limits (rate_limiting.py); rejected requests get a 429 with Retry-After
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
-    client_ip = request.client.host
-    current_time = time.time()
-    
-    # Clean old requests
-    request_counts[client_ip] = [
-        req_time for req_time in request_counts[client_ip] 
-        if current_time - req_time < RATE_LIMIT_WINDOW
-    ]
-    
-    # Check rate limit
-    if len(request_counts[client_ip]) >= RATE_LIMIT_REQUESTS:
-        raise HTTPException(status_code=429, detail="Rate limit exceeded")
-    
-    # Add current request
-    request_counts[client_ip].append(current_time)
-    
+    client_ip = request.client.host if request.client else "unknown"
+    decision = await rate_limiter.check(client_ip, request.url.path)
+    if not decision.allowed:
+        return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"}, headers=decision.headers())
+
     response = await call_next(request)
+    response.headers.update(decision.headers())
     return response
 
-# No authentication required - public API
+# Request count and latency per route, exposed on /metrics
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.inc("http_requests_total", method=request.method, route=route, status=response.status_code)
+    metrics.observe("http_request_seconds", time.perf_counter() - start, route=route)
+    return response
 
-def get_full_symbol(symbol: str) -> str:
-    """Normalize symbol to include .NS if Indian"""
-    symbol = symbol.upper()
-    if symbol in INDIA_STOCKS:
-        return symbol
-    elif (symbol + ".NS") in INDIA_STOCKS:
-        return symbol + ".NS"
-    else:
-        return symbol  # fallback for US stocks or unknown
+# Added last so it is the outermost middleware: responses made by the ones above
+# (429s from the rate limiter) carry the CORS headers too, and browsers can read them
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=origins,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["Retry-After", "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset"],
+)
+
+# No authentication required - public API
 
 def get_top_stocks(market: str) -> list:
     """Get top stocks for a given market"""
-    if market.lower() == "india":
-        return INDIA_STOCKS
-    elif market.lower() == "us":
-        return US_STOCKS
-    else:
-        return []
+    return symbol_registry.symbols(market)
+
+# Cache-Control per cacheable endpoint; every one also sends an ETag and answers If-None-Match with 304
+STOCKS_CACHE_CONTROL = "public, max-age=3600"  # The universe only changes with data/symbols.csv
+API_STATUS_CACHE_CONTROL = "no-cache"  # Always revalidate, unchanged stats cost a 304
+
+@lru_cache(maxsize=64)
+def stock_list_body(market: Optional[str], sector: Optional[str], registry_size: int):
+    """Encoded /stocks body; registry_size keys out entries if symbols are added at runtime"""
+    return encode_body({"stocks": symbol_registry.symbols(market, sector)})
 
 @app.get("/stocks")
-def get_stocks():
-    """Get combined list of US and India stock symbols with normalized symbols"""
-    # Get all stocks (both US and India)
-    all_stocks = get_top_stocks("us") + get_top_stocks("india")
-    
-    # Normalize all symbols using get_full_symbol
-    normalized_stocks = [get_full_symbol(symbol) for symbol in all_stocks]
-    
-    return {"stocks": normalized_stocks}
+def get_stocks(request: Request, market: str = None, sector: str = None):
+    """Get listed US and India stock symbols, optionally filtered by market and/or sector"""
+    encoded = stock_list_body(market, sector, len(symbol_registry))
+    return cached_json_response(request, encoded.body, STOCKS_CACHE_CONTROL, encoded.etag)
+
+@app.get("/stocks/{symbol}")
+def get_stock_info(symbol: str):
+    """Market, exchange and sector metadata of a symbol or alias"""
+    info = symbol_registry.get(symbol)
+    if info is None:
+        raise HTTPException(status_code=404, detail=f"Unknown symbol {symbol}")
+    return {
+        "symbol": info.symbol,
+        "name": info.name,
+        "market": info.market,
+        "exchange": info.exchange,
+        "sector": info.sector
+    }
 
 # # Utility: Normalize symbol to include .NS if Indian
 # def get_full_symbol(symbol: str) -> str:
@@ -166,127 +189,170 @@ def get_stocks():
 #     }
 
 @app.get("/analyze/{symbol}")
-async def analyze_stock(symbol: str):
+async def analyze_stock(symbol: str, timings: bool = False, interval: str = "1d"):
     """
     Main endpoint - All calculations handled in backend
     Frontend can pick whatever data it needs from the response
+    Pass ?timings=true to get the per-stage latency breakdown
+    Pass ?interval=5m|15m|1h for technicals on intraday bars (default 1d)
     """
     try:
         # Validate symbol
         full_symbol = get_full_symbol(symbol)
         
         if not is_valid_stock(full_symbol):
-            raise HTTPException(status_code=400, detail="Not a top 50 stock")
+            raise HTTPException(status_code=400, detail="Unsupported symbol")
+        if interval not in INTERVALS:
+            raise HTTPException(status_code=400, detail=f"Unsupported interval, use one of: {', '.join(INTERVALS)}")
         
-        # Run comprehensive analysis in thread pool
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            executor, analyzer.get_comprehensive_signal, full_symbol
-        )
+        # Network I/O is awaited, blocking work runs on the shared pool
+        async with endpoint_limits["analyze"].slot():
+            result = await analyzer.get_comprehensive_signal_async(full_symbol, None, interval)
         
         if result.error:
             raise HTTPException(status_code=500, detail=result.error)
         
-        # Return ALL calculated data - frontend picks what it needs
-        return {
-            # Basic Info
-            "symbol": result.symbol,
-            "price": result.price,
-            "timestamp": "2025-07-31T12:00:00Z",  # Add current timestamp if needed
-            
-            # Main Signal & Confidence (Backend calculated)
-            "signal": result.signal,  # STRONG_BUY, BUY, HOLD, SELL, STRONG_SELL
-            "confidence": result.confidence,  # 0-100 numerical value
-            "confidence_text": f"{result.confidence:.1f}%",  # Formatted for display
-            
-            # Technical Analysis (All calculations done in backend)
-            "technical_analysis": {
-                "rsi": result.technical_signals.rsi,
-                "rsi_signal": "OVERSOLD" if result.technical_signals.rsi < 30 else "OVERBOUGHT" if result.technical_signals.rsi > 70 else "NEUTRAL",
-                "macd": result.technical_signals.macd,
-                "macd_signal": result.technical_signals.macd_signal,
-                "macd_trend": "BULLISH" if result.technical_signals.macd > result.technical_signals.macd_signal else "BEARISH",
-                "bollinger_position": result.technical_signals.bb_position,
-                "bollinger_signal": "OVERSOLD" if result.technical_signals.bb_position < 0.2 else "OVERBOUGHT" if result.technical_signals.bb_position > 0.8 else "NEUTRAL",
-                "volume_ratio": result.technical_signals.volume_ratio,
-                "volume_signal": "HIGH" if result.technical_signals.volume_ratio > 1.5 else "LOW" if result.technical_signals.volume_ratio < 0.7 else "NORMAL",
-                "volatility": result.technical_signals.volatility,
-                "volatility_percent": f"{result.technical_signals.volatility * 100:.1f}%",
-                "price_momentum": result.technical_signals.price_momentum,
-                "momentum_signal": "POSITIVE" if result.technical_signals.price_momentum > 2 else "NEGATIVE" if result.technical_signals.price_momentum < -2 else "NEUTRAL",
-                "support_level": result.technical_signals.support_level,
-                "resistance_level": result.technical_signals.resistance_level,
-                "technical_score": result.technical_score  # -100 to +100
-            },
-            
-            # Sentiment Analysis (All calculations done in backend)
-            "sentiment_analysis": {
-                "sentiment_score": result.sentiment_score,  # -100 to +100
-                "sentiment_signal": "POSITIVE" if result.sentiment_score > 20 else "NEGATIVE" if result.sentiment_score < -20 else "NEUTRAL",
-                "news_count": len(result.headlines),
-                "headlines": result.headlines,
-                "detailed_analysis": result.analysis  # Individual headline sentiments
-            },
-            
-            # Risk Assessment (All calculations done in backend)
-            "risk_analysis": {
-                "risk_score": result.risk_score,  # 0-100 (higher = riskier)
-                "risk_level": "HIGH" if result.risk_score > 70 else "MEDIUM" if result.risk_score > 40 else "LOW",
-                "position_size": result.position_size,
-                "entry_price": result.entry_price,
-                "stop_loss": result.stop_loss,
-                "take_profit": result.take_profit,
-                "risk_reward_ratio": round((result.take_profit - result.entry_price) / (result.entry_price - result.stop_loss), 2) if result.entry_price > result.stop_loss else 0
-            },
-            
-            # Market Context (All calculations done in backend)
-            "market_context": {
-                "volatility_regime": result.market_context.volatility_regime,  # LOW, MEDIUM, HIGH
-                "trend_direction": result.market_context.trend_direction,      # BULL, BEAR, SIDEWAYS
-                "sector_rotation": result.market_context.sector_rotation,      # GROWTH, VALUE, DEFENSIVE
-                "market_sentiment": result.market_context.market_sentiment     # FEAR, GREED, NEUTRAL
-            },
-            
-            # Performance Metrics (All calculations done in backend)
-            "backtest_performance": result.backtest_metrics,
-            
-            # Summary Scores (Pre-calculated for easy frontend use)
-            "summary": {
-                "overall_signal": result.signal,
-                "buy_probability": max(0, result.confidence) if result.signal in ["BUY", "STRONG_BUY"] else 0,
-                "sell_probability": max(0, result.confidence) if result.signal in ["SELL", "STRONG_SELL"] else 0,
-                "hold_probability": max(0, result.confidence) if result.signal == "HOLD" else 0,
-                "technical_strength": "STRONG" if abs(result.technical_score) > 50 else "MODERATE" if abs(result.technical_score) > 25 else "WEAK",
-                "sentiment_strength": "STRONG" if abs(result.sentiment_score) > 50 else "MODERATE" if abs(result.sentiment_score) > 25 else "WEAK",
-                "investment_grade": "A" if result.confidence > 80 and result.risk_score < 40 else "B" if result.confidence > 60 and result.risk_score < 60 else "C" if result.confidence > 40 else "D"
-            },
-            
-            # Quick Reference (For simple frontend displays)
-            "quick_stats": {
-            "current_price": result.price,
-            "signal_emoji": "🚀 STRONG_BUY" if result.signal == "STRONG_BUY" else "📈 BUY" if result.signal == "BUY" else "⏸️ HOLD" if result.signal == "HOLD" else "📉 SELL" if result.signal == "SELL" else "🔻 STRONG_SELL",
-            "confidence_emoji": "🎯 HIGH_CONFIDENCE" if result.confidence > 80 else "✅ MODERATE_CONFIDENCE" if result.confidence > 60 else "⚠️ LOW_CONFIDENCE" if result.confidence > 40 else "❌ WEAK_CONFIDENCE",
-            "risk_emoji": "🔴 HIGH_RISK" if result.risk_score > 70 else "🟡 MEDIUM_RISK" if result.risk_score > 40 else "🟢 LOW_RISK",
-            "trend_emoji": "📈 BULLISH" if result.market_context.trend_direction == "BULL" else "📉 BEARISH" if result.market_context.trend_direction == "BEAR" else "➡️ NEUTRAL"
-            }
-        }
-            
-
+        # Labels were derived when the result was built; the body is encoded once, straight to bytes
+        body = analysis_json(result)
+        if timings:
+            body = with_fields(body, timings=result.timings)
+        return FastJSONResponse(body)
         
-    except HTTPException:
+    except (HTTPException, AdmissionRejected):
         raise
     except Exception as e:
         print(f"❌ Error analyzing {symbol}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+class SlotStreamingResponse(StreamingResponse):
+    """StreamingResponse that calls on_close however sending ends: finished, failed or client gone"""
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+@app.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalyzeRequest):
+    """
+    Analyze a watchlist in one round trip.
+    Symbols share one index fetch per market, one RSS snapshot and batched sentiment calls.
+    """
+    symbols = list(dict.fromkeys(get_full_symbol(s.strip()) for s in request.symbols if s.strip()))
+    
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No symbols provided")
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SYMBOLS} symbols per batch")
+    
+    invalid = [s for s in symbols if not is_valid_stock(s)]
+    valid = [s for s in symbols if is_valid_stock(s)]
+    
+    def batch_entry(result) -> bytes:
+        if result.error:
+            return dumps({"symbol": result.symbol, "error": result.error})
+        return analysis_json(result)
+    
+    limiter = endpoint_limits["batch"]
+    await limiter.acquire()  # Rejected with 503 before any work starts
+    
+    if request.stream:
+        def stream_results():
+            for symbol in invalid:
+                yield dumps({"symbol": symbol, "error": "Unsupported symbol"}) + b"\n"
+            for result in analyzer.iter_batch_signals(valid):
+                yield batch_entry(result) + b"\n"
+        
+        release = limiter.releaser()
+        
+        async def stream_in_slot():
+            # The slot is held until the last line is sent (or the client goes away)
+            try:
+                async for line in iterate_in_threadpool(stream_results()):
+                    yield line
+            finally:
+                release()
+        
+        # Each line is produced in Starlette's threadpool, so the event loop stays free.
+        # The response releases the slot too: a client gone before the body starts never runs the generator
+        return SlotStreamingResponse(stream_in_slot(), release, media_type="application/x-ndjson")
+    
+    try:
+        results = await run_blocking(analyzer.analyze_batch, valid)
+    except Exception as e:
+        print(f"❌ Error in batch analysis: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch analysis failed: {str(e)}")
+    finally:
+        limiter.release()
+    
+    # Entries are already encoded, so the body is joined rather than re-serialized
+    body = b'{"count":%d,"results":[%s],"invalid_symbols":%s}' % (
+        len(results), b",".join(batch_entry(r) for r in results), dumps(invalid))
+    return FastJSONResponse(body)
+
+# Declared before /fundamentals/{symbol} so "screen" isn't taken for a symbol
+@app.get("/fundamentals/screen")
+def fundamentals_screen(q: Optional[str] = None, market: Optional[str] = None, sector: Optional[str] = None,
+                        sort: Optional[str] = None, order: str = "desc", limit: int = 50):
+    """
+    Screen every symbol with cached fundamentals, e.g. ?q=pe<20 and roce>15&market=india
+    Answered from a precomputed columnar table; never triggers upstream requests.
+    Sorted by market_cap within a market, by roe across markets (market_cap needs market=)
+    """
+    try:
+        return fundamentals_screener.screen(q, market, sector, sort, order, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Encoded /fundamentals bodies of recently requested symbols
+fundamentals_bodies = EncodedCache(max_entries=256)
+
 @app.get("/fundamentals/{symbol}")
-def fundamentals(symbol: str):
+async def fundamentals(symbol: str, request: Request):
     full_symbol = get_full_symbol(symbol)
 
     if not is_valid_stock(full_symbol):
-        raise HTTPException(status_code=400, detail="Not a top 50 stock")
+        raise HTTPException(status_code=400, detail="Unsupported symbol")
+
+    fundamentals_warmer.record_request(full_symbol)
+    async with endpoint_limits["fundamentals"].slot():
+        result = await get_fundamentals_async(full_symbol)
+    # Encoded once per cached result; clients may keep it for as long as the cache will
+    encoded = fundamentals_bodies.get(result, full_symbol)
+    max_age = int(fundamentals_cache.expires_in(full_symbol))
+    return cached_json_response(request, encoded.body, f"public, max-age={max_age}", encoded.etag)
+
+async def symbol_statements(symbol: str):
+    full_symbol = get_full_symbol(symbol)
 
-    return get_fundamentals(full_symbol)
+    if not is_valid_stock(full_symbol):
+        raise HTTPException(status_code=400, detail="Unsupported symbol")
+
+    fundamentals_warmer.record_request(full_symbol)
+    async with endpoint_limits["fundamentals"].slot():
+        result = await get_fundamentals_async(full_symbol)
+    # Built from the result in hand (matrices reused when cached), off the event loop
+    statements = await run_blocking(statements_from_result, full_symbol, result)
+    if statements is None:
+        raise HTTPException(status_code=502, detail=result.get("error", "No fundamentals available"))
+    return statements
+
+@app.get("/fundamentals/{symbol}/statements")
+async def fundamentals_statements(symbol: str, statement: Optional[str] = None):
+    """Numeric statement matrices (line items x periods, oldest first) plus per-period ratios"""
+    if statement is not None and statement not in STATEMENTS:
+        raise HTTPException(status_code=400, detail=f"statement must be one of {', '.join(STATEMENTS)}")
+    return (await symbol_statements(symbol)).to_dict(statement)
+
+@app.get("/fundamentals/{symbol}/ratios")
+async def fundamentals_ratios(symbol: str):
+    """ROCE, ROE, margins and growth for every reported period, and the latest of each"""
+    return (await symbol_statements(symbol)).to_dict(statements=False)
 
 
 # Add strategy endpoints
@@ -320,21 +386,29 @@ async def health_check():
     }
 
 @app.get("/api-status")
-async def api_status():
+async def api_status(request: Request):
     """Check external API status without making actual requests"""
     try:
-        from fundamentals import fundamentals_cache
-        cache_size = len(fundamentals_cache)
+        cache_stats = fundamentals_cache.stats()
     except:
-        cache_size = 0
+        cache_stats = {}
     
-    return {
+    status = {
         "yahoo_finance": "Active with rate limiting",
         "news_api": "Active", 
         "alpha_vantage": "Active",
-        "cache_size": cache_size,
+        "fundamentals_cache": cache_stats,
+        "fundamentals_warmer": fundamentals_warmer.status(),
+        "admission": admission_stats(),
+        "rate_limits": rate_limiter.stats(),
         "message": "Public API - no authentication required"
     }
+    return cached_json_response(request, dumps(status), API_STATUS_CACHE_CONTROL)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint: analyzer stage timings, upstream calls, waits and HTTP latency"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 # Add live signal endpoints
 app.include_router(signals_router)
@@ -0,0 +1,176 @@
+import warnings
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Cross-sectional version of AdvancedStockAnalyzer's indicator methods: every
+# symbol's history is a row of a right-aligned (newest bar in the last column),
+# NaN-padded matrix and each indicator is one set of NumPy operations along
+# the time axis. Edge cases (short histories, flat bands, missing volume)
+# follow the per-symbol methods so the results are the same.
+
+RSI_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BB_WINDOW, BB_STD = 20, 2
+VOLATILITY_WINDOW = 30
+SR_WINDOW = 20
+MOMENTUM_WINDOW = 20
+
+
+@dataclass
+class PriceMatrix:
+    """Aligned OHLCV arrays, one row per symbol"""
+    symbols: List[str]
+    close: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    volume: np.ndarray
+    lengths: np.ndarray  # Real (unpadded) bars per row
+
+
+def build_price_matrix(histories: Dict[str, pd.DataFrame]) -> PriceMatrix:
+    """Right-align each symbol's bars so column -1 is everyone's latest bar"""
+    symbols = list(histories)
+    width = max((len(h) for h in histories.values()), default=0)
+    shape = (len(symbols), width)
+    matrix = {col: np.full(shape, np.nan) for col in ("Close", "High", "Low", "Volume")}
+    lengths = np.zeros(len(symbols), dtype=int)
+
+    for row, symbol in enumerate(symbols):
+        hist = histories[symbol]
+        n = len(hist)
+        lengths[row] = n
+        if n == 0:
+            continue
+        for col, values in matrix.items():
+            if col in hist:
+                values[row, width - n:] = hist[col].to_numpy(dtype=float)
+
+    return PriceMatrix(symbols, matrix["Close"], matrix["High"], matrix["Low"], matrix["Volume"], lengths)
+
+
+def _tail(values: np.ndarray, window: int) -> np.ndarray:
+    return values[:, -window:] if values.shape[1] >= window else values
+
+
+def _ewm(values: np.ndarray, span: int) -> np.ndarray:
+    """pandas ewm(span=span).mean() (adjust=True) for every row at once"""
+    decay = 1.0 - 2.0 / (span + 1.0)
+    numerator = np.zeros(values.shape[0])
+    denominator = np.zeros(values.shape[0])
+    out = np.empty_like(values)
+    for t in range(values.shape[1]):
+        column = values[:, t]
+        observed = ~np.isnan(column)
+        numerator = np.where(observed, np.nan_to_num(column) + decay * numerator, decay * numerator)
+        denominator = np.where(observed, 1.0 + decay * denominator, decay * denominator)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[:, t] = numerator / denominator
+    return out
+
+
+def rsi(close: np.ndarray, lengths: np.ndarray, window: int = RSI_WINDOW) -> np.ndarray:
+    delta = np.diff(close, axis=1, prepend=np.nan)
+    # delta.where(delta > 0, 0) turns the leading NaN delta into 0 as well
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+    avg_gain = _tail(gains, window).mean(axis=1)
+    avg_loss = _tail(losses, window).mean(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        value = 100 - (100 / (1 + avg_gain / avg_loss))
+    value = np.where(np.isnan(value), 50.0, value)
+    return np.where(lengths < window + 1, 50.0, value)
+
+
+def macd(close: np.ndarray, lengths: np.ndarray, fast: int = MACD_FAST, slow: int = MACD_SLOW,
+         signal: int = MACD_SIGNAL):
+    line = _ewm(close, fast) - _ewm(close, slow)
+    signal_line = _ewm(line, signal)
+    macd_last, signal_last = line[:, -1], signal_line[:, -1]
+    short = lengths < slow + signal
+    macd_last = np.where(short, 0.0, macd_last)
+    signal_last = np.where(short, 0.0, signal_last)
+    return macd_last, signal_last, macd_last - signal_last
+
+
+def bollinger(close: np.ndarray, lengths: np.ndarray, window: int = BB_WINDOW, std_dev: int = BB_STD):
+    tail = _tail(close, window)
+    mid = tail.mean(axis=1)
+    std = tail.std(axis=1, ddof=1)
+    upper, lower = mid + std * std_dev, mid - std * std_dev
+    price = close[:, -1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        position = (price - lower) / (upper - lower)
+    short = lengths < window
+    return (np.where(short, price, upper), np.where(short, price, lower),
+            np.where(short, price, mid), np.where(short, 0.5, position))
+
+
+def volume_ratio(volume: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # All-NaN recent volume
+        recent = np.nanmean(_tail(volume, 5), axis=1)
+        average = _tail(volume, 20).mean(axis=1)
+        average = np.where(lengths >= 20, average, np.nan)
+        ratio = np.where(average > 0, recent / average, 1.0)
+    return np.where(lengths < 10, 1.0, ratio)
+
+
+def volatility(close: np.ndarray, lengths: np.ndarray, window: int = VOLATILITY_WINDOW,
+               periods_per_year: int = 252) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = close[:, 1:] / close[:, :-1] - 1
+        value = _tail(returns, window).std(axis=1, ddof=1) * np.sqrt(periods_per_year)
+    value = np.where(np.isnan(value) | (lengths - 1 < window), 0.2, value)
+    return np.where(lengths < window, 0.2, value)
+
+
+def support_resistance(close: np.ndarray, high: np.ndarray, low: np.ndarray, lengths: np.ndarray,
+                       window: int = SR_WINDOW):
+    support = _tail(low, window).min(axis=1)
+    resistance = _tail(high, window).max(axis=1)
+    short = lengths < window
+    price = close[:, -1]
+    return np.where(short, price * 0.95, support), np.where(short, price * 1.05, resistance)
+
+
+def momentum(close: np.ndarray, lengths: np.ndarray, window: int = MOMENTUM_WINDOW) -> np.ndarray:
+    if close.shape[1] < window:
+        return np.zeros(close.shape[0])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        value = (close[:, -1] / close[:, -window] - 1) * 100
+    return np.where(lengths >= window, value, 0.0)
+
+
+def compute_indicators(matrix: PriceMatrix, periods_per_year: int = 252) -> Dict[str, np.ndarray]:
+    """Every TechnicalSignals field for all rows; `vectorized` is False where a row must use the per-symbol path"""
+    close, lengths = matrix.close, matrix.lengths
+    width = close.shape[1]
+
+    # Interior gaps change pandas' windowing (pct_change/dropna, NaN-aware rolling),
+    # so only contiguous rows are computed here
+    padding = np.arange(width)[None, :] < (width - lengths)[:, None]
+    contiguous = ~np.any(np.isnan(close) & ~padding, axis=1)
+
+    macd_line, macd_signal, _ = macd(close, lengths)
+    bb_upper, bb_lower, _, bb_position = bollinger(close, lengths)
+    support, resistance = support_resistance(close, matrix.high, matrix.low, lengths)
+
+    # The per-symbol code raises on a zero-width band and falls back to defaults
+    flat_band = (lengths >= BB_WINDOW) & (bb_upper == bb_lower)
+
+    return {
+        "rsi": rsi(close, lengths),
+        "macd": macd_line,
+        "macd_signal": macd_signal,
+        "bb_position": bb_position,
+        "volume_ratio": volume_ratio(matrix.volume, lengths),
+        "price_momentum": momentum(close, lengths),
+        "volatility": volatility(close, lengths, periods_per_year=periods_per_year),
+        "support_level": support,
+        "resistance_level": resistance,
+        "vectorized": contiguous & (lengths > 0),
+        "default": flat_band & contiguous,
+    }
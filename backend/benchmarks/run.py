@@ -0,0 +1,508 @@
+"""Backend performance benchmarks.
+
+Run from backend/:
+    python -m benchmarks.run                      # full suite
+    python -m benchmarks.run --quick              # smaller sizes, for a smoke check
+    python -m benchmarks.run --only indicators,options
+    python -m benchmarks.run --compare benchmarks/results/old.json
+    python -m benchmarks.run --only fundamentals_parse --pages cache/pages
+
+Everything runs offline on synthetic data; the portfolio benchmark replays a
+recording (made from synthetic data unless --recordings points at a real one),
+cross_sectional checks the vectorized TechnicalSignals against the per-symbol ones,
+and fundamentals_parse checks the lxml screener parser against the BeautifulSoup
+extractors on saved pages (--pages, a PAGE_CACHE_DIR) or synthetic ones; any
+mismatched field makes the run exit non-zero.
+"""
+import gc
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import statistics
+import tempfile
+import timeit
+import itertools
+import math
+import tracemalloc
+from dataclasses import asdict
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+from benchmarks import synthetic
+from fundamentals import read_screener_page
+from indicators import IndicatorState
+from data_providers import RecordingProvider, ReplayProvider, get_data_provider, set_data_provider
+from news_analysis import AdvancedStockAnalyzer, TechnicalSignals
+from page_cache import CachedPage, PageCache
+from portfolio_risk import CORRELATION_WINDOW, ReturnCovariance
+from price_store import PriceStore
+from routers.option_strategies import evaluate_strategy_grid
+from signal_table import SignalTable
+from stocks import symbol_registry
+from streaming import SignalStream, SimulatedQuoteSource
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+INDICATOR_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+BACKTEST_YEARS = [1, 2, 5, 10]
+CHAIN_SIZES = [20, 50, 100, 200]
+HEADLINE_COUNTS = [1_000, 10_000, 100_000]
+INCREMENTAL_SYMBOLS = 150
+INTRADAY_BARS = 21 * 78  # About a month of 5m bars
+MEMORY_SYMBOLS = 2_000
+CORRELATION_SYMBOLS = 500
+SCREENER_PAGES = 20
+
+QUICK_SIZES = {
+    "indicators": [1_000, 10_000],
+    "backtest": [1],
+    "options": [20, 50],
+    "headlines": [1_000],
+    "portfolio": 10,
+    "intraday": 20,
+    "memory": 200,
+    "correlation": 100,
+    "fundamentals_parse": 5,
+}
+
+
+def measure(fn: Callable, repeat: int = 5, max_total: float = 10.0) -> Dict:
+    """timeit-style measurement: auto-sized inner loop, best/median/mean per call"""
+    timer = timeit.Timer(fn)
+    number, total = timer.autorange()
+    per_call = total / number
+    repeat = max(1, min(repeat, int(max_total / max(total, 1e-9))))
+    timings = [t / number for t in timer.repeat(repeat=repeat, number=number)] + [per_call]
+    return {
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.mean(timings),
+        "number": number,
+        "repeat": len(timings),
+    }
+
+
+def _result(name: str, params: Dict, stats: Dict) -> Dict:
+    print(f"⏱️  {name} {params}: {stats['median_s'] * 1000:.3f} ms (min {stats['min_s'] * 1000:.3f} ms)")
+    return {"name": name, "params": params, **stats}
+
+
+# ===================== CASES =====================
+
+def bench_indicators(sizes: List[int]) -> List[Dict]:
+    analyzer = AdvancedStockAnalyzer()
+    results = []
+    for n in sizes:
+        prices = synthetic.price_series(n)
+        cases = {
+            "calculate_rsi": lambda: analyzer.calculate_rsi(prices),
+            "calculate_macd": lambda: analyzer.calculate_macd(prices),
+            "calculate_bollinger_bands": lambda: analyzer.calculate_bollinger_bands(prices),
+            "calculate_volatility": lambda: analyzer.calculate_volatility(prices),
+        }
+        for name, fn in cases.items():
+            results.append(_result(name, {"points": n}, measure(fn)))
+    return results
+
+
+def bench_incremental(symbols: int = INCREMENTAL_SYMBOLS) -> List[Dict]:
+    """One new bar (push) and one intraday revision (amend) across a whole watchlist"""
+    states = [IndicatorState.from_prices(synthetic.price_series(126, seed=f"inc-{i}")) for i in range(symbols)]
+    moves = itertools.cycle(synthetic.price_series(1_000, seed="inc-moves").pct_change().fillna(0).tolist())
+
+    def refresh(update):
+        move = 1 + next(moves)
+        for state in states:
+            getattr(state, update)(state.last_price * move)
+            state.rsi.value(), state.macd.value(), state.bollinger.value(), state.volatility.value()
+
+    return [
+        _result("indicator_state_push", {"symbols": symbols}, measure(lambda: refresh("push"))),
+        _result("indicator_state_amend", {"symbols": symbols}, measure(lambda: refresh("amend"))),
+    ]
+
+
+def _technicals_mismatches(batch: Dict[str, TechnicalSignals], loop: Dict[str, TechnicalSignals]) -> int:
+    """Fields where the vectorized and per-symbol TechnicalSignals differ beyond float rounding"""
+    mismatches = 0
+    for symbol, expected in loop.items():
+        actual = asdict(batch[symbol])
+        for name, value in asdict(expected).items():
+            if not (math.isclose(actual[name], value, rel_tol=1e-9, abs_tol=1e-12)
+                    or (math.isnan(actual[name]) and math.isnan(value))):
+                mismatches += 1
+                print(f"❌ Technicals mismatch on {symbol} [{name}]: batch={actual[name]} loop={value}")
+    return mismatches
+
+
+def bench_cross_sectional(symbols: int = INCREMENTAL_SYMBOLS) -> List[Dict]:
+    """Whole-universe TechnicalSignals: one vectorized matrix pass vs. the per-symbol loop, with a parity check"""
+    analyzer = AdvancedStockAnalyzer()
+    universe = [f"SYM{i}" for i in range(symbols)]
+    frames = {symbol: synthetic.ohlcv_frame(symbol, 126) for symbol in universe}
+
+    def per_symbol():
+        analyzer.indicator_states.clear()  # Time the full recompute, not the incremental path
+        return [analyzer.get_technical_signals(symbol) for symbol in universe]
+
+    with analyzer.prefetched(frames):
+        mismatches = _technicals_mismatches(analyzer.get_technical_signals_batch(universe),
+                                            dict(zip(universe, per_symbol())))
+        print(f"{'✅' if not mismatches else '❌'} Batch technicals parity: {symbols} symbols, {mismatches} mismatched fields")
+        return [
+            _result("get_technical_signals_batch", {"symbols": symbols},
+                    {**measure(lambda: analyzer.get_technical_signals_batch(universe)), "mismatches": mismatches}),
+            _result("get_technical_signals_loop", {"symbols": symbols},
+                    {**measure(per_symbol, repeat=3), "mismatches": mismatches}),
+        ]
+
+
+def bench_intraday(symbols: int = INCREMENTAL_SYMBOLS, interval: str = "5m", bars: int = INTRADAY_BARS) -> List[Dict]:
+    """Intraday universe: compact bar footprint, one-bar tail merge and batch technicals"""
+    workdir = tempfile.mkdtemp(prefix="bench-intraday-")
+    try:
+        analyzer = AdvancedStockAnalyzer()
+        analyzer.price_store = PriceStore(workdir)
+        store = analyzer.price_store.for_interval(interval)
+        universe = [f"SYM{i}" for i in range(symbols)]
+        for symbol in universe:
+            store.merge(symbol, synthetic.ohlcv_frame(symbol, bars, interval=interval))
+        frames = {(symbol, interval): store.read(symbol) for symbol in universe}
+
+        compact = sum(int(f.memory_usage().sum()) for f in frames.values()) / symbols
+        wide = sum(int(f.astype(float).memory_usage().sum()) for f in frames.values()) / symbols
+        print(f"🧮 {interval} bars in memory: {compact / 1024:.1f} KiB/symbol (float64 would be {wide / 1024:.1f} KiB)")
+
+        tail = store.read(universe[0]).tail(2)  # Re-merging the newest bars, as a delta refresh does
+        with analyzer.prefetched(frames):
+            batch = measure(lambda: analyzer.get_technical_signals_batch(universe, interval))
+        batch.update({"bytes_per_symbol": compact, "bytes_per_symbol_float64": wide})
+        return [
+            _result("price_store_merge_tail", {"interval": interval, "bars": bars},
+                    measure(lambda: store.merge(universe[0], tail))),
+            _result("get_technical_signals_batch", {"symbols": symbols, "interval": interval}, batch),
+        ]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def bench_streaming(symbols: int = INCREMENTAL_SYMBOLS, active: float = 0.3) -> List[Dict]:
+    """One poll of simulated quotes folded into the bar rings, re-scoring only the symbols that traded"""
+    workdir = tempfile.mkdtemp(prefix="bench-stream-")
+    try:
+        analyzer = AdvancedStockAnalyzer()
+        analyzer.price_store = PriceStore(workdir)
+        results = []
+        for i in range(symbols):
+            symbol = f"SYM{i}"
+            bars = synthetic.ohlcv_frame(symbol, 126)
+            analyzer.price_store.merge(symbol, bars)
+            inputs = {
+                "price": float(bars["Close"].iloc[-1]),
+                "technical_signals": analyzer._default_technical_signals(),
+                "headlines": [],
+                "market_context": analyzer._default_market_context(),
+                "backtest_metrics": {},
+            }
+            results.append(analyzer._build_signal_result(symbol, inputs, [], 0.0))
+
+        # Ticks a minute apart during the session after the last stored bar
+        session_open = pd.Timestamp(synthetic.SYNTHETIC_END_DATE, tz="America/New_York") + pd.Timedelta(days=3, hours=9, minutes=30)
+        source = SimulatedQuoteSource({r.symbol: r.price for r in results}, seed="bench-stream",
+                                      tick_seconds=60, active=active, start=session_open.timestamp())
+        stream = SignalStream(analyzer, source)
+        stream.seed(results)
+        return [_result("signal_stream_poll", {"symbols": symbols, "active": active}, measure(stream.poll_once))]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _synthetic_results(n: int) -> List:
+    """SignalResults shaped like a full run: own headlines plus a few market-wide feed ones"""
+    analyzer = AdvancedStockAnalyzer()
+    feed = synthetic.headlines(200, seed="market-feed")
+    backtest = ["total_return", "annual_return", "sharpe_ratio", "max_drawdown", "win_rate", "total_trades"]
+    results = []
+    for i in range(n):
+        # Fresh string objects per symbol, as separately scraped copies would be
+        titles = [h.encode().decode() for h in synthetic.headlines(3, seed=f"own-{i}") + feed[i % 50:i % 50 + 2]]
+        analysis = [{"headline": h, "label": "POSITIVE", "score": 0.8, "numerical_score": 0.8, "confidence": 0.8}
+                    for h in titles]
+        inputs = {
+            "price": 100.0 + i,
+            "technical_signals": TechnicalSignals(45.0 + i % 20, 0.5, 0.4, 0.6, 1.1, 2.0, 0.25, 95.0, 110.0),
+            "headlines": titles,
+            "market_context": analyzer._default_market_context(),
+            "backtest_metrics": {name: 0.1 * i for name in backtest},
+        }
+        results.append(analyzer._build_signal_result(f"SYM{i}", inputs, analysis, 0.1))
+    return results
+
+
+def _retained_bytes(build: Callable) -> int:
+    """Bytes still allocated once build() returns (its temporaries freed)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()  # noqa: F841 - held until measured
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(symbols: int = MEMORY_SYMBOLS) -> List[Dict]:
+    """Memory per symbol of a SignalResult list vs. a SignalTable, plus the cost of building the table"""
+    as_results = _retained_bytes(lambda: _synthetic_results(symbols)) / symbols
+    as_table = _retained_bytes(lambda: SignalTable.from_results(_synthetic_results(symbols))) / symbols
+    print(f"🧮 Retained memory: {as_results:.0f} B/symbol as SignalResult, {as_table:.0f} B/symbol in SignalTable")
+
+    results = _synthetic_results(symbols)
+    stats = measure(lambda: SignalTable.from_results(results), repeat=3)
+    stats.update({"bytes_per_symbol_results": as_results, "bytes_per_symbol_table": as_table})
+    return [_result("signal_table_from_results", {"symbols": symbols}, stats)]
+
+
+def bench_correlation(symbols: int = CORRELATION_SYMBOLS) -> List[Dict]:
+    """Universe return covariance: one new bar as a rank-1 update vs. rebuilding from the closes"""
+    closes = pd.DataFrame({f"SYM{i}": synthetic.price_series(CORRELATION_WINDOW + 1, seed=f"corr-{i}").to_numpy()
+                           for i in range(symbols)})
+    matrix = ReturnCovariance.from_closes(closes)
+    bars = itertools.cycle(closes.to_numpy() * 1.01)
+    day = itertools.count(len(closes))
+
+    return [
+        _result("covariance_push", {"symbols": symbols},
+                measure(lambda: matrix.push(next(day), next(bars)))),
+        _result("covariance_rebuild", {"symbols": symbols},
+                measure(lambda: ReturnCovariance.from_closes(closes), repeat=3)),
+        _result("basket_correlation", {"symbols": symbols},
+                measure(lambda: matrix.correlation(list(closes.columns[:5])))),
+    ]
+
+
+def _screener_pages(pages_dir: str = None, count: int = SCREENER_PAGES) -> List[CachedPage]:
+    if pages_dir:
+        pages = list(PageCache(pages_dir).stored("https://www.screener.in/company/"))
+        print(f"📄 {len(pages)} saved screener pages from {pages_dir}")
+        return pages
+    symbols = symbol_registry.symbols("india")[:count]
+    return [CachedPage(f"synthetic://{symbol}", synthetic.screener_page(symbol.split(".")[0],
+                                                                        sector=symbol_registry.sector_of(symbol)))
+            for symbol in symbols]
+
+
+def bench_fundamentals_parse(count: int = SCREENER_PAGES, pages_dir: str = None) -> List[Dict]:
+    """Screener page parse + every extraction: BeautifulSoup extractors vs. the lxml engine, with a parity check"""
+    pages = _screener_pages(pages_dir, count)
+    if not pages:
+        return []
+
+    mismatches = 0
+    for page in pages:
+        expected = read_screener_page(CachedPage(page.url, page.content), engine="bs4")
+        actual = read_screener_page(CachedPage(page.url, page.content), engine="lxml")
+        for key in expected:
+            if expected[key] != actual[key]:
+                mismatches += 1
+                print(f"❌ Parser mismatch on {page.url} [{key}]: bs4={str(expected[key])[:200]} lxml={str(actual[key])[:200]}")
+    print(f"{'✅' if not mismatches else '❌'} Parser parity: {len(pages)} pages, {mismatches} mismatched fields")
+
+    def parse_all(engine):
+        for page in pages:
+            read_screener_page(CachedPage(page.url, page.content), engine=engine)
+
+    params = {"pages": len(pages), "source": "saved" if pages_dir else "synthetic"}
+    return [
+        _result("screener_parse_bs4", params, {**measure(lambda: parse_all("bs4"), repeat=3), "mismatches": mismatches}),
+        _result("screener_parse_lxml", params, {**measure(lambda: parse_all("lxml"), repeat=3), "mismatches": mismatches}),
+    ]
+
+
+def bench_backtest(years_list: List[int]) -> List[Dict]:
+    analyzer = AdvancedStockAnalyzer()
+    results = []
+    for years in years_list:
+        days = 365 * years
+        with analyzer.prefetched({"BENCH": synthetic.ohlcv_frame("BENCH", 252 * years + 10)}):
+            fn = lambda: analyzer.backtest_strategy("BENCH", days=days)
+            results.append(_result("backtest_strategy", {"years": years}, measure(fn, repeat=3)))
+    return results
+
+
+def bench_options(chain_sizes: List[int]) -> List[Dict]:
+    spot = 100.0
+    results = []
+    for strikes in chain_sizes:
+        step = 50.0 / strikes  # denser chains around the same +/-25 range
+        calls, puts = synthetic.option_chain(spot, strikes, step)
+        valid_strikes = sorted(set(calls["strike"]) | set(puts["strike"]))
+        selected_strike = min(valid_strikes, key=lambda x: abs(x - spot))
+        price_points = [s for s in valid_strikes if selected_strike * 0.9 <= s <= selected_strike * 1.1]
+        fn = lambda: evaluate_strategy_grid(price_points, selected_strike, spot, calls, puts)
+        params = {"strikes": strikes, "price_points": len(price_points)}
+        results.append(_result("evaluate_strategy_grid", params, measure(fn, repeat=3)))
+    return results
+
+
+def bench_headlines(counts: List[int]) -> List[Dict]:
+    analyzer = AdvancedStockAnalyzer()
+    results = []
+    for n in counts:
+        items = synthetic.headlines(n)
+        fn = lambda: analyzer._filter_quality_headlines(items)
+        results.append(_result("_filter_quality_headlines", {"headlines": n}, measure(fn)))
+    return results
+
+
+def _portfolio_run(provider, store_root: str, symbols: List[str]) -> float:
+    """One analyze_portfolio pass against a fresh price store, returns wall seconds"""
+    previous = get_data_provider()
+    set_data_provider(provider)
+    try:
+        analyzer = AdvancedStockAnalyzer()
+        analyzer.min_request_interval = 0  # Nothing here talks to Yahoo
+        analyzer.price_store = PriceStore(store_root)
+        start = time.perf_counter()
+        analyzer.analyze_portfolio(symbols)
+        return time.perf_counter() - start
+    finally:
+        set_data_provider(previous)
+        shutil.rmtree(store_root, ignore_errors=True)
+
+
+def bench_portfolio(limit: int = 0, recordings: str = None, latency_ms: float = 0.0, runs: int = 3) -> List[Dict]:
+    symbols = symbol_registry.symbols("india") + symbol_registry.symbols("us")
+    if limit:
+        symbols = symbols[:limit]
+    workdir = tempfile.mkdtemp(prefix="bench-portfolio-")
+
+    try:
+        if not recordings:
+            # Record the synthetic universe once so the timed runs go through replay
+            recordings = os.path.join(workdir, "recordings")
+            print(f"📼 Recording synthetic data for {len(symbols)} symbols")
+            _portfolio_run(RecordingProvider(synthetic.SyntheticProvider(), recordings),
+                           os.path.join(workdir, "record-store"), symbols)
+
+        timings, misses = [], 0
+        for run in range(runs):
+            replay = ReplayProvider(recordings, latency_ms)
+            timings.append(_portfolio_run(replay, os.path.join(workdir, f"store-{run}"), symbols))
+            misses += replay.misses
+
+        stats = {
+            "min_s": min(timings),
+            "median_s": statistics.median(timings),
+            "mean_s": statistics.mean(timings),
+            "number": 1,
+            "repeat": runs,
+            "symbols_per_s": len(symbols) / statistics.median(timings),
+            "replay_misses": misses,
+        }
+        return [_result("analyze_portfolio", {"symbols": len(symbols), "latency_ms": latency_ms}, stats)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ===================== RESULTS =====================
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def save_results(results: List[Dict], output: str = None) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    payload = {
+        "timestamp": datetime.now().isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.platform(),
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"💾 Results saved to {output}")
+    return output
+
+
+def compare_results(baseline_path: str, results: List[Dict]):
+    """Print median-time ratios against an earlier results file (>1.0 means slower now)"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in baseline["results"]}
+
+    print(f"\n📊 Compared with {baseline_path} ({baseline.get('commit')})")
+    for r in results:
+        old = previous.get((r["name"], json.dumps(r["params"], sort_keys=True)))
+        if not old:
+            continue
+        ratio = r["median_s"] / old["median_s"] if old["median_s"] else float("inf")
+        flag = "🔺" if ratio > 1.1 else "🔻" if ratio < 0.9 else "  "
+        print(f"{flag} {r['name']} {r['params']}: {ratio:.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backend performance benchmarks")
+    parser.add_argument("--only", help="comma separated: indicators,incremental,cross_sectional,intraday,streaming,memory,correlation,fundamentals_parse,backtest,options,headlines,portfolio")
+    parser.add_argument("--quick", action="store_true", help="small sizes only")
+    parser.add_argument("--recordings", help="replay this DATA_PROVIDER_DIR instead of synthetic data")
+    parser.add_argument("--pages", help="PAGE_CACHE_DIR with saved screener pages for fundamentals_parse")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="artificial latency per replayed call")
+    parser.add_argument("--output", help="results file (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    selected = set(args.only.split(",")) if args.only else {"indicators", "incremental", "cross_sectional", "intraday", "streaming", "memory", "correlation", "fundamentals_parse", "backtest", "options", "headlines", "portfolio"}
+    quick = QUICK_SIZES if args.quick else {}
+
+    results = []
+    if "indicators" in selected:
+        results += bench_indicators(quick.get("indicators", INDICATOR_SIZES))
+    if "incremental" in selected:
+        results += bench_incremental()
+    if "cross_sectional" in selected:
+        results += bench_cross_sectional()
+    if "intraday" in selected:
+        results += bench_intraday(quick.get("intraday", INCREMENTAL_SYMBOLS))
+    if "streaming" in selected:
+        results += bench_streaming()
+    if "memory" in selected:
+        results += bench_memory(quick.get("memory", MEMORY_SYMBOLS))
+    if "correlation" in selected:
+        results += bench_correlation(quick.get("correlation", CORRELATION_SYMBOLS))
+    if "fundamentals_parse" in selected:
+        results += bench_fundamentals_parse(quick.get("fundamentals_parse", SCREENER_PAGES), args.pages)
+    if "backtest" in selected:
+        results += bench_backtest(quick.get("backtest", BACKTEST_YEARS))
+    if "options" in selected:
+        results += bench_options(quick.get("options", CHAIN_SIZES))
+    if "headlines" in selected:
+        results += bench_headlines(quick.get("headlines", HEADLINE_COUNTS))
+    if "portfolio" in selected:
+        results += bench_portfolio(quick.get("portfolio", 0), args.recordings, args.latency_ms)
+
+    save_results(results, args.output)
+    if args.compare:
+        compare_results(args.compare, results)
+    if any(result.get("mismatches") for result in results):
+        print("❌ Parity check failed: a fast path disagrees with the reference implementation (see the mismatches above)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,223 @@
+import zlib
+from json import dumps
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from data_providers import RecordedResponse
+
+# Fixed end date so every run builds byte-identical data
+SYNTHETIC_END_DATE = "2024-06-28"
+
+HEADLINE_TEMPLATES = [
+    "{name} reports quarterly profit growth ahead of estimates",
+    "{name} announces expansion plans in Europe",
+    "{name} shares decline after weak revenue guidance",
+    "{name} live NSE share price, stock price quotes and tips",
+    "{name} beats earnings expectations, raises dividend",
+    "Moneycontrol: {name} stock/share market homepage",
+    "{name} signs partnership for new product launch",
+    "Analysts see {name} outlook improving",
+]
+
+
+def _rng(key: str) -> np.random.Generator:
+    # crc32 rather than hash() so seeds survive interpreter restarts
+    return np.random.default_rng(zlib.crc32(key.encode()))
+
+
+def price_series(n: int, seed: str = "series") -> pd.Series:
+    """Geometric random walk of n daily closes"""
+    returns = _rng(seed).normal(0.0003, 0.015, n)
+    index = pd.bdate_range(end=SYNTHETIC_END_DATE, periods=n) if n <= 20000 else pd.RangeIndex(n)
+    return pd.Series(100 * np.exp(np.cumsum(returns)), index=index, name="Close")
+
+
+def _bar_index(n: int, tz: str, interval: str) -> pd.DatetimeIndex:
+    if interval == "1d":
+        return pd.bdate_range(end=SYNTHETIC_END_DATE, periods=n, tz=tz)
+    # Continuous intraday bars ending at the close; no session gaps, good enough for timing
+    freq = interval.replace("m", "min") if interval.endswith("m") else interval
+    return pd.date_range(end=f"{SYNTHETIC_END_DATE} 16:00", periods=n, freq=freq, tz=tz)
+
+
+def ohlcv_frame(symbol: str, n: int = 504, tz: str = "America/New_York", interval: str = "1d") -> pd.DataFrame:
+    """OHLCV bars shaped like yf.Ticker.history()"""
+    rng = _rng(symbol if interval == "1d" else f"{symbol}-{interval}")
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, n)))
+    spread = np.abs(rng.normal(0, 0.01, n)) * close
+    index = _bar_index(n, tz, interval)
+    return pd.DataFrame({
+        "Open": close + rng.normal(0, 0.3, n),
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(500_000, 5_000_000, n).astype(float),
+    }, index=index)
+
+
+def option_chain(spot: float, strikes: int, step: float = 1.0):
+    """Calls and puts frames with yfinance's option_chain columns"""
+    rng = _rng(f"chain-{strikes}")
+    strike = spot + (np.arange(strikes) - strikes // 2) * step
+    call_mid = np.maximum(spot - strike, 0) + rng.uniform(0.5, 3.0, strikes)
+    put_mid = np.maximum(strike - spot, 0) + rng.uniform(0.5, 3.0, strikes)
+
+    def frame(mid):
+        return pd.DataFrame({
+            "strike": strike,
+            "lastPrice": mid,
+            "bid": mid * 0.98,
+            "ask": mid * 1.02,
+        })
+
+    return frame(call_mid), frame(put_mid)
+
+
+def headlines(n: int, seed: str = "headlines") -> List[str]:
+    rng = _rng(seed)
+    names = [f"Company{i}" for i in range(max(1, n // 10))]
+    picks = rng.integers(0, len(HEADLINE_TEMPLATES), n)
+    owners = rng.integers(0, len(names), n)
+    return [HEADLINE_TEMPLATES[p].format(name=names[o]) for p, o in zip(picks, owners)]
+
+
+SCREENER_SECTIONS = [
+    ("quarters", "Quarterly Results", ["Sales", "Expenses", "Operating Profit", "OPM %", "Other Income",
+                                       "Interest", "Depreciation", "Profit before tax", "Tax %", "Net Profit", "EPS in Rs"]),
+    ("profit-loss", "Profit & Loss", ["Sales", "Expenses", "Operating Profit", "OPM %", "Other Income", "Interest",
+                                      "Depreciation", "Profit before tax", "Tax %", "Net Profit", "EPS in Rs", "Dividend Payout %"]),
+    ("balance-sheet", "Balance Sheet", ["Equity Capital", "Reserves", "Borrowings", "Other Liabilities",
+                                        "Total Liabilities", "Fixed Assets", "CWIP", "Investments", "Other Assets", "Total Assets"]),
+    ("cash-flow", "Cash Flow", ["Cash from Operating Activity", "Cash from Investing Activity",
+                                "Cash from Financing Activity", "Net Cash Flow"]),
+    ("ratios", "Ratios", ["Debtor Days", "Inventory Days", "Days Payable", "Cash Conversion Cycle",
+                          "Working Capital Days", "ROCE %"]),
+]
+
+
+def screener_page(symbol: str, name: str = None, sector: str = "Oil & Gas", years: int = 12, peers: int = 10) -> bytes:
+    """A company page laid out like screener.in's (top ratios, peers, statement sections, shareholding)"""
+    rng = _rng(f"screener-{symbol}")
+    name = name or f"{symbol.title()} Industries Ltd"
+    columns = [f"Mar {2013 + i}" for i in range(years)]
+
+    def number(low, high):
+        return f"{rng.uniform(low, high):,.2f}"
+
+    def table(labels, cols):
+        head = "".join(f"<th>{c}</th>" for c in ["", *cols])
+        rows = "".join(
+            f'<tr><td class="text">{label}&nbsp;<span class="blue-icon">+</span></td>'
+            + "".join(f"<td>{number(-500, 90_000)}</td>" for _ in cols) + "</tr>"
+            for label in labels
+        )
+        return f'<table class="data-table responsive-text-nowrap"><thead><tr>{head}</tr></thead><tbody>{rows}</tbody></table>'
+
+    ratios = [("Market Cap", f"₹ <span class=\"number\">{number(1_000, 2_000_000)}</span> Cr."),
+              ("Current Price", f"₹ <span class=\"number\">{number(10, 5_000)}</span>"),
+              ("Stock P/E", f"<span class=\"number\">{number(5, 80)}</span>"),
+              ("Book Value", f"₹ <span class=\"number\">{number(10, 2_000)}</span>"),
+              ("Dividend Yield", f"<span class=\"number\">{number(0, 5)}</span> %")]
+    if rng.random() < 0.7:  # Some pages only carry ROCE in the ratios table
+        ratios.append(("ROCE", f"<span class=\"number\">{number(1, 40)}</span> %"))
+    ratios.append(("ROE", f"<span class=\"number\">{number(1, 40)}</span> %"))
+    top_ratios = "".join(f'<li class="flex flex-space-between"><span class="name">{label}</span>'
+                         f'<span class="nowrap value">{value}</span></li>' for label, value in ratios)
+
+    peer_rows = "".join(
+        f"<tr><td>{i + 1}.</td><td><a href=\"/company/PEER{i}/\">Peer {i} Ltd</a></td>"
+        + "".join(f"<td>{number(1, 90_000)}</td>" for _ in range(8)) + "</tr>"
+        for i in range(peers)
+    )
+    peer_head = "".join(f"<th>{c}</th>" for c in ["S.No.", "Name", "CMP Rs.", "P/E", "Mar Cap Rs.Cr.", "Div Yld %",
+                                                  "NP Qtr Rs.Cr.", "Qtr Profit Var %", "Sales Qtr Rs.Cr.", "ROCE %"])
+    sections = "".join(
+        f'<section id="{section_id}" class="card card-large"><div class="flex-row"><h2>{title}</h2>'
+        f'<p class="sub">Consolidated Figures in Rs. Crores</p></div>'
+        f'<div class="responsive-holder">{table(labels, columns)}</div></section>'
+        for section_id, title, labels in SCREENER_SECTIONS
+    )
+    holders = ["Promoters", "FIIs", "DIIs", "Government", "Public"]
+    shareholding = ('<section id="shareholding" class="card card-large"><h2>Shareholding Pattern</h2>'
+                    + table(holders, [f"Q{q} {2023 + q // 4}" for q in range(1, 9)]) + "</section>")
+    script = "".join(f"<script>window.chartData{i} = {dumps(list(rng.uniform(0, 1000, 200).round(2)))};</script>"
+                     for i in range(6))
+    html = f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="UTF-8">
+<title>{name} share price | About {name} | Key Insights - Screener</title>
+<meta name="description" content="{name} · Mkt Cap and key ratios, quarterly results, shareholding">
+{script}</head>
+<body class="light flex-column">
+<nav class="u-full-width no-print"><a href="/">Screener</a><a href="/explore/">Explore</a></nav>
+<main class="flex-grow container">
+<div class="card card-large" id="top">
+  <div class="flex flex-space-between flex-gap-8"><h1 class="h2 shrink-text" style="margin: 0">{name}</h1></div>
+  <div class="company-info">
+    <div class="company-profile"><div class="about"><p>{name} operates in {sector.lower()} and related
+      businesses across India.<!-- profile --></p></div></div>
+    <div class="company-ratios"><ul id="top-ratios">{top_ratios}</ul></div>
+  </div>
+</div>
+<section id="peers" class="card card-large"><div class="flex-row"><h2>Peer comparison</h2>
+  <p class="sub">Sector: <a href="/company/compare/00000001/">{sector}</a></p></div>
+  <table class="data-table"><tr>{peer_head}</tr>{peer_rows}</table></section>
+{sections}
+{shareholding}
+</main></body></html>"""
+    return html.encode("utf-8")
+
+
+class SyntheticProvider:
+    """Deterministic offline stand-in for the live data provider, meant to be recorded"""
+    mode = "synthetic"
+    offline = True
+
+    def __init__(self, bars: int = 504):
+        self.bars = bars
+
+    def _frame(self, symbol: str, interval: str = "1d") -> pd.DataFrame:
+        tz = "Asia/Kolkata" if symbol.endswith((".NS", ".BO")) or symbol == "^NSEI" else "America/New_York"
+        return ohlcv_frame(symbol, self.bars, tz, interval)
+
+    def http_get(self, url, params=None, headers=None, timeout=10):
+        titles = headlines(3, seed=f"{url}{params}")
+        items = "".join(f"<item><title>{t}</title></item>" for t in titles)
+        if params and "apiKey" in params:
+            body = dumps({"articles": [{"title": t} for t in titles]}).encode()
+        elif params and "apikey" in params:
+            body = dumps({"feed": [{"title": t} for t in titles]}).encode()
+        else:
+            body = f"<rss><channel>{items}</channel></rss>".encode()
+        return RecordedResponse(200, body, url=url)
+
+    def http_post(self, url, json=None, headers=None, timeout=15):
+        inputs = json["inputs"] if json else ""
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        labels = ["positive", "negative", "neutral"]
+        predictions = [
+            [{"label": labels[zlib.crc32(t.encode()) % 3], "score": 0.6 + (zlib.crc32(t.encode()) % 40) / 100}]
+            for t in texts
+        ]
+        return RecordedResponse(200, dumps(predictions).encode(), url=url)
+
+    async def http_get_async(self, url, params=None, headers=None, timeout=10):
+        return self.http_get(url, params=params, headers=headers, timeout=timeout)
+
+    async def http_post_async(self, url, json=None, headers=None, timeout=15):
+        return self.http_post(url, json=json, headers=headers, timeout=timeout)
+
+    async def aclose(self):
+        pass
+
+    def history(self, symbol, session=None, **kwargs):
+        return self._frame(symbol, kwargs.get("interval", "1d"))
+
+    def news(self, symbol):
+        return [{"title": t} for t in headlines(4, seed=f"news-{symbol}")]
+
+    def download(self, symbols, **kwargs):
+        interval = kwargs.get("interval", "1d")
+        frames: Dict[str, pd.DataFrame] = {s: self._frame(s, interval).tz_localize(None) for s in symbols}
+        return pd.concat(frames, axis=1)
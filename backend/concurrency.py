@@ -0,0 +1,120 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict
+
+from metrics import metrics
+
+# Request concurrency for the async endpoints. Blocking work (yfinance, the price
+# store, screener parsing, indicator math) runs on one bounded pool shared by every
+# request instead of per-request executors, and each expensive endpoint admits a
+# fixed number of requests at a time with a short queue behind them; anything past
+# the queue, or waiting longer than ADMISSION_WAIT_SECONDS, is turned away with a
+# 503 and Retry-After instead of piling up threads.
+
+BLOCKING_POOL_WORKERS = int(os.getenv("BLOCKING_POOL_WORKERS", 32))
+ADMISSION_WAIT_SECONDS = float(os.getenv("ADMISSION_WAIT_SECONDS", 10))
+
+# Endpoint -> (requests running at once, requests allowed to wait for a slot)
+ENDPOINT_LIMITS = {
+    "analyze": (int(os.getenv("ANALYZE_MAX_CONCURRENCY", 8)), int(os.getenv("ANALYZE_MAX_QUEUE", 32))),
+    "batch": (int(os.getenv("BATCH_MAX_CONCURRENCY", 2)), int(os.getenv("BATCH_MAX_QUEUE", 4))),
+    "fundamentals": (int(os.getenv("FUNDAMENTALS_MAX_CONCURRENCY", 4)), int(os.getenv("FUNDAMENTALS_MAX_QUEUE", 16))),
+}
+
+blocking_pool = ThreadPoolExecutor(max_workers=BLOCKING_POOL_WORKERS, thread_name_prefix="blocking")
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """fn(*args, **kwargs) on blocking_pool, in a copy of the caller's context (so StageTimings still apply)"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(blocking_pool, functools.partial(context.run, fn, *args, **kwargs))
+
+
+class AdmissionRejected(Exception):
+    """An endpoint is at capacity; answered with 503 and Retry-After"""
+
+    def __init__(self, endpoint: str, reason: str, retry_after: int):
+        super().__init__(f"{endpoint} is busy ({reason}), retry in {retry_after}s")
+        self.endpoint = endpoint
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class EndpointLimiter:
+    """At most max_concurrent requests inside, at most max_queue waiting; everyone else is rejected"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, wait_timeout: float = ADMISSION_WAIT_SECONDS):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.wait_timeout = wait_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        # Only touched from the event loop thread, so no lock
+        self.active = 0
+        self.waiting = 0
+        self.counts = {"admitted": 0, "queue_full": 0, "timeout": 0}
+
+    def _reject(self, reason: str):
+        self.counts[reason] += 1
+        metrics.inc("admission_total", endpoint=self.name, outcome=reason)
+        raise AdmissionRejected(self.name, reason, max(1, int(self.wait_timeout)))
+
+    async def acquire(self):
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self._reject("queue_full")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.wait_timeout)
+        except asyncio.TimeoutError:
+            self._reject("timeout")
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.counts["admitted"] += 1
+        metrics.inc("admission_total", endpoint=self.name, outcome="admitted")
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    def releaser(self):
+        """A release() that only counts once, for a slot with several possible cleanup paths"""
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.release()
+        return release
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            **self.counts,
+        }
+
+
+endpoint_limits: Dict[str, EndpointLimiter] = {
+    name: EndpointLimiter(name, concurrent, queue) for name, (concurrent, queue) in ENDPOINT_LIMITS.items()
+}
+
+
+def admission_stats() -> Dict:
+    return {name: limiter.stats() for name, limiter in endpoint_limits.items()}
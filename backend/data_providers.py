@@ -0,0 +1,311 @@
+import os
+import json
+import time
+import asyncio
+import pickle
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+import httpx
+import pandas as pd
+import requests
+import yfinance as yf
+
+from metrics import record_upstream_call
+
+# Where the analyzer's raw market data comes from:
+#   live   - Yahoo / Google News / NewsAPI / Alpha Vantage / HuggingFace over the network
+#   record - live, and every raw response is also written to DATA_PROVIDER_DIR
+#   replay - served from DATA_PROVIDER_DIR only, no network at all
+DATA_PROVIDER_MODE = os.getenv("DATA_PROVIDER_MODE", "live").lower()
+DATA_PROVIDER_DIR = os.getenv("DATA_PROVIDER_DIR", os.path.join("cache", "recordings"))
+REPLAY_LATENCY_MS = float(os.getenv("REPLAY_LATENCY_MS", 0))  # Artificial delay per replayed call
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 50))  # Pool of the shared async HTTP client
+
+# Credentials never go into recording keys, so a replay works without them
+SECRET_PARAMS = {"apikey", "api_key", "token", "key"}
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when a call was never recorded"""
+
+
+class RecordedError(RuntimeError):
+    """A failure captured while recording, raised again on replay"""
+
+
+class RecordedResponse:
+    """Picklable stand-in for requests.Response with the parts the analyzer reads"""
+
+    def __init__(self, status_code: int, content: bytes, headers: Optional[Dict] = None, url: str = ""):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.url = url
+
+    @classmethod
+    def from_response(cls, response) -> "RecordedResponse":
+        return cls(response.status_code, response.content, dict(response.headers), str(response.url))
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+def _instrumented(kind: str, call):
+    """Run one upstream call, counting it and timing it in the metrics registry"""
+    start = time.perf_counter()
+    try:
+        result = call()
+    except Exception:
+        record_upstream_call(kind, time.perf_counter() - start, ok=False)
+        raise
+    record_upstream_call(kind, time.perf_counter() - start)
+    return result
+
+
+async def _instrumented_async(kind: str, call):
+    """_instrumented for a coroutine function"""
+    start = time.perf_counter()
+    try:
+        result = await call()
+    except Exception:
+        record_upstream_call(kind, time.perf_counter() - start, ok=False)
+        raise
+    record_upstream_call(kind, time.perf_counter() - start)
+    return result
+
+
+def recording_key(kind: str, *args, **kwargs) -> str:
+    """Stable file name for a call, ignoring credentials and transport-only arguments"""
+    params = kwargs.get("params")
+    if isinstance(params, dict):
+        kwargs["params"] = {k: v for k, v in params.items() if k.lower() not in SECRET_PARAMS}
+    for transport_arg in ("headers", "timeout", "session", "threads", "progress"):
+        kwargs.pop(transport_arg, None)
+
+    payload = json.dumps([kind, args, kwargs], sort_keys=True, default=str)
+    return f"{kind}-{hashlib.sha1(payload.encode()).hexdigest()}"
+
+
+class LiveProvider:
+    """Straight pass-through to the network"""
+    mode = "live"
+    offline = False
+
+    def __init__(self):
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    def http_get(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None, timeout: float = 10):
+        return _instrumented("get", lambda: requests.get(url, params=params, headers=headers, timeout=timeout))
+
+    def http_post(self, url: str, json: Optional[Dict] = None, headers: Optional[Dict] = None, timeout: float = 15):
+        return _instrumented("post", lambda: requests.post(url, json=json, headers=headers, timeout=timeout))
+
+    def _client(self) -> httpx.AsyncClient:
+        # One pooled client for the whole process, created on the event loop that first uses it
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                follow_redirects=True,  # Like requests
+                limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS),
+            )
+        return self._async_client
+
+    async def http_get_async(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                             timeout: float = 10) -> RecordedResponse:
+        """http_get without blocking a thread; the response has the same interface"""
+        async def call():
+            response = await self._client().get(url, params=params, headers=headers, timeout=timeout)
+            return RecordedResponse.from_response(response)
+        return await _instrumented_async("get", call)
+
+    async def http_post_async(self, url: str, json: Optional[Dict] = None, headers: Optional[Dict] = None,
+                              timeout: float = 15) -> RecordedResponse:
+        async def call():
+            response = await self._client().post(url, json=json, headers=headers, timeout=timeout)
+            return RecordedResponse.from_response(response)
+        return await _instrumented_async("post", call)
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def history(self, symbol: str, session=None, **kwargs) -> pd.DataFrame:
+        return _instrumented("history", lambda: yf.Ticker(symbol, session=session).history(**kwargs))
+
+    def news(self, symbol: str) -> List[Dict]:
+        return _instrumented("news", lambda: yf.Ticker(symbol).news or [])
+
+    def download(self, symbols: List[str], **kwargs) -> pd.DataFrame:
+        return _instrumented("download", lambda: yf.download(symbols, **kwargs))
+
+
+class RecordingProvider:
+    """Calls an inner provider and writes every raw result (or failure) to disk"""
+    mode = "record"
+    offline = False
+
+    def __init__(self, inner=None, root: str = DATA_PROVIDER_DIR):
+        self.inner = inner or LiveProvider()
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _save(self, key: str, entry: Dict):
+        path = os.path.join(self.root, key + ".pkl")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def _record(self, key: str, call, wrap=None):
+        try:
+            result = call()
+        except Exception as e:
+            self._save(key, {"error": f"{type(e).__name__}: {e}"})
+            raise
+        self._save(key, {"result": wrap(result) if wrap else result})
+        return result
+
+    async def _record_async(self, key: str, call):
+        try:
+            result = await call()
+        except Exception as e:
+            self._save(key, {"error": f"{type(e).__name__}: {e}"})
+            raise
+        self._save(key, {"result": result})
+        return result
+
+    def http_get(self, url, params=None, headers=None, timeout=10):
+        key = recording_key("get", url, params=params)
+        return self._record(key, lambda: self.inner.http_get(url, params=params, headers=headers, timeout=timeout),
+                            RecordedResponse.from_response)
+
+    def http_post(self, url, json=None, headers=None, timeout=15):
+        key = recording_key("post", url, json=json)
+        return self._record(key, lambda: self.inner.http_post(url, json=json, headers=headers, timeout=timeout),
+                            RecordedResponse.from_response)
+
+    async def http_get_async(self, url, params=None, headers=None, timeout=10):
+        # Same keys as the sync calls, so either path replays the other's recordings
+        key = recording_key("get", url, params=params)
+        return await self._record_async(key, lambda: self.inner.http_get_async(url, params=params, headers=headers,
+                                                                                 timeout=timeout))
+
+    async def http_post_async(self, url, json=None, headers=None, timeout=15):
+        key = recording_key("post", url, json=json)
+        return await self._record_async(key, lambda: self.inner.http_post_async(url, json=json, headers=headers,
+                                                                                  timeout=timeout))
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+    def history(self, symbol, session=None, **kwargs):
+        key = recording_key("history", symbol, **kwargs)
+        return self._record(key, lambda: self.inner.history(symbol, session=session, **kwargs))
+
+    def news(self, symbol):
+        return self._record(recording_key("news", symbol), lambda: self.inner.news(symbol))
+
+    def download(self, symbols, **kwargs):
+        key = recording_key("download", list(symbols), **kwargs)
+        return self._record(key, lambda: self.inner.download(symbols, **kwargs))
+
+
+class ReplayProvider:
+    """Serves recorded results with a fixed artificial latency, never touches the network"""
+    mode = "replay"
+    offline = True
+
+    def __init__(self, root: str = DATA_PROVIDER_DIR, latency_ms: float = REPLAY_LATENCY_MS):
+        self.root = root
+        self.latency_ms = latency_ms
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _replay(self, key: str):
+        return _instrumented(key.split("-", 1)[0], lambda: self._load(key))
+
+    async def _replay_async(self, key: str):
+        async def call():
+            if self.latency_ms > 0:
+                await asyncio.sleep(self.latency_ms / 1000)
+            return self._load(key, delay=False)
+        return await _instrumented_async(key.split("-", 1)[0], call)
+
+    def _load(self, key: str, delay: bool = True):
+        if delay and self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
+
+        path = os.path.join(self.root, key + ".pkl")
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            raise ReplayMissError(f"No recording for {key} in {self.root}")
+
+        with self._lock:
+            self.hits += 1
+        if "error" in entry:
+            raise RecordedError(entry["error"])
+        return entry["result"]
+
+    def http_get(self, url, params=None, headers=None, timeout=10):
+        return self._replay(recording_key("get", url, params=params))
+
+    def http_post(self, url, json=None, headers=None, timeout=15):
+        return self._replay(recording_key("post", url, json=json))
+
+    async def http_get_async(self, url, params=None, headers=None, timeout=10):
+        return await self._replay_async(recording_key("get", url, params=params))
+
+    async def http_post_async(self, url, json=None, headers=None, timeout=15):
+        return await self._replay_async(recording_key("post", url, json=json))
+
+    async def aclose(self):
+        pass
+
+    def history(self, symbol, session=None, **kwargs):
+        return self._replay(recording_key("history", symbol, **kwargs))
+
+    def news(self, symbol):
+        return self._replay(recording_key("news", symbol))
+
+    def download(self, symbols, **kwargs):
+        return self._replay(recording_key("download", list(symbols), **kwargs))
+
+
+def make_provider(mode: str = DATA_PROVIDER_MODE, root: str = DATA_PROVIDER_DIR,
+                  latency_ms: float = REPLAY_LATENCY_MS):
+    if mode == "record":
+        return RecordingProvider(LiveProvider(), root)
+    if mode == "replay":
+        return ReplayProvider(root, latency_ms)
+    return LiveProvider()
+
+
+_data_provider = make_provider()
+if _data_provider.mode != "live":
+    print(f"📡 Data provider: {_data_provider.mode} ({DATA_PROVIDER_DIR})")
+
+
+def get_data_provider():
+    return _data_provider
+
+
+def set_data_provider(provider):
+    """Swap the process-wide provider (benchmarks, offline runs)"""
+    global _data_provider
+    _data_provider = provider
+    return provider
@@ -1,41 +1,78 @@
+import os
 import yfinance as yf
 import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import re
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime, timedelta
 from functools import lru_cache
-
-# Simple in-memory cache for fundamentals data
-fundamentals_cache = {}
-CACHE_DURATION = 3600  # 1 hour in seconds
-
-# Rate limiting for Yahoo Finance requests
+from page_cache import page_cache
+from fundamentals_parser import FUNDAMENTALS_PARSER, ScreenerPage
+from result_cache import ResultCache
+from concurrency import ENDPOINT_LIMITS, run_blocking
+from statement_store import parse_number, statement_store
+
+# Fundamentals cache: memory LRU bounded in MB plus a disk copy of successful results.
+# Failed lookups (results with an "error" key) are only kept briefly so they get retried.
+CACHE_DURATION = int(os.getenv("FUNDAMENTALS_CACHE_TTL", 3600))  # 1 hour in seconds
+ERROR_CACHE_DURATION = int(os.getenv("FUNDAMENTALS_ERROR_TTL", 120))
+FUNDAMENTALS_CACHE_MAX_MB = float(os.getenv("FUNDAMENTALS_CACHE_MAX_MB", 64))
+
+def is_short_lived(result):
+    """Errors and partial results are cached briefly so the next request retries them"""
+    return isinstance(result, dict) and ("error" in result or bool(result.get("partial_data")))
+
+fundamentals_cache = ResultCache("fundamentals", ttl=CACHE_DURATION, error_ttl=ERROR_CACHE_DURATION,
+                                 max_bytes=int(FUNDAMENTALS_CACHE_MAX_MB * 1024 * 1024),
+                                 is_error=is_short_lived)
+
+# Rate limiting for Yahoo Finance requests: a token bucket refilled with one token per
+# MIN_REQUEST_INTERVAL and holding up to YAHOO_BURST, so the statement sections of one
+# symbol can be fetched together while the sustained rate stays the same
 last_yahoo_request = 0
-MIN_REQUEST_INTERVAL = 2  # Minimum 2 seconds between requests
+MIN_REQUEST_INTERVAL = 2  # Seconds per token
+YAHOO_BURST = int(os.getenv("YAHOO_BURST", 5))
+yahoo_tokens = float(YAHOO_BURST)
+yahoo_tokens_updated = time.time()
+yahoo_limiter_lock = threading.Lock()
 yahoo_failure_count = 0
 yahoo_circuit_breaker_until = 0
 
 def rate_limited_yahoo_request():
-    """Ensure minimum interval between Yahoo Finance requests"""
-    global last_yahoo_request, yahoo_circuit_breaker_until
-    current_time = time.time()
-    
-    # Check circuit breaker
-    if current_time < yahoo_circuit_breaker_until:
-        remaining = yahoo_circuit_breaker_until - current_time
-        raise Exception(f"Yahoo Finance circuit breaker active for {remaining:.0f} more seconds")
-    
-    time_since_last = current_time - last_yahoo_request
-    
-    if time_since_last < MIN_REQUEST_INTERVAL:
-        sleep_time = MIN_REQUEST_INTERVAL - time_since_last
+    """Take a token for one Yahoo Finance request, sleeping until it is available (thread-safe)"""
+    global last_yahoo_request, yahoo_tokens, yahoo_tokens_updated
+    with yahoo_limiter_lock:
+        current_time = time.time()
+
+        # Check circuit breaker
+        if current_time < yahoo_circuit_breaker_until:
+            remaining = yahoo_circuit_breaker_until - current_time
+            raise Exception(f"Yahoo Finance circuit breaker active for {remaining:.0f} more seconds")
+
+        yahoo_tokens = min(YAHOO_BURST, yahoo_tokens + (current_time - yahoo_tokens_updated) / MIN_REQUEST_INTERVAL)
+        yahoo_tokens_updated = current_time
+        # Below zero the token is reserved ahead: wait until it has been refilled
+        yahoo_tokens -= 1
+        sleep_time = -yahoo_tokens * MIN_REQUEST_INTERVAL if yahoo_tokens < 0 else 0
+
+    if sleep_time > 0:
         print(f"⏳ Rate limiting: waiting {sleep_time:.1f} seconds")
         time.sleep(sleep_time)
-    
     last_yahoo_request = time.time()
 
+def yahoo_tokens_available() -> float:
+    """Tokens in the Yahoo bucket right now (negative while requests wait for refills)"""
+    with yahoo_limiter_lock:
+        return min(YAHOO_BURST, yahoo_tokens + (time.time() - yahoo_tokens_updated) / MIN_REQUEST_INTERVAL)
+
+def release_yahoo_token():
+    """Give back a token taken for a request that was then not made"""
+    global yahoo_tokens
+    with yahoo_limiter_lock:
+        yahoo_tokens = min(YAHOO_BURST, yahoo_tokens + 1)
+
 def handle_yahoo_failure():
     """Handle Yahoo Finance API failures with circuit breaker"""
     global yahoo_failure_count, yahoo_circuit_breaker_until
@@ -141,25 +178,66 @@ def extract_shareholding_from_screener(soup):
 #         return []
 
 
-def get_company_overview_data(symbol):
+def screener_company_url(symbol):
+    return f"https://www.screener.in/company/{symbol}/consolidated/"
+
+def extract_overview_fields(soup):
+    """sector, market_cap, pe, roce, roe with the BeautifulSoup extractors"""
+    page_text = soup.get_text()
+    return {
+        "sector": extract_sector_from_page(soup, page_text),
+        "market_cap": extract_market_cap_from_page(soup, page_text),
+        "pe": extract_pe_ratio(soup, page_text),
+        "roce": extract_roce(soup, page_text),
+        "roe": extract_roe(soup, page_text),
+    }
+
+def read_screener_page(page, engine=FUNDAMENTALS_PARSER):
+    """
+    Company name, statement tables, shareholding and overview fields of a cached screener page
+    The lxml engine parses and walks the page once; engine="bs4" runs the original extractors
+    """
+    if engine == "lxml":
+        screener = ScreenerPage(page.tree)
+        return {
+            "company": screener.company(),
+            "income_statement": screener.financial_table("Profit & Loss"),
+            "balance_sheet": screener.financial_table("Balance Sheet"),
+            "cash_flow": screener.financial_table("Cash Flow"),
+            "shareholding_pattern": screener.shareholding(),
+            "overview": screener.overview(),
+        }
+
+    soup = page.soup
+    return {
+        "company": soup.find("h1").text.strip(),
+        "income_statement": parse_financial_table(soup, "Profit & Loss"),
+        "balance_sheet": parse_financial_table(soup, "Balance Sheet"),
+        "cash_flow": parse_financial_table(soup, "Cash Flow"),
+        "shareholding_pattern": extract_shareholding_from_screener(soup),
+        "overview": extract_overview_fields(soup),
+    }
+
+def get_company_overview_data(symbol, soup=None, fields=None):
     """
     Extract company overview data including sector, market cap, PE, ROCE, ROE from screener.in
+    Pass the already-parsed screener page as `soup`, or its extracted `fields`, to avoid a second lookup
     """
     try:
-        url = f"https://www.screener.in/company/{symbol}/consolidated/"
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        res = requests.get(url, headers=headers)
-        soup = BeautifulSoup(res.text, "html.parser")
-        
-        # Get all text content for pattern matching
-        page_text = soup.get_text()
-        
-        # Extract data using multiple approaches
-        sector = extract_sector_from_page(soup, page_text)
-        market_cap = extract_market_cap_from_page(soup, page_text)
-        pe_ratio = extract_pe_ratio(soup, page_text)
-        roce = extract_roce(soup, page_text)
-        roe = extract_roe(soup, page_text)
+        if fields is None and soup is not None:
+            fields = extract_overview_fields(soup)
+        elif fields is None:
+            page = page_cache.get(screener_company_url(symbol), headers={'User-Agent': 'Mozilla/5.0'})
+            if FUNDAMENTALS_PARSER == "lxml":
+                fields = ScreenerPage(page.tree).overview()
+            else:
+                fields = extract_overview_fields(page.soup)
+
+        sector = fields["sector"]
+        market_cap = fields["market_cap"]
+        pe_ratio = fields["pe"]
+        roce = fields["roce"]
+        roe = fields["roe"]
         
         # If we couldn't get sector or ROCE from screener, try yfinance as fallback
         if sector == "N/A" or roce == "N/A":
@@ -600,12 +678,10 @@ def calculate_roce_from_statements(income_stmt, balance_sheet):
                 label = item['label'].lower()
                 if any(term in label for term in ['operating profit', 'ebit', 'operating income', 'profit before interest']):
                     if latest_year and latest_year in item:
-                        value_str = item[latest_year].replace(',', '').replace('₹', '').strip()
-                        try:
-                            ebit = float(value_str)
+                        value = parse_number(item[latest_year])
+                        if value == value:  # Not NaN
+                            ebit = value
                             break
-                        except:
-                            continue
         
         # Find Capital Employed from balance sheet
         total_assets = None
@@ -617,20 +693,18 @@ def calculate_roce_from_statements(income_stmt, balance_sheet):
             if item.get('label'):
                 label = item['label'].lower()
                 if latest_year and latest_year in item:
-                    value_str = item[latest_year].replace(',', '').replace('₹', '').strip()
-                    try:
-                        value = float(value_str)
-                        
-                        if any(term in label for term in ['total assets', 'total asset']):
-                            total_assets = value
-                        elif any(term in label for term in ['current liabilities', 'current liability']):
-                            current_liabilities = value
-                        elif any(term in label for term in ['shareholders equity', 'shareholder equity', 'equity']):
-                            shareholders_equity = value
-                        elif any(term in label for term in ['long term debt', 'long-term debt', 'non-current liabilities']):
-                            long_term_debt = value
-                    except:
+                    value = parse_number(item[latest_year])
+                    if value != value:  # NaN: blank or unparseable cell
                         continue
+
+                    if any(term in label for term in ['total assets', 'total asset']):
+                        total_assets = value
+                    elif any(term in label for term in ['current liabilities', 'current liability']):
+                        current_liabilities = value
+                    elif any(term in label for term in ['shareholders equity', 'shareholder equity', 'equity']):
+                        shareholders_equity = value
+                    elif any(term in label for term in ['long term debt', 'long-term debt', 'non-current liabilities']):
+                        long_term_debt = value
         
         # Calculate Capital Employed using available data
         if total_assets and current_liabilities:
@@ -704,22 +778,20 @@ def get_alternative_sector_data(symbol):
             'Connection': 'keep-alive',
         }
         
-        response = requests.get(nse_url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # Look for sector information in NSE page
-            sector_elements = soup.find_all(string=re.compile(r'sector|industry', re.IGNORECASE))
-            for element in sector_elements:
-                parent = element.parent
-                if parent:
-                    # Look for sector value near the sector label
-                    siblings = parent.find_next_siblings()
-                    for sibling in siblings[:3]:  # Check next 3 siblings
-                        text = sibling.get_text().strip()
-                        if (len(text) > 5 and len(text) < 50 and 
-                            not any(word in text.lower() for word in ['nifty', 'sensex', 'index'])):
-                            return text
+        soup = page_cache.soup(nse_url, headers=headers, timeout=10)
+        
+        # Look for sector information in NSE page
+        sector_elements = soup.find_all(string=re.compile(r'sector|industry', re.IGNORECASE))
+        for element in sector_elements:
+            parent = element.parent
+            if parent:
+                # Look for sector value near the sector label
+                siblings = parent.find_next_siblings()
+                for sibling in siblings[:3]:  # Check next 3 siblings
+                    text = sibling.get_text().strip()
+                    if (len(text) > 5 and len(text) < 50 and 
+                        not any(word in text.lower() for word in ['nifty', 'sensex', 'index'])):
+                        return text
         
         return "N/A"
     except Exception as e:
@@ -728,19 +800,13 @@ def get_alternative_sector_data(symbol):
 
 def get_indian_fundamentals(symbol):
     try:
-        url = f"https://www.screener.in/company/{symbol}/consolidated/"
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        res = requests.get(url, headers=headers)
-        soup = BeautifulSoup(res.text, "html.parser")
-
-        overview = soup.find("h1").text.strip()
-
-        income_stmt = parse_financial_table(soup, "Profit & Loss")
-        balance_sheet = parse_financial_table(soup, "Balance Sheet")
-        cash_flow = parse_financial_table(soup, "Cash Flow")
+        # One (cached, conditionally revalidated) screener download serves every section below
+        page = page_cache.get(screener_company_url(symbol), headers={'User-Agent': 'Mozilla/5.0'})
+        screener = read_screener_page(page)
 
-        shareholding = extract_shareholding_from_screener(soup)
-        valuation_data = get_company_overview_data(symbol)
+        income_stmt = screener["income_statement"]
+        balance_sheet = screener["balance_sheet"]
+        valuation_data = get_company_overview_data(symbol, fields=screener.pop("overview"))
         
         # If sector is still N/A, try alternative sources
         if valuation_data.get("sector") == "N/A":
@@ -757,11 +823,7 @@ def get_indian_fundamentals(symbol):
         return {
             "symbol": symbol,
             "market": "India",
-            "company": overview,
-            "income_statement": income_stmt,
-            "balance_sheet": balance_sheet,
-            "cash_flow": cash_flow,
-            "shareholding_pattern": shareholding,
+            **screener,  # company, statements, shareholding_pattern
             **valuation_data  # injects sector, market_cap, etc.
         }
 
@@ -843,14 +905,70 @@ def get_indian_fundamentals(symbol):
 #             "error": str(e)
 #         }
 
+# Deadline per yfinance section, in seconds from the moment the section has its Yahoo
+# token and starts its request; waiting for a worker or a token doesn't count against it.
+# A statement section that misses it comes back empty and the result is flagged partial_data.
+US_SECTION_DEADLINES = {
+    "info": 20,
+    "financials": 12,
+    "balance_sheet": 12,
+    "cash_flow": 12,
+    "investors": 8,
+}
+# A section still waiting for a worker or a token this long after it was submitted is given up
+US_SECTION_QUEUE_TIMEOUT = int(os.getenv("US_SECTION_QUEUE_TIMEOUT", 45))
+# A worker for every section of every admitted /fundamentals load plus the cache warmer's,
+# so sections never queue behind another request's sections for a thread
+yahoo_section_executor = ThreadPoolExecutor(
+    max_workers=(ENDPOINT_LIMITS["fundamentals"][0] + 1) * len(US_SECTION_DEADLINES),
+    thread_name_prefix="yahoo-sections",
+)
+
+def fetch_sections(tasks, deadlines, queue_timeout=US_SECTION_QUEUE_TIMEOUT):
+    """
+    Run independent Yahoo fetches concurrently. Each section takes its Yahoo token first and
+    is then bounded by its own deadline; one that hasn't got a worker and a token within
+    queue_timeout is cancelled without spending a request.
+    Returns (results, failures): failures maps a section to "timeout" or its error
+    """
+    started = {name: threading.Event() for name in tasks}
+    started_at = {}
+    abandoned = set()
+
+    def run(name, task):
+        try:
+            if name in abandoned:
+                return None
+            rate_limited_yahoo_request()
+            if name in abandoned:
+                release_yahoo_token()
+                return None
+            started_at[name] = time.monotonic()
+        finally:
+            started[name].set()
+        return task()
+
+    submitted = time.monotonic()
+    futures = {name: yahoo_section_executor.submit(run, name, task) for name, task in tasks.items()}
+    results, failures = {}, {}
+    for name, future in futures.items():
+        if not started[name].wait(max(0.0, submitted + queue_timeout - time.monotonic())):
+            abandoned.add(name)
+            future.cancel()
+            failures[name] = "timeout"
+            continue
+        remaining = deadlines[name] - (time.monotonic() - started_at.get(name, time.monotonic()))
+        try:
+            results[name] = future.result(timeout=max(0.0, remaining))
+        except FutureTimeout:
+            # The request is already out; it finishes in its worker and the result is dropped
+            failures[name] = "timeout"
+        except Exception as e:
+            failures[name] = e
+    return results, failures
+
 def get_us_fundamentals(symbol):
-    import time
-    import random
-    
     try:
-        # Apply rate limiting
-        rate_limited_yahoo_request()
-        
         # Configure yfinance with session and headers to avoid rate limiting
         session = requests.Session()
         session.headers.update({
@@ -864,60 +982,63 @@ def get_us_fundamentals(symbol):
                 return df.fillna(0).infer_objects(copy=False).astype(float).T.to_dict()
             return {}
 
-        # Try to get info with retry mechanism
-        info = None
-        max_retries = 2  # Reduced retries to avoid long waits
-        for attempt in range(max_retries):
-            try:
-                info = ticker.info
-                reset_yahoo_failures()  # Success, reset failure count
-                break
-            except Exception as e:
-                if "429" in str(e) and attempt < max_retries - 1:
-                    # Rate limited, wait and retry
-                    wait_time = (attempt + 1) * 3  # 3, 6 seconds
-                    print(f"Rate limited, waiting {wait_time} seconds before retry {attempt + 1}")
-                    time.sleep(wait_time)
-                    continue
-                else:
+        # fetch_sections takes each section's first Yahoo token before it runs
+        def fetch_info():
+            # Retry mechanism; every retry goes through the shared rate limiter too
+            max_retries = 2  # Reduced retries to avoid long waits
+            for attempt in range(max_retries):
+                if attempt:
+                    rate_limited_yahoo_request()
+                try:
+                    info = ticker.info
+                    reset_yahoo_failures()  # Success, reset failure count
+                    return info
+                except Exception as e:
+                    if "429" in str(e) and attempt < max_retries - 1:
+                        # Rate limited, wait and retry
+                        wait_time = (attempt + 1) * 3  # 3, 6 seconds
+                        print(f"Rate limited, waiting {wait_time} seconds before retry {attempt + 1}")
+                        time.sleep(wait_time)
+                        continue
                     handle_yahoo_failure()
                     raise e
-        
+
+        def fetch_frame(attribute):
+            def fetch():
+                return df_to_dict(getattr(ticker, attribute))
+            return fetch
+
+        def fetch_investors():
+            holders = ticker.institutional_holders
+            return holders.to_dict(orient='records') if holders is not None else []
+
+        # The five sections are independent requests: issue them together
+        sections, failures = fetch_sections({
+            "info": fetch_info,
+            "financials": fetch_frame("financials"),
+            "balance_sheet": fetch_frame("balance_sheet"),
+            "cash_flow": fetch_frame("cashflow"),
+            "investors": fetch_investors,
+        }, US_SECTION_DEADLINES)
+
+        info_failure = failures.pop("info", None)
+        if info_failure == "timeout":
+            raise Exception("Timed out fetching ticker info")
+        if info_failure is not None:
+            raise info_failure
+        info = sections["info"]
         if not info:
             raise Exception("Could not fetch ticker info after retries")
 
+        for name, failure in failures.items():
+            print(f"Could not fetch {name.replace('_', ' ')} for {symbol}: {failure}")
+
         pe_ratio = info.get("trailingPE") or info.get("forwardPE") or "N/A"
         roe = info.get("returnOnEquity") or "N/A"
         roa = info.get("returnOnAssets") or "N/A"
 
-        # Try to get financial data with error handling
-        financials = {}
-        balance_sheet = {}
-        cash_flow = {}
-        investors = []
-        
-        try:
-            financials = df_to_dict(ticker.financials)
-        except:
-            print(f"Could not fetch financials for {symbol}")
-            
-        try:
-            balance_sheet = df_to_dict(ticker.balance_sheet)
-        except:
-            print(f"Could not fetch balance sheet for {symbol}")
-            
-        try:
-            cash_flow = df_to_dict(ticker.cashflow)
-        except:
-            print(f"Could not fetch cash flow for {symbol}")
-            
-        try:
-            if ticker.institutional_holders is not None:
-                investors = ticker.institutional_holders.to_dict(orient='records')
-        except:
-            print(f"Could not fetch institutional holders for {symbol}")
-
-        return {
+        # Sections that failed or missed their deadline come back empty
+        result = {
             "symbol": symbol,
             "market": "US",
             "company": info.get("shortName", "N/A"),
@@ -926,11 +1047,15 @@ def get_us_fundamentals(symbol):
             "pe": pe_ratio,
             "roe": roe,
             "roa": roa,
-            "income_statement": financials,
-            "balance_sheet": balance_sheet,
-            "cash_flow": cash_flow,
-            "investors": investors,
+            "income_statement": sections.get("financials", {}),
+            "balance_sheet": sections.get("balance_sheet", {}),
+            "cash_flow": sections.get("cash_flow", {}),
+            "investors": sections.get("investors", []),
+            "partial_data": bool(failures),
         }
+        if failures:
+            result["missing_sections"] = sorted(failures)
+        return result
 
     except Exception as e:
         error_msg = str(e)
@@ -990,24 +1115,50 @@ def get_us_fundamentals(symbol):
 #         }
 
 
+def load_fundamentals(symbol: str):
+    """Fetch fundamentals without the cache"""
+    symbol = symbol.upper()
+    print(f"🌐 Fetching fundamentals for {symbol}")
+    if symbol.endswith(".NS"):
+        return get_indian_fundamentals(symbol.replace(".NS", ""))
+    return get_us_fundamentals(symbol)
+
 def get_fundamentals(symbol: str):
-    # Check cache first
-    cache_key = symbol.upper()
-    current_time = time.time()
-    
-    if cache_key in fundamentals_cache:
-        cached_data, timestamp = fundamentals_cache[cache_key]
-        if current_time - timestamp < CACHE_DURATION:
-            print(f"📋 Using cached fundamentals for {symbol}")
-            return cached_data
-    
-    # Fetch fresh data
-    if symbol.upper().endswith(".NS"):
-        result = get_indian_fundamentals(symbol.upper().replace(".NS", ""))
-    else:
-        result = get_us_fundamentals(symbol.upper())
-    
-    # Cache the result (even if it's an error, to avoid repeated failures)
-    fundamentals_cache[cache_key] = (result, current_time)
-    
-    return result
\ No newline at end of file
+    # Cached (memory, then disk); concurrent requests for one symbol share a single fetch.
+    # Errors are cached too, for ERROR_CACHE_DURATION, to avoid hammering a failing source.
+    return fundamentals_cache.get_or_load(symbol.upper(), lambda: load_fundamentals(symbol))
+
+async def get_fundamentals_async(symbol: str):
+    """
+    get_fundamentals for async endpoints: cached results are returned directly, a screener page
+    is downloaded on the async HTTP client, and the blocking parse / yfinance work runs on the
+    shared bounded pool
+    """
+    symbol = symbol.upper()
+    cached = fundamentals_cache.get(symbol)
+    if cached is not None:
+        return cached
+    if symbol.endswith(".NS"):
+        try:
+            # Leaves a fresh copy in the page cache, so the load below parses without downloading
+            await page_cache.get_async(screener_company_url(symbol.replace(".NS", "")),
+                                       headers={'User-Agent': 'Mozilla/5.0'})
+        except Exception as e:
+            print(f"⚠️ Async screener download failed for {symbol}: {e}")  # The load retries and reports it
+    return await run_blocking(get_fundamentals, symbol)
+
+def get_statements(symbol: str):
+    """
+    Typed statements and ratios (statement_store.SymbolStatements) of a symbol, None if its
+    fundamentals are an error. Built once per cached fundamentals result, never from HTML.
+    """
+    symbol = symbol.upper()
+    return statements_from_result(symbol, get_fundamentals(symbol))
+
+
+def statements_from_result(symbol: str, result: dict):
+    """get_statements for a fundamentals result already in hand; never fetches upstream"""
+    entry = fundamentals_cache.entry(symbol)
+    if entry is None:  # Evicted in between: build from the result in hand
+        return statement_store.ingest(symbol, result)
+    return statement_store.get(symbol, entry.stored_at) or statement_store.ingest(symbol, entry.value, entry.stored_at)
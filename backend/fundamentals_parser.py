@@ -0,0 +1,437 @@
+import os
+import re
+from typing import Dict, List, Optional
+
+from lxml import etree
+
+# lxml engine for screener.in company pages. The BeautifulSoup extractors in
+# fundamentals.py re-walk the whole html.parser tree per field (get_text, every
+# <table>, every span/div/td/li/p); here the page is parsed once by lxml, its
+# text and table rows are collected once, and the known sections (#peers,
+# #ratios, #shareholding, the company-info block) are reached by XPath. The
+# heuristics are the same as the BeautifulSoup extractors, field for field, so
+# both engines give the same values (tests/test_fundamentals_parser.py checks
+# this on the fixture pages, `python -m benchmarks.run --only fundamentals_parse
+# --pages cache/pages` on saved ones).
+
+FUNDAMENTALS_PARSER = os.getenv("FUNDAMENTALS_PARSER", "lxml")  # "lxml" or "bs4" (the original extractors)
+
+# Strings BeautifulSoup's get_text() leaves out: script/style, template contents, ruby annotations
+_TEXT = etree.XPath(
+    ".//text()[not(parent::script or parent::style or parent::rt or parent::rp or ancestor::template)]",
+    smart_strings=False,
+)
+# Every string node, as BeautifulSoup's find(string=...) sees them (comments included)
+_STRINGS = etree.XPath(".//text() | .//comment()")
+
+_UPPER, _LOWER = "ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"
+
+NA = "N/A"
+
+SECTOR_WORDS = ['services', 'technology', 'banking', 'pharma', 'auto', 'steel', 'oil', 'telecom', 'fmcg',
+                'textile', 'cement', 'power', 'finance', 'insurance', 'retail', 'media', 'real estate']
+NOT_SECTOR_WORDS = ['nifty', 'sensex', 'index', 'bse', 'nse', 'show', 'more', 'market cap', 'pe', 'price']
+MARKET_INDEX_WORDS = ['nifty', 'sensex', 'index', 'bse', 'nse']
+
+# Company name fallback when no page section names a sector
+KNOWN_COMPANY_SECTORS = [
+    (['infosys', 'tcs', 'wipro', 'tech mahindra', 'hcl tech'], "IT Services & Consulting"),
+    (['hdfc', 'icici', 'sbi', 'axis', 'kotak', 'bank'], "Banking & Financial Services"),
+    (['sun pharma', 'dr reddy', 'cipla', 'lupin', 'pharma'], "Pharmaceuticals"),
+    (['tata motors', 'mahindra', 'maruti', 'bajaj auto', 'hero motocorp'], "Automobile"),
+    (['reliance', 'ongc', 'oil', 'gas'], "Oil & Gas"),
+    (['tata steel', 'jsw steel', 'steel'], "Steel"),
+]
+
+ABOUT_SECTOR_PATTERNS = [
+    r'(?:operates in|engaged in|business of|sector of|industry of)\s+([^.]+)',
+    r'(?:is a|leading)\s+([^.]*(?:services|technology|banking|pharma|auto|steel|oil|telecom|fmcg|textile|cement|power|finance|insurance|retail|media)[^.]*)',
+]
+MARKET_CAP_PATTERNS = [
+    r'Mkt Cap[:\s]*₹?\s*([0-9,]+(?:\.[0-9]+)?)\s*([TCL]?cr|Crore?|Lakh)?',
+    r'Market Cap[:\s]*₹?\s*([0-9,]+(?:\.[0-9]+)?)\s*([TCL]?cr|Crore?|Lakh)?',
+    r'MarketCap[:\s]*₹?\s*([0-9,]+(?:\.[0-9]+)?)\s*([TCL]?cr|Crore?|Lakh)?',
+]
+CAP_VALUE_PATTERN = r'([0-9,]+(?:\.[0-9]+)?)\s*([TCL]?cr|Crore?|Lakh)?'
+PE_PATTERNS = [
+    r'PE[:\s]*([0-9]+(?:\.[0-9]+)?)',
+    r'P/E[:\s]*([0-9]+(?:\.[0-9]+)?)',
+    r'Price to Earnings[:\s]*([0-9]+(?:\.[0-9]+)?)',
+]
+ROCE_PATTERNS = [
+    r'ROCE[:\s]*([+-]?[0-9]+(?:\.[0-9]+)?)%?',
+    r'Return on Capital Employed[:\s]*([+-]?[0-9]+(?:\.[0-9]+)?)%?',
+    r'RoCE[:\s]*([+-]?[0-9]+(?:\.[0-9]+)?)%?',
+    r'Return on Capital[:\s]*([+-]?[0-9]+(?:\.[0-9]+)?)%?',
+]
+ROE_PATTERNS = [
+    r'ROE[:\s]*([0-9]+(?:\.[0-9]+)?)%?',
+    r'Return on Equity[:\s]*([0-9]+(?:\.[0-9]+)?)%?',
+    r'RoE[:\s]*([0-9]+(?:\.[0-9]+)?)%?',
+]
+
+
+_SKIPPED_TAGS = {"script", "style", "rt", "rp", "template"}
+
+
+def parse_html(content: bytes):
+    """lxml document for raw page bytes (screener and NSE serve UTF-8); a parser per call, they are not thread-safe"""
+    root = etree.fromstring(content, etree.HTMLParser(encoding="utf-8")) if content.strip() else None
+    return root if root is not None else etree.Element("html")
+
+
+def _text(element, leaf_shortcut: bool = True) -> str:
+    # Most cells are a single text node; only elements with children need the XPath
+    # (the shortcut can't see a <template> ancestor, so pages with templates turn it off)
+    if leaf_shortcut and len(element) == 0 and element.tag not in _SKIPPED_TAGS:
+        return element.text or ""
+    return "".join(_TEXT(element))
+
+
+def _class_is(tag: str, name: str) -> str:
+    return f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {name} ')]"
+
+
+def _lower_contains(*needles: str) -> str:
+    """XPath test: the element's string value contains any needle, ASCII case-insensitively"""
+    return " or ".join(f"contains(translate(., '{_UPPER}', '{_LOWER}'), '{needle}')" for needle in needles)
+
+
+def _string(element) -> Optional[str]:
+    """BeautifulSoup's Tag.string: the only child string, looking through single-child tags"""
+    children = list(element)
+    strings = [element.text] + [child.tail for child in children]
+    if not children:
+        return element.text
+    if len(children) == 1 and not any(strings):
+        child = children[0]
+        if isinstance(child, etree._Comment):
+            return child.text
+        return _string(child) if isinstance(child.tag, str) else None
+    return None
+
+
+def _string_parent(node):
+    """Element a string node sits in (lxml reports a tail string on the element before it)"""
+    if isinstance(node, etree._Comment):
+        return node.getparent()
+    parent = node.getparent()
+    return parent.getparent() if node.is_tail else parent
+
+
+def _ancestor(element, tag: str):
+    return next(element.iterancestors(tag), None)
+
+
+class ScreenerPage:
+    """One parsed screener.in company page: name, statement tables, shareholding and overview ratios"""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._leaf_shortcut = next(tree.iter("template"), None) is None
+        self._page_text: Optional[str] = None
+        self._tables: Optional[List[List[List[str]]]] = None
+
+    def _text(self, element) -> str:
+        return _text(element, self._leaf_shortcut)
+
+    @classmethod
+    def from_html(cls, content: bytes) -> "ScreenerPage":
+        return cls(parse_html(content))
+
+    # ---------- shared, computed once ----------
+
+    @property
+    def page_text(self) -> str:
+        if self._page_text is None:
+            self._page_text = self._text(self.tree)
+        return self._page_text
+
+    @property
+    def tables(self) -> List[List[List[str]]]:
+        """Stripped td/th texts of every row of every table, in document order"""
+        if self._tables is None:
+            self._tables = [
+                [[self._text(cell).strip() for cell in row.xpath(".//td | .//th")] for row in table.iterdescendants("tr")]
+                for table in self.tree.iter("table")
+            ]
+        return self._tables
+
+    def _rows(self):
+        for table in self.tables:
+            yield from table
+
+    def _first(self, *paths: str):
+        for path in paths:
+            found = self.tree.xpath(f"({path})[1]")
+            if found:
+                return found[0]
+        return None
+
+    def _ratios_section(self):
+        return self._first("//section[@id='ratios']", _class_is("div", "ratios"))
+
+    def _number_near(self, section, label: str, number: str, low: float, high: float):
+        """First in-range number on the row (tr, else div) around the first string matching label"""
+        matcher = re.compile(label, re.IGNORECASE)
+        node = next((s for s in _STRINGS(section) if matcher.search(s.text if isinstance(s, etree._Comment) else s)), None)
+        if node is None:
+            return None
+        parent = _string_parent(node)
+        row = _ancestor(parent, "tr") if parent is not None else None
+        if row is None and parent is not None:
+            row = _ancestor(parent, "div")
+        if row is None:
+            return None
+        for num in re.findall(number, self._text(row)):
+            try:
+                value = float(num.replace('%', ''))
+            except ValueError:
+                continue
+            if low < value < high:
+                return value
+        return None
+
+    # ---------- sections ----------
+
+    def company(self) -> str:
+        heading = self._first("//h1")
+        if heading is None:
+            raise ValueError("No company heading on the screener page")
+        return self._text(heading).strip()
+
+    def financial_table(self, section_title: str) -> List[Dict]:
+        """Rows of the table after the <h2> titled section_title, keyed by column header"""
+        try:
+            headings = [h for h in self.tree.xpath("//h2[. = $title]", title=section_title)
+                        if _string(h) == section_title]
+            if not headings:
+                return []
+            found = headings[0].xpath("(descendant::table | following::table)[1]")
+            if not found:
+                return []
+            table = found[0]
+
+            headers = [self._text(th).strip() for th in table.iterdescendants("th")]
+            result = []
+            for row in list(table.iterdescendants("tr"))[1:]:
+                cols = list(row.iterdescendants("td"))
+                if not cols:
+                    continue
+                values = [self._text(col).strip() for col in cols[1:]]
+                row_dict = {headers[i + 1]: values[i] for i in range(len(values))}
+                row_dict["label"] = self._text(cols[0]).strip()
+                result.append(row_dict)
+            return result
+        except Exception as e:
+            print(f"❌ Failed to parse section '{section_title}': {e}")
+            return []
+
+    def shareholding(self) -> List[Dict]:
+        section = self._first("//section[@id='shareholding']")
+        if section is None:
+            return []
+        table = next(section.iterdescendants("table"), None)
+        if table is None:
+            print("Shareholding scraping failed: no table in the shareholding section")
+            return []
+        data = []
+        for row in list(table.iterdescendants("tr"))[1:]:
+            cols = list(row.iterdescendants("td"))
+            if len(cols) >= 2:
+                data.append({"Category": self._text(cols[0]).strip(), "Holding": self._text(cols[1]).strip()})
+        return data
+
+    def overview(self) -> Dict:
+        """sector, market_cap, pe, roce, roe in one pass over the shared text and table rows ("N/A" when absent)"""
+        return {
+            "sector": self._guarded("sector", self.sector),
+            "market_cap": self._guarded("market cap", self.market_cap),
+            "pe": self._guarded(None, self.pe_ratio),
+            "roce": self._guarded("ROCE", self.roce),
+            "roe": self._guarded(None, self.roe),
+        }
+
+    @staticmethod
+    def _guarded(name: Optional[str], extract):
+        try:
+            value = extract()
+        except Exception as e:
+            if name:
+                print(f"Error extracting {name}: {e}")
+            return NA
+        return NA if value is None else value
+
+    # ---------- overview fields ----------
+
+    def sector(self) -> Optional[str]:
+        # Company info block at the top of the page
+        top_info = self._first(_class_is("div", "top"), _class_is("div", "company-info"))
+        if top_info is not None:
+            for element in top_info.xpath(".//*[self::small or self::span or self::p or self::div]"):
+                text = self._text(element).strip()
+                if (5 < len(text) < 50 and not re.match(r'^[\d\.,\s%₹$]+$', text)
+                        and not any(word in text.lower() for word in NOT_SECTOR_WORDS)
+                        and any(word in text.lower() for word in SECTOR_WORDS)):
+                    return text
+
+        breadcrumb = self._first(_class_is("nav", "breadcrumb"), _class_is("ol", "breadcrumb"))
+        if breadcrumb is not None:
+            for link in breadcrumb.iterdescendants("a"):
+                text = self._text(link).strip()
+                if len(text) > 5 and not any(word in text.lower() for word in ['home', 'companies', 'screener', 'nifty', 'sensex']):
+                    return text
+
+        about = self._first(_class_is("div", "company-about"), _class_is("div", "description"), "//section[@id='about']")
+        if about is not None:
+            about_text = self._text(about)
+            for pattern in ABOUT_SECTOR_PATTERNS:
+                match = re.search(pattern, about_text, re.IGNORECASE)
+                if match:
+                    sector_text = match.group(1).strip()
+                    if len(sector_text) < 100:
+                        return sector_text
+
+        # Peer comparison heading, e.g. "Peers in IT Services sector"
+        peers = self._first("//section[@id='peers']", _class_is("div", "peers"))
+        if peers is not None:
+            for heading in peers.xpath(".//*[self::h1 or self::h2 or self::h3 or self::h4]"):
+                text = self._text(heading).strip()
+                if ('peer' in text.lower() or 'similar' in text.lower()) and len(text) > 10:
+                    match = re.search(r'(?:in|of)\s+([^.]+?)(?:\s+sector|\s+industry|$)', text, re.IGNORECASE)
+                    if match:
+                        sector = match.group(1).strip()
+                        if not any(word in sector.lower() for word in ['peer', 'comparison', 'companies', 'nifty']):
+                            return sector
+
+        for cells in self._rows():
+            if len(cells) >= 2:
+                label = cells[0].lower()
+                if 'sector' in label or 'industry' in label:
+                    value = cells[1]
+                    if value and len(value) > 2 and not any(word in value.lower() for word in MARKET_INDEX_WORDS):
+                        return value
+
+        for content in self.tree.xpath("//meta/@content"):
+            if "sector" in content.lower() or "industry" in content.lower():
+                match = re.search(r'(?:sector|industry)[:\s]*([^,\.\n]+)', content, re.IGNORECASE)
+                if match:
+                    sector = match.group(1).strip()
+                    if not any(word in sector.lower() for word in ['nifty', 'index', 'stock']):
+                        return sector
+
+        heading = self._first("//h1")
+        if heading is not None:
+            name = self._text(heading).lower()
+            for words, sector in KNOWN_COMPANY_SECTORS:
+                if any(word in name for word in words):
+                    return sector
+        return None
+
+    def market_cap(self) -> Optional[str]:
+        for pattern in MARKET_CAP_PATTERNS:
+            match = re.search(pattern, self.page_text, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+            if match:
+                number = re.sub(r'\s+', '', match.group(1).strip())
+                unit = match.group(2).strip() if match.group(2) else ""
+                if unit:
+                    return f"{number} {unit.replace('Crore', 'Cr').replace('crore', 'Cr')}"
+                return number
+
+        # Elements mentioning market cap; XPath narrows them down, the visible text decides
+        candidates = self.tree.xpath(
+            f"//*[self::span or self::div or self::td or self::li or self::p][{_lower_contains('mkt cap', 'market cap')}]"
+        )
+        for element in candidates:
+            text = self._text(element)
+            if "mkt cap" in text.lower() or "market cap" in text.lower():
+                match = re.search(CAP_VALUE_PATTERN, re.sub(r'\s+', ' ', text.strip()), re.IGNORECASE)
+                if match:
+                    unit = (match.group(2) or "Cr").replace('Crore', 'Cr').replace('crore', 'Cr')
+                    return f"{match.group(1)} {unit}"
+
+        first_table = self.tables[0] if self.tables else []
+        for cells in first_table:
+            if len(cells) >= 2 and ("market cap" in cells[0].lower() or "mkt cap" in cells[0].lower()):
+                match = re.search(CAP_VALUE_PATTERN, re.sub(r'\s+', ' ', cells[1]), re.IGNORECASE)
+                if match:
+                    unit = (match.group(2) or "Cr").replace('Crore', 'Cr').replace('crore', 'Cr')
+                    return f"{match.group(1)} {unit}"
+        return None
+
+    def pe_ratio(self) -> Optional[float]:
+        for pattern in PE_PATTERNS:
+            match = re.search(pattern, self.page_text, re.IGNORECASE)
+            if match:
+                value = float(match.group(1))
+                if 0 < value < 1000:
+                    return value
+
+        ratios = self._ratios_section()
+        if ratios is not None:
+            return self._number_near(ratios, r'PE|P/E', r'([0-9]+(?:\.[0-9]+)?)', 0, 1000)
+        return None
+
+    def roce(self) -> Optional[float]:
+        for cells in self._rows():
+            if len(cells) >= 2 and ('roce' in cells[0].lower() or 'return on capital' in cells[0].lower()):
+                match = re.search(r'([+-]?[0-9]+(?:\.[0-9]+)?)%?', cells[1])
+                if match:
+                    value = float(match.group(1))
+                    if -100 < value < 500:
+                        return value
+
+        for pattern in ROCE_PATTERNS:
+            for match in re.finditer(pattern, self.page_text, re.IGNORECASE):
+                value = float(match.group(1))
+                if -100 < value < 500:
+                    return value
+
+        # EBIT / capital employed from statement rows
+        financial_data = {}
+        for cells in self._rows():
+            if len(cells) < 2:
+                continue
+            label = cells[0].lower()
+            match = re.search(r'([+-]?[0-9,]+(?:\.[0-9]+)?)', cells[1].replace(',', ''))
+            if not match:
+                continue
+            try:
+                value = float(match.group(1).replace(',', ''))
+            except ValueError:
+                continue
+            if any(term in label for term in ['ebit', 'operating profit', 'operating income']):
+                financial_data['ebit'] = value
+            elif any(term in label for term in ['total assets', 'total asset']):
+                financial_data['total_assets'] = value
+            elif any(term in label for term in ['current liabilities', 'current liability']):
+                financial_data['current_liabilities'] = value
+            elif 'capital employed' in label:
+                financial_data['capital_employed'] = value
+
+        if 'ebit' in financial_data:
+            capital_employed = financial_data.get('capital_employed')
+            if not capital_employed and 'total_assets' in financial_data and 'current_liabilities' in financial_data:
+                capital_employed = financial_data['total_assets'] - financial_data['current_liabilities']
+            if capital_employed:
+                roce = (financial_data['ebit'] / capital_employed) * 100
+                if -100 < roce < 500:
+                    return round(roce, 2)
+
+        ratios = self._ratios_section()
+        if ratios is not None:
+            return self._number_near(ratios, r'ROCE|Return on Capital', r'([+-]?[0-9]+(?:\.[0-9]+)?)%?', -100, 500)
+        return None
+
+    def roe(self) -> Optional[float]:
+        for pattern in ROE_PATTERNS:
+            match = re.search(pattern, self.page_text, re.IGNORECASE)
+            if match:
+                value = float(match.group(1))
+                if -100 < value < 200:
+                    return value
+
+        ratios = self._ratios_section()
+        if ratios is not None:
+            return self._number_near(ratios, r'ROE|Return on Equity', r'([0-9]+(?:\.[0-9]+)?)%?', -100, 200)
+        return None
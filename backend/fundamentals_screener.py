@@ -0,0 +1,234 @@
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fundamentals import fundamentals_cache
+from statement_store import UNITS, parse_number, statement_store
+from stocks import symbol_registry
+
+# Cross-company screening ("pe < 20 and roce > 15" over the Indian universe) against
+# a columnar table of valuation and ratio fields. The table is built only from what
+# the fundamentals cache already holds (memory or disk, never an upstream request):
+# one float64 column per field, and per column the row order sorted by value, so a
+# range filter is two binary searches and sorting reuses the same order. It is
+# rebuilt when cached results have changed, checked at most every SCREEN_REFRESH_SECONDS.
+
+SCREEN_REFRESH_SECONDS = 30
+SCREEN_MAX_RESULTS = 200
+
+# Screenable fields. market_cap is in the market's reporting unit (INR crore / USD),
+# so it can only be compared within one market; ratio fields are percentages
+SCREEN_FIELDS = ("market_cap", "pe", "roce", "roe", "operating_margin", "net_margin",
+                 "revenue_growth", "net_income_growth")
+FIELD_ALIASES = {
+    "marketcap": "market_cap", "mcap": "market_cap", "p/e": "pe", "pe_ratio": "pe",
+    "opm": "operating_margin", "npm": "net_margin", "sales_growth": "revenue_growth",
+    "profit_growth": "net_income_growth",
+}
+PER_MARKET_FIELDS = ("market_cap",)  # Filtering or sorting on these needs market=
+DEFAULT_SORT = "market_cap"  # With market=; across markets, by the unit-free DEFAULT_SORT_ALL_MARKETS
+DEFAULT_SORT_ALL_MARKETS = "roe"
+
+_CONDITION = re.compile(r"^\s*([a-z_/ ]+?)\s*(<=|>=|==|!=|<|>|=)\s*(-?[0-9.]+)\s*$")
+_CONJUNCTION = re.compile(r"\s+and\s+|\s*,\s*|\s*&&?\s*", re.IGNORECASE)
+
+
+def field_name(name: str) -> str:
+    key = name.strip().lower().replace(" ", "_")
+    key = FIELD_ALIASES.get(key, key)
+    if key not in SCREEN_FIELDS:
+        raise ValueError(f"Unknown field '{name}', expected one of {', '.join(SCREEN_FIELDS)}")
+    return key
+
+
+def parse_query(query: Optional[str]) -> List[Tuple[str, str, float]]:
+    """'PE < 20 and ROCE > 15' -> [("pe", "<", 20.0), ("roce", ">", 15.0)]"""
+    conditions = []
+    for part in _CONJUNCTION.split(query or ""):
+        if not part.strip():
+            continue
+        match = _CONDITION.match(part.lower())
+        if match is None:
+            raise ValueError(f"Cannot parse condition '{part.strip()}' (expected e.g. 'roce > 15')")
+        name, op, value = match.groups()
+        conditions.append((field_name(name), "==" if op == "=" else op, float(value)))
+    return conditions
+
+
+def _result_fields(market: str, result: Dict, latest: Dict[str, Optional[float]]) -> Dict[str, float]:
+    """Screen fields of one cached fundamentals result, NaN where unknown"""
+    roe = parse_number(result.get("roe"))
+    if market == "US":
+        roe *= 100  # yfinance reports returnOnEquity as a fraction
+    values = dict.fromkeys(SCREEN_FIELDS, np.nan)
+    values.update(
+        market_cap=parse_number(result.get("market_cap")),
+        pe=parse_number(result.get("pe")),
+        roce=parse_number(result.get("roce")),
+        roe=roe,
+    )
+    # Reported values first, the statement store's latest ratios where there are none
+    for name in SCREEN_FIELDS:
+        if np.isnan(values[name]) and latest.get(name) is not None:
+            values[name] = latest[name]
+    return values
+
+
+@dataclass
+class ScreenTable:
+    """Screen fields of every cached symbol as columns, with a sorted row order per column"""
+    symbols: List[str]
+    companies: List[str]
+    markets: np.ndarray  # Registry market per row ("india" / "us")
+    sectors: np.ndarray
+    columns: Dict[str, np.ndarray]
+    built_at: float
+    signature: frozenset  # (symbol, stored_at) of the results the table was built from
+    missing: int  # Universe symbols with no usable cached fundamentals
+
+    def __post_init__(self):
+        # NaN sorts last, so each column's valid rows are a prefix of its order
+        self.order = {name: np.argsort(values, kind="stable") for name, values in self.columns.items()}
+        self.valid = {name: int(np.count_nonzero(~np.isnan(values))) for name, values in self.columns.items()}
+        self.sorted_values = {name: values[self.order[name][:self.valid[name]]] for name, values in self.columns.items()}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def range_mask(self, name: str, op: str, value: float) -> np.ndarray:
+        """Rows satisfying `name op value`, found by binary search on the column's sorted values"""
+        ordered, order = self.sorted_values[name], self.order[name]
+        first = int(np.searchsorted(ordered, value, side="left"))   # First row >= value
+        after = int(np.searchsorted(ordered, value, side="right"))  # First row > value
+        bounds = {">": (after, len(ordered)), ">=": (first, len(ordered)), "<": (0, first),
+                  "<=": (0, after), "==": (first, after), "!=": (0, len(ordered))}
+        low, high = bounds[op]
+        mask = np.zeros(len(self.symbols), dtype=bool)
+        mask[order[low:high]] = True
+        if op == "!=":
+            mask[order[first:after]] = False
+        return mask  # Rows with no value for the field never match
+
+    def screen(self, conditions: List[Tuple[str, str, float]], market: Optional[str] = None,
+               sector: Optional[str] = None, sort: str = DEFAULT_SORT, descending: bool = True,
+               limit: int = 50) -> Tuple[List[int], int]:
+        """Row numbers matching every condition, ordered by the sort field (blanks last), up to limit;
+        and the number of rows that matched"""
+        mask = np.ones(len(self.symbols), dtype=bool)
+        if market:
+            mask &= self.markets == market.lower()
+        if sector:
+            mask &= np.char.lower(self.sectors.astype(str)) == sector.lower()
+        for name, op, value in conditions:
+            mask &= self.range_mask(name, op, value)
+
+        order = self.order[sort]
+        valid = order[:self.valid[sort]]
+        ranked = np.concatenate((valid[::-1] if descending else valid, order[self.valid[sort]:]))
+        return [int(row) for row in ranked[mask[ranked]][:limit]], int(mask.sum())
+
+    def row(self, i: int) -> Dict:
+        market = self.markets[i]
+        entry = {
+            "symbol": self.symbols[i],
+            "company": self.companies[i],
+            "market": market,
+            "sector": self.sectors[i],
+            "unit": UNITS.get("India" if market == "india" else "US"),
+        }
+        for name, values in self.columns.items():
+            entry[name] = None if np.isnan(values[i]) else round(float(values[i]), 2)
+        return entry
+
+
+def build_screen_table(symbols: Optional[List[str]] = None) -> ScreenTable:
+    """Table of every symbol whose fundamentals are cached; no upstream requests"""
+    symbols = symbols if symbols is not None else symbol_registry.symbols()
+    rows, companies, markets, sectors, signature = [], [], [], [], []
+    values = {name: [] for name in SCREEN_FIELDS}
+    missing = 0
+    for symbol in symbols:
+        entry = fundamentals_cache.entry(symbol)
+        if entry is None or not isinstance(entry.value, dict) or "error" in entry.value:
+            missing += 1
+            continue
+        result = entry.value
+        statements = statement_store.get(symbol, entry.stored_at) or statement_store.ingest(symbol, result, entry.stored_at)
+        latest = statements.latest_ratios() if statements is not None else {}
+        info = symbol_registry.get(symbol)
+        market = result.get("market", "")
+        fields = _result_fields(market, result, latest)
+
+        rows.append(symbol)
+        companies.append(result.get("company") or (info.name if info else symbol))
+        markets.append(info.market if info else market.lower())
+        sectors.append(info.sector if info else result.get("sector", "N/A"))
+        signature.append((symbol, entry.stored_at))
+        for name in SCREEN_FIELDS:
+            values[name].append(fields[name])
+
+    return ScreenTable(
+        symbols=rows,
+        companies=companies,
+        markets=np.array(markets, dtype=object),
+        sectors=np.array(sectors, dtype=object),
+        columns={name: np.array(column, dtype=np.float64) for name, column in values.items()},
+        built_at=time.time(),
+        signature=frozenset(signature),
+        missing=missing,
+    )
+
+
+class FundamentalsScreener:
+    """Keeps the screen table current with the fundamentals cache and answers queries from it"""
+
+    def __init__(self, refresh_seconds: float = SCREEN_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._table: Optional[ScreenTable] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def table(self) -> ScreenTable:
+        with self._lock:
+            if self._table is None or time.time() - self._checked_at >= self.refresh_seconds:
+                table = build_screen_table()
+                if self._table is None or table.signature != self._table.signature:
+                    self._table = table
+                    self.builds += 1
+                self._checked_at = time.time()
+            return self._table
+
+    def screen(self, query: Optional[str] = None, market: Optional[str] = None, sector: Optional[str] = None,
+               sort: Optional[str] = None, order: str = "desc", limit: int = 50) -> Dict:
+        """Raises ValueError for a malformed query, an unknown field, or a per-market field without market"""
+        conditions = parse_query(query)
+        if sort is None:
+            sort = DEFAULT_SORT if market else DEFAULT_SORT_ALL_MARKETS
+        sort = field_name(sort)
+        if not market:
+            for name in [sort] + [name for name, _, _ in conditions]:
+                if name in PER_MARKET_FIELDS:
+                    raise ValueError(f"'{name}' is in each market's own unit (INR crore / USD), "
+                                     f"pass market= to filter or sort on it")
+        limit = max(1, min(limit, SCREEN_MAX_RESULTS))
+        table = self.table()
+        rows, matches = table.screen(conditions, market, sector, sort, order.lower() != "asc", limit)
+        return {
+            "query": [f"{name} {op} {value:g}" for name, op, value in conditions],
+            "sort": sort,
+            "order": "asc" if order.lower() == "asc" else "desc",
+            "count": len(rows),
+            "matches": matches,  # Before limit
+            "universe": len(table),
+            "not_cached": table.missing,
+            "built_at": table.built_at,
+            "results": [table.row(i) for i in rows],
+        }
+
+
+fundamentals_screener = FundamentalsScreener()
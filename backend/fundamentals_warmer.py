@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import fundamentals
+from fundamentals import fundamentals_cache, load_fundamentals
+from stocks import INDIA_STOCKS, US_STOCKS
+
+# Background warm-up of the fundamentals cache. A daemon thread walks the symbol
+# universe one fetch at a time and reloads every symbol whose cached result is
+# missing or within FUNDAMENTALS_WARM_MARGIN of expiring, so /fundamentals requests
+# hit a warm cache. Symbols users asked for recently (exponentially decayed request
+# counts) are refreshed first. Screener-backed (Indian) symbols are fetched
+# FUNDAMENTALS_WARM_PACE seconds apart; a US symbol costs one Yahoo token per
+# section, so after one the warmer waits long enough to stay within its share of
+# the token refill rate, and it only starts one while the bucket is full, i.e.
+# user requests aren't waiting on tokens.
+
+FUNDAMENTALS_WARMER = os.getenv("FUNDAMENTALS_WARMER", "true").lower() in ("1", "true", "yes")
+FUNDAMENTALS_WARM_PACE = float(os.getenv("FUNDAMENTALS_WARM_PACE", 15))  # Seconds between upstream fetches (at least)
+# Share of the sustained Yahoo request rate the warmer may use
+FUNDAMENTALS_WARM_YAHOO_SHARE = float(os.getenv("FUNDAMENTALS_WARM_YAHOO_SHARE", 0.25))
+FUNDAMENTALS_WARM_MARGIN = float(os.getenv("FUNDAMENTALS_WARM_MARGIN", 600))  # Refresh this long before expiry
+WARM_START_DELAY = 60  # Let startup and the first live-signals run go first
+WARM_IDLE_SLEEP = 60   # Nothing due: check again after this long
+REQUEST_HALF_LIFE = 24 * 3600  # Request counts halve every day
+
+
+class RequestTracker:
+    """Exponentially decayed request counts per symbol"""
+
+    def __init__(self, half_life: float = REQUEST_HALF_LIFE):
+        self.half_life = half_life
+        self._scores: Dict[str, float] = {}
+        self._updated: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, symbol: str, now: float) -> float:
+        score = self._scores.get(symbol, 0.0)
+        return score * 0.5 ** ((now - self._updated.get(symbol, now)) / self.half_life) if score else 0.0
+
+    def record(self, symbol: str):
+        now = time.time()
+        with self._lock:
+            self._scores[symbol] = self._decayed(symbol, now) + 1.0
+            self._updated[symbol] = now
+
+    def score(self, symbol: str) -> float:
+        with self._lock:
+            return self._decayed(symbol, time.time())
+
+    def top(self, n: int = 10) -> List[Dict]:
+        now = time.time()
+        with self._lock:
+            scores = {symbol: self._decayed(symbol, now) for symbol in self._scores}
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [{"symbol": symbol, "score": round(score, 2)} for symbol, score in ranked]
+
+
+class FundamentalsWarmer:
+    """Keeps the fundamentals cache filled for the whole universe, most requested symbols first"""
+
+    def __init__(self, symbols: Optional[List[str]] = None, pace: float = FUNDAMENTALS_WARM_PACE,
+                 margin: float = FUNDAMENTALS_WARM_MARGIN, yahoo_share: float = FUNDAMENTALS_WARM_YAHOO_SHARE):
+        self.symbols = list(symbols) if symbols is not None else INDIA_STOCKS + US_STOCKS
+        self.pace = pace
+        self.margin = margin
+        self.yahoo_share = yahoo_share
+        self.deferred = False  # Last cycle skipped Yahoo symbols while the token bucket refilled
+        self._due: Optional[List[str]] = None  # Due list of the last cycle, for status()
+        self._due_checked_at: Optional[float] = None
+        self.requests = RequestTracker()
+        self.running = False
+        self.warmed = 0
+        self.failed = 0
+        self.last_symbol: Optional[str] = None
+        self.last_warmed_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record_request(self, symbol: str):
+        self.requests.record(symbol.upper())
+
+    def due(self) -> List[str]:
+        """Symbols missing from the cache or expiring within the margin, highest priority first"""
+        expiring = {}
+        for symbol in self.symbols:
+            entry = fundamentals_cache.entry(symbol)
+            if entry is None:
+                expiring[symbol] = 0.0
+            elif not fundamentals_cache.is_error(entry.value) and entry.remaining() < self.margin:
+                expiring[symbol] = entry.remaining()
+            # A cached failure is retried once its short error TTL has run out
+        # Most requested first; among equals, the one expiring soonest (missing = 0)
+        return sorted(expiring, key=lambda s: (-self.requests.score(s), expiring[s]))
+
+    @staticmethod
+    def _uses_yahoo(symbol: str) -> bool:
+        return not symbol.endswith(".NS")
+
+    @property
+    def yahoo_pace(self) -> float:
+        """Seconds after a Yahoo symbol (one token per section) to use at most yahoo_share of the token rate"""
+        tokens = len(fundamentals.US_SECTION_DEADLINES)
+        return max(self.pace, tokens * fundamentals.MIN_REQUEST_INTERVAL / self.yahoo_share)
+
+    def pace_for(self, symbol: str) -> float:
+        return self.yahoo_pace if self._uses_yahoo(symbol) else self.pace
+
+    def _yahoo_unavailable(self) -> bool:
+        """Circuit breaker open, or the token bucket below burst (user requests are spending it)"""
+        return (time.time() < fundamentals.yahoo_circuit_breaker_until
+                or fundamentals.yahoo_tokens_available() < fundamentals.YAHOO_BURST)
+
+    def warm_one(self) -> Optional[str]:
+        """Refresh the highest-priority due symbol; None if nothing is due (or only Yahoo symbols, deferred)"""
+        due = self.due()
+        self._due, self._due_checked_at = due, time.time()
+        self.deferred = False
+        if self._yahoo_unavailable():
+            # Only screener-backed (Indian) symbols for now
+            screener_due = [s for s in due if not self._uses_yahoo(s)]
+            self.deferred = len(screener_due) < len(due)
+            due = screener_due
+        if not due:
+            return None
+
+        symbol = due[0]
+        try:
+            result = fundamentals_cache.refresh(symbol, lambda: load_fundamentals(symbol))
+            if fundamentals_cache.is_error(result):
+                self.failed += 1
+            else:
+                self.warmed += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"❌ Fundamentals warm-up failed for {symbol}: {e}")
+        self.last_symbol = symbol
+        self.last_warmed_at = time.time()
+        return symbol
+
+    def _run(self):
+        if self._stop.wait(WARM_START_DELAY):
+            return
+        print(f"🔥 Fundamentals warmer started: {len(self.symbols)} symbols, one fetch per {self.pace:g}s "
+              f"({self.yahoo_pace:g}s after a Yahoo symbol)")
+        while not self._stop.is_set():
+            symbol = self.warm_one()
+            if symbol:
+                wait = self.pace_for(symbol)
+            elif self.deferred:
+                wait = self.pace  # Yahoo symbols are due, give the bucket time to fill
+            else:
+                wait = WARM_IDLE_SLEEP
+            self._stop.wait(wait)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="fundamentals-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.running = False
+
+    def status(self) -> Dict:
+        """Counters and the due list of the last cycle (computing it reads every cache entry, so not here)"""
+        due = self._due
+        return {
+            "running": self.running,
+            "symbols": len(self.symbols),
+            "due": len(due) if due is not None else None,
+            "next": due[:5] if due is not None else [],
+            "due_checked_at": self._due_checked_at,
+            "deferred": self.deferred,
+            "warmed": self.warmed,
+            "failed": self.failed,
+            "last_symbol": self.last_symbol,
+            "last_warmed_at": self.last_warmed_at,
+            "pace_seconds": self.pace,
+            "yahoo_pace_seconds": self.yahoo_pace,
+            "most_requested": self.requests.top(5),
+        }
+
+
+fundamentals_warmer = FundamentalsWarmer()
@@ -0,0 +1,311 @@
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+# Incremental versions of AdvancedStockAnalyzer.calculate_rsi / calculate_macd /
+# calculate_bollinger_bands / calculate_volatility. Each state is fed one close
+# at a time (push) and can revise the newest close in place (amend), which is
+# what an intraday refresh of the current daily bar needs. Both are O(1).
+
+# Rebuild running sums from the window every N updates to bound float drift
+RESYNC_EVERY = 1000
+
+
+@dataclass
+class RollingWindow:
+    """Mean and sample variance of the last `size` values (rolling Welford update)"""
+    size: int
+    values: Deque[float] = field(default_factory=deque)
+    mean: float = 0.0
+    m2: float = 0.0  # Sum of squared deviations from the mean
+    updates: int = 0
+
+    def push(self, x: float):
+        if len(self.values) == self.size:
+            self._replace(self.values[0], x)
+            self.values.popleft()
+            self.values.append(x)
+        else:
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+        self._count_update()
+
+    def amend(self, x: float):
+        """Replace the newest value"""
+        old = self.values[-1]
+        self.values[-1] = x
+        self._replace(old, x)
+        self._count_update()
+
+    def _replace(self, old: float, new: float):
+        n = len(self.values)
+        old_mean = self.mean
+        self.mean += (new - old) / n
+        self.m2 += (new - old) * (new - self.mean + old - old_mean)
+
+    def _count_update(self):
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            n = len(self.values)
+            self.mean = sum(self.values) / n
+            self.m2 = sum((v - self.mean) ** 2 for v in self.values)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.size
+
+    @property
+    def total(self) -> float:
+        return self.mean * len(self.values)
+
+    def std(self) -> float:
+        n = len(self.values)
+        if n < 2:
+            return float("nan")
+        # A flat window should give exactly 0 (as pandas does), not float residue
+        if self.m2 <= 1e-12 * max(self.mean * self.mean, 1e-12) * n:
+            return 0.0
+        return math.sqrt(self.m2 / (n - 1))
+
+
+@dataclass
+class EWMState:
+    """pandas ewm(span=...).mean() with adjust=True, as a numerator/denominator recursion"""
+    span: int
+    numerator: float = 0.0
+    denominator: float = 0.0
+    prev_numerator: float = 0.0
+    prev_denominator: float = 0.0
+
+    @property
+    def decay(self) -> float:
+        return 1.0 - 2.0 / (self.span + 1.0)
+
+    def push(self, x: float):
+        self.prev_numerator, self.prev_denominator = self.numerator, self.denominator
+        self.numerator = x + self.decay * self.numerator
+        self.denominator = 1.0 + self.decay * self.denominator
+
+    def amend(self, x: float):
+        self.numerator = x + self.decay * self.prev_numerator
+        self.denominator = 1.0 + self.decay * self.prev_denominator
+
+    @property
+    def value(self) -> float:
+        return self.numerator / self.denominator if self.denominator else float("nan")
+
+
+@dataclass
+class RSIState:
+    """Same definition as calculate_rsi: simple averages of gains and losses over `window` deltas"""
+    window: int = 14
+    count: int = 0
+    last_price: Optional[float] = None
+    prev_price: Optional[float] = None
+    gains: RollingWindow = None
+    losses: RollingWindow = None
+
+    def __post_init__(self):
+        self.gains = self.gains or RollingWindow(self.window)
+        self.losses = self.losses or RollingWindow(self.window)
+
+    def push(self, price: float):
+        if self.last_price is not None:
+            delta = price - self.last_price
+            self.gains.push(max(delta, 0.0))
+            self.losses.push(max(-delta, 0.0))
+        self.prev_price, self.last_price = self.last_price, price
+        self.count += 1
+
+    def amend(self, price: float):
+        if self.prev_price is not None:
+            delta = price - self.prev_price
+            self.gains.amend(max(delta, 0.0))
+            self.losses.amend(max(-delta, 0.0))
+        self.last_price = price
+
+    def value(self) -> float:
+        if self.count < self.window + 1:
+            return 50.0
+        # Exact sums over the (short) window so flat stretches give exactly zero
+        avg_gain = sum(self.gains.values) / self.window
+        avg_loss = sum(self.losses.values) / self.window
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else 50.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+@dataclass
+class MACDState:
+    fast: int = 12
+    slow: int = 26
+    signal: int = 9
+    count: int = 0
+    fast_ema: EWMState = None
+    slow_ema: EWMState = None
+    signal_ema: EWMState = None
+
+    def __post_init__(self):
+        self.fast_ema = self.fast_ema or EWMState(self.fast)
+        self.slow_ema = self.slow_ema or EWMState(self.slow)
+        self.signal_ema = self.signal_ema or EWMState(self.signal)
+
+    def push(self, price: float):
+        self.fast_ema.push(price)
+        self.slow_ema.push(price)
+        self.signal_ema.push(self.fast_ema.value - self.slow_ema.value)
+        self.count += 1
+
+    def amend(self, price: float):
+        self.fast_ema.amend(price)
+        self.slow_ema.amend(price)
+        self.signal_ema.amend(self.fast_ema.value - self.slow_ema.value)
+
+    def value(self) -> Tuple[float, float, float]:
+        if self.count < self.slow + self.signal:
+            return 0.0, 0.0, 0.0
+        macd = self.fast_ema.value - self.slow_ema.value
+        signal_line = self.signal_ema.value
+        return macd, signal_line, macd - signal_line
+
+
+@dataclass
+class BollingerState:
+    window: int = 20
+    std_dev: int = 2
+    last_price: Optional[float] = None
+    prices: RollingWindow = None
+
+    def __post_init__(self):
+        self.prices = self.prices or RollingWindow(self.window)
+
+    def push(self, price: float):
+        self.prices.push(price)
+        self.last_price = price
+
+    def amend(self, price: float):
+        self.prices.amend(price)
+        self.last_price = price
+
+    def value(self) -> Tuple[float, float, float, float]:
+        if not self.prices.full:
+            return self.last_price, self.last_price, self.last_price, 0.5
+        mid = self.prices.mean
+        std = self.prices.std()
+        upper, lower = mid + std * self.std_dev, mid - std * self.std_dev
+        return upper, lower, mid, (self.last_price - lower) / (upper - lower)
+
+
+@dataclass
+class VolatilityState:
+    """Annualized rolling std of per-bar returns, as calculate_volatility"""
+    window: int = 30
+    last_price: Optional[float] = None
+    prev_price: Optional[float] = None
+    returns: RollingWindow = None
+    periods_per_year: int = 252  # Bars per year of the series' interval
+
+    def __post_init__(self):
+        self.returns = self.returns or RollingWindow(self.window)
+
+    def push(self, price: float):
+        if self.last_price is not None:
+            self.returns.push(price / self.last_price - 1)
+        self.prev_price, self.last_price = self.last_price, price
+
+    def amend(self, price: float):
+        if self.prev_price is not None:
+            self.returns.amend(price / self.prev_price - 1)
+        self.last_price = price
+
+    def value(self) -> float:
+        if not self.returns.full:
+            return 0.2
+        volatility = self.returns.std() * math.sqrt(self.periods_per_year)
+        return volatility if not math.isnan(volatility) else 0.2
+
+
+@dataclass
+class IndicatorState:
+    """All incremental close-price indicators for one symbol, plus the bar they are current to"""
+    rsi: RSIState = field(default_factory=RSIState)
+    macd: MACDState = field(default_factory=MACDState)
+    bollinger: BollingerState = field(default_factory=BollingerState)
+    volatility: VolatilityState = field(default_factory=VolatilityState)
+    last_bar: Optional[str] = None  # ISO timestamp of the newest bar pushed
+
+    @classmethod
+    def from_prices(cls, prices: Iterable[float], last_bar: Optional[str] = None,
+                    periods_per_year: int = 252) -> "IndicatorState":
+        state = cls(volatility=VolatilityState(periods_per_year=periods_per_year))
+        for price in prices:
+            state.push(float(price))
+        state.last_bar = last_bar
+        return state
+
+    def _parts(self):
+        return (self.rsi, self.macd, self.bollinger, self.volatility)
+
+    def push(self, price: float, bar: Optional[str] = None):
+        """A new bar closed (or opened) at `price`"""
+        for part in self._parts():
+            part.push(price)
+        if bar is not None:
+            self.last_bar = bar
+
+    def amend(self, price: float):
+        """The newest bar's close moved (intraday refresh of the current bar)"""
+        for part in self._parts():
+            part.amend(price)
+
+    @property
+    def last_price(self) -> Optional[float]:
+        return self.bollinger.last_price
+
+    def to_dict(self) -> Dict:
+        """JSON-safe snapshot, restorable with from_dict"""
+        return _encode(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "IndicatorState":
+        return cls(
+            rsi=_decode_rsi(data["rsi"]),
+            macd=_decode_macd(data["macd"]),
+            bollinger=_decode_bollinger(data["bollinger"]),
+            volatility=_decode_volatility(data["volatility"]),
+            last_bar=data.get("last_bar"),
+        )
+
+
+def _encode(value):
+    if isinstance(value, deque):
+        return list(value)
+    if hasattr(value, "__dataclass_fields__"):
+        return {name: _encode(getattr(value, name)) for name in value.__dataclass_fields__}
+    return value
+
+
+def _decode_window(data: Dict) -> RollingWindow:
+    return RollingWindow(data["size"], deque(data["values"]), data["mean"], data["m2"], data["updates"])
+
+
+def _decode_rsi(data: Dict) -> RSIState:
+    return RSIState(data["window"], data["count"], data["last_price"], data["prev_price"],
+                    _decode_window(data["gains"]), _decode_window(data["losses"]))
+
+
+def _decode_macd(data: Dict) -> MACDState:
+    return MACDState(data["fast"], data["slow"], data["signal"], data["count"],
+                     EWMState(**data["fast_ema"]), EWMState(**data["slow_ema"]), EWMState(**data["signal_ema"]))
+
+
+def _decode_bollinger(data: Dict) -> BollingerState:
+    return BollingerState(data["window"], data["std_dev"], data["last_price"], _decode_window(data["prices"]))
+
+
+def _decode_volatility(data: Dict) -> VolatilityState:
+    return VolatilityState(data["window"], data["last_price"], data["prev_price"], _decode_window(data["returns"]),
+                           data.get("periods_per_year", 252))
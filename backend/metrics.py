@@ -0,0 +1,188 @@
+import asyncio
+import time
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+# Histogram buckets in seconds, from cheap indicator math up to slow upstream retries
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_HELP = {
+    "analyzer_stage_seconds": "Time spent in each get_comprehensive_signal stage",
+    "analyzer_wait_seconds_total": "Seconds slept for rate limiting and retries",
+    "analyzer_waits_total": "Number of rate-limit and retry sleeps",
+    "upstream_requests_total": "Calls made to Yahoo, news and sentiment providers",
+    "upstream_request_seconds": "Latency of upstream provider calls",
+    "http_requests_total": "HTTP requests served",
+    "http_request_seconds": "HTTP request latency",
+    "page_cache_requests_total": "Scraped page lookups by outcome (hit, revalidated, download, stale)",
+    "result_cache_requests_total": "Result cache lookups by cache and outcome (hit, disk, load, refresh, coalesced)",
+    "admission_total": "Requests per endpoint by admission outcome (admitted, queue_full, timeout)",
+    "rate_limit_rejections_total": "Requests refused with 429, by the limit that refused them (global, route)",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Process-wide counters and histograms, rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = defaultdict(dict)
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.counters[name][key] += value
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            histogram = self.histograms[name].get(key)
+            if histogram is None:
+                histogram = self.histograms[name][key] = Histogram()
+            histogram.observe(value)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_labels(key)} {value:g}")
+
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(key, le=f'{bound:g}')} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(key, le='+Inf')} {histogram.count}")
+                    lines.append(f"{name}_sum{_labels(key)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key: LabelKey, **extra) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+metrics = MetricsRegistry()
+
+# StageTimings of the request the current thread is working for, if any
+_current_timings: ContextVar[Optional["StageTimings"]] = ContextVar("current_timings", default=None)
+
+
+class StageTimings:
+    """Per-analysis breakdown: stage durations, upstream calls and sleep totals"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, float] = {}
+        self.upstream_calls: Dict[str, int] = defaultdict(int)
+        self.waits: Dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def stage(self, name: str):
+        token = _current_timings.set(self)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_timings.reset(token)
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            metrics.observe("analyzer_stage_seconds", elapsed, stage=name)
+
+    def timed(self, name: str, fn, *args, **kwargs):
+        """Run fn as a named stage (usable as an executor.submit target)"""
+        with self.stage(name):
+            return fn(*args, **kwargs)
+
+    def add_upstream_call(self, kind: str):
+        with self._lock:
+            self.upstream_calls[kind] += 1
+
+    def add_wait(self, reason: str, seconds: float):
+        with self._lock:
+            self.waits[reason] += seconds
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "stages": {k: round(v, 4) for k, v in self.stages.items()},
+                "upstream_calls": dict(self.upstream_calls),
+                "waits": {k: round(v, 3) for k, v in self.waits.items()},
+            }
+
+
+@contextmanager
+def stage_timer(name: str):
+    """Time a stage that is not tied to a single analysis (e.g. batched sentiment)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe("analyzer_stage_seconds", time.perf_counter() - start, stage=name)
+
+
+def record_upstream_call(kind: str, seconds: float, ok: bool = True):
+    metrics.inc("upstream_requests_total", kind=kind, outcome="ok" if ok else "error")
+    metrics.observe("upstream_request_seconds", seconds, kind=kind)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add_upstream_call(kind)
+
+
+def _record_wait(reason: str, seconds: float):
+    metrics.inc("analyzer_waits_total", reason=reason)
+    metrics.inc("analyzer_wait_seconds_total", seconds, reason=reason)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add_wait(reason, seconds)
+
+
+def timed_sleep(reason: str, seconds: float):
+    """time.sleep that is accounted for as a rate-limit or retry wait"""
+    _record_wait(reason, seconds)
+    time.sleep(seconds)
+
+
+async def timed_sleep_async(reason: str, seconds: float):
+    """timed_sleep for coroutines: waits without holding a thread"""
+    _record_wait(reason, seconds)
+    await asyncio.sleep(seconds)
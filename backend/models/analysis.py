@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+from typing import List
+
+class BatchAnalyzeRequest(BaseModel):
+    symbols: List[str]
+    stream: bool = False  # Stream newline-delimited JSON, one result per line
@@ -1,6 +1,6 @@
 import os
-import requests
-import yfinance as yf
+import sys
+import asyncio
 import pandas as pd
 import numpy as np
 from dotenv import load_dotenv
@@ -10,8 +10,18 @@ from datetime import datetime, timedelta
 import warnings
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, field, fields
+import contextvars
+from contextlib import contextmanager
 import json
+from price_store import price_store, slice_period, STORE_INITIAL_PERIOD, DAILY_INTERVAL, INTERVALS
+from data_providers import get_data_provider
+from metrics import StageTimings, stage_timer, timed_sleep, timed_sleep_async
+from concurrency import run_blocking
+from indicators import IndicatorState
+from batch_technicals import build_price_matrix, compute_indicators
+from sector_analytics import SectorSnapshot, compute_sector_snapshot, get_sector_snapshot, set_sector_snapshot
 
 warnings.filterwarnings('ignore')
 load_dotenv()
@@ -22,7 +32,28 @@ HF_TOKEN = os.getenv("HF_API_TOKEN")
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 ALPHA_VANTAGE_KEY = os.getenv("ALPHAVANTAGE_KEY")
 
-@dataclass
+# Market-wide RSS feeds scanned for Indian symbols
+INDIAN_RSS_FEEDS = [
+    "https://economictimes.indiatimes.com/markets/stocks/rssfeeds/2146842.cms",
+    "https://www.business-standard.com/rss/markets-106.rss"
+]
+
+# Max headlines per HuggingFace inference request in batch mode
+SENTIMENT_BATCH_SIZE = 16
+
+# HuggingFace requests in flight per symbol on the async (/analyze) path
+SENTIMENT_CONCURRENCY = 4
+
+# Seconds the stored daily bars may age before the current price needs a delta refresh
+CURRENT_PRICE_MAX_AGE = 300
+
+# Symbols per yf.download call on the bulk (multi-ticker) history path
+BULK_DOWNLOAD_CHUNK_SIZE = 50
+
+# Combined-score points added (GREED) or removed (FEAR) by broad market sentiment
+MARKET_SENTIMENT_TILT = 5.0
+
+@dataclass(slots=True)
 class MarketContext:
     """Market regime and context information"""
     volatility_regime: str  # LOW, MEDIUM, HIGH
@@ -30,7 +61,7 @@ class MarketContext:
     sector_rotation: str    # GROWTH, VALUE, DEFENSIVE
     market_sentiment: str   # FEAR, GREED, NEUTRAL
 
-@dataclass
+@dataclass(slots=True)
 class TechnicalSignals:
     """Container for all technical indicators"""
     rsi: float
@@ -43,7 +74,7 @@ class TechnicalSignals:
     support_level: float
     resistance_level: float
 
-@dataclass
+@dataclass(slots=True)
 class SignalResult:
     """Complete signal analysis result"""
     symbol: str
@@ -63,6 +94,56 @@ class SignalResult:
     analysis: List[Dict]
     backtest_metrics: Dict
     error: Optional[str]
+    timings: Dict = field(default_factory=dict)  # Per-stage seconds, upstream calls and waits
+    interval: str = DAILY_INTERVAL  # Bar interval the technicals were computed on
+    labels: Dict = field(default_factory=dict)  # Display labels, derived once from the scores (signal_labels)
+    encoded: Optional[bytes] = None  # /analyze JSON body, filled in by serialization.analysis_json
+
+    def __post_init__(self):
+        if not self.labels:
+            self.labels = signal_labels(self)
+
+def signal_labels(result) -> Dict:
+    """Label fields of the /analyze response for one result, derived from its scores.
+    Works on SignalResult and on signal_table's SignalView alike."""
+    ts = result.technical_signals
+    return {
+        "confidence_text": f"{result.confidence:.1f}%",
+        "rsi_signal": "OVERSOLD" if ts.rsi < 30 else "OVERBOUGHT" if ts.rsi > 70 else "NEUTRAL",
+        "macd_trend": "BULLISH" if ts.macd > ts.macd_signal else "BEARISH",
+        "bollinger_signal": "OVERSOLD" if ts.bb_position < 0.2 else "OVERBOUGHT" if ts.bb_position > 0.8 else "NEUTRAL",
+        "volume_signal": "HIGH" if ts.volume_ratio > 1.5 else "LOW" if ts.volume_ratio < 0.7 else "NORMAL",
+        "volatility_percent": f"{ts.volatility * 100:.1f}%",
+        "momentum_signal": "POSITIVE" if ts.price_momentum > 2 else "NEGATIVE" if ts.price_momentum < -2 else "NEUTRAL",
+        "sentiment_signal": "POSITIVE" if result.sentiment_score > 20 else "NEGATIVE" if result.sentiment_score < -20 else "NEUTRAL",
+        "risk_level": "HIGH" if result.risk_score > 70 else "MEDIUM" if result.risk_score > 40 else "LOW",
+        "risk_reward_ratio": round((result.take_profit - result.entry_price) / (result.entry_price - result.stop_loss), 2) if result.entry_price > result.stop_loss else 0,
+        "buy_probability": max(0, result.confidence) if result.signal in ["BUY", "STRONG_BUY"] else 0,
+        "sell_probability": max(0, result.confidence) if result.signal in ["SELL", "STRONG_SELL"] else 0,
+        "hold_probability": max(0, result.confidence) if result.signal == "HOLD" else 0,
+        "technical_strength": "STRONG" if abs(result.technical_score) > 50 else "MODERATE" if abs(result.technical_score) > 25 else "WEAK",
+        "sentiment_strength": "STRONG" if abs(result.sentiment_score) > 50 else "MODERATE" if abs(result.sentiment_score) > 25 else "WEAK",
+        "investment_grade": "A" if result.confidence > 80 and result.risk_score < 40 else "B" if result.confidence > 60 and result.risk_score < 60 else "C" if result.confidence > 40 else "D",
+        "signal_emoji": "🚀 STRONG_BUY" if result.signal == "STRONG_BUY" else "📈 BUY" if result.signal == "BUY" else "⏸️ HOLD" if result.signal == "HOLD" else "📉 SELL" if result.signal == "SELL" else "🔻 STRONG_SELL",
+        "confidence_emoji": "🎯 HIGH_CONFIDENCE" if result.confidence > 80 else "✅ MODERATE_CONFIDENCE" if result.confidence > 60 else "⚠️ LOW_CONFIDENCE" if result.confidence > 40 else "❌ WEAK_CONFIDENCE",
+        "risk_emoji": "🔴 HIGH_RISK" if result.risk_score > 70 else "🟡 MEDIUM_RISK" if result.risk_score > 40 else "🟢 LOW_RISK",
+        "trend_emoji": "📈 BULLISH" if result.market_context.trend_direction == "BULL" else "📉 BEARISH" if result.market_context.trend_direction == "BEAR" else "➡️ NEUTRAL",
+    }
+
+# Bars bulk-loaded by prefetch_history for the run executing in this context. Each batch
+# run has its own context (copied into its worker threads), so concurrent runs never see
+# or drop each other's frames.
+_prefetched_history: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("prefetched_history", default=None)
+
+def _run_context(frames: Dict) -> contextvars.Context:
+    """A copy of the current context in which `frames` are the prefetched bars"""
+    context = contextvars.copy_context()
+    context.run(_prefetched_history.set, frames)
+    return context
+
+def _submit(executor, fn, *args):
+    """executor.submit in a copy of the caller's context, so the worker sees the run's prefetched bars"""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
 
 class AdvancedStockAnalyzer:
     def __init__(self):
@@ -70,21 +151,44 @@ class AdvancedStockAnalyzer:
         self.market_data = {}
         self.last_request_time = 0
         self.min_request_interval = 2  # Minimum 2 seconds between requests
+        if get_data_provider().offline:
+            self.min_request_interval = 0  # Replayed data needs no Yahoo throttling
+        self.price_store = price_store  # On-disk daily bars, delta-refreshed
+        self.indicator_states = {}  # symbol (or (symbol, interval) for intraday) -> IndicatorState, advanced bar by bar
+        self._indicator_lock = threading.Lock()
     
-    def _fetch_stock_data_with_retry(self, symbol: str, max_retries: int = 3):
-        """Fetch stock data with comprehensive retry logic and rate limiting"""
-        import time
-        import requests
-        
-        # Rate limiting
+    def _wait_for_request_slot(self):
+        """Keep at least min_request_interval between Yahoo requests"""
         current_time = time.time()
         time_since_last = current_time - self.last_request_time
         if time_since_last < self.min_request_interval:
             sleep_time = self.min_request_interval - time_since_last
             print(f"Rate limiting: waiting {sleep_time:.1f} seconds")
-            time.sleep(sleep_time)
+            timed_sleep("rate_limit", sleep_time)
         
         self.last_request_time = time.time()
+    
+    def _fetch_stock_data_with_retry(self, symbol: str, max_retries: int = 3):
+        """Fetch stock data with comprehensive retry logic and rate limiting"""
+        
+        # Bulk-loaded bars already hold the latest close, no request needed
+        prefetched = self.prefetched_history
+        if symbol in prefetched:
+            return slice_period(prefetched[symbol], "5d")
+        
+        # The local store only asks Yahoo for bars newer than its last stored date, and
+        # only that request (never a fresh store hit) waits for a request slot
+        try:
+            if self.price_store.is_stale(symbol, CURRENT_PRICE_MAX_AGE):
+                self._wait_for_request_slot()
+            hist = self.price_store.get_history(symbol, "5d", max_age=CURRENT_PRICE_MAX_AGE)
+            if hist is not None and not hist.empty:
+                return hist
+        except Exception as e:
+            print(f"❌ Price store lookup failed for {symbol}: {str(e)}")
+        
+        # Store miss: direct requests, rate limited
+        self._wait_for_request_slot()
         
         # Try different approaches
         approaches = [
@@ -111,14 +215,13 @@ class AdvancedStockAnalyzer:
                     # Wait before next attempt
                     wait_time = (attempt + 1) * 2
                     print(f"Waiting {wait_time} seconds before next attempt...")
-                    time.sleep(wait_time)
+                    timed_sleep("price_retry", wait_time)
         
         return None
     
     def _fetch_with_standard_yfinance(self, symbol: str):
         """Standard yfinance fetch"""
-        stock = yf.Ticker(symbol)
-        return stock.history(period="5d")
+        return get_data_provider().history(symbol, period="5d")
     
     def _fetch_with_custom_session(self, symbol: str):
         """Fetch with custom session and headers"""
@@ -133,8 +236,7 @@ class AdvancedStockAnalyzer:
             'Connection': 'keep-alive',
         })
         
-        stock = yf.Ticker(symbol, session=session)
-        return stock.history(period="1mo")
+        return get_data_provider().history(symbol, session=session, period="1mo")
     
     def _fetch_with_fallback_periods(self, symbol: str):
         """Try different time periods"""
@@ -145,13 +247,13 @@ class AdvancedStockAnalyzer:
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
         })
         
-        stock = yf.Ticker(symbol, session=session)
+        provider = get_data_provider()
         
         # Try different periods
         periods = ["1d", "5d", "1mo", "3mo"]
         for period in periods:
             try:
-                hist = stock.history(period=period)
+                hist = provider.history(symbol, session=session, period=period)
                 if not hist.empty:
                     return hist
             except:
@@ -159,6 +261,121 @@ class AdvancedStockAnalyzer:
         
         return None
         
+    # ===================== BULK PRICE HISTORY =====================
+    
+    def fetch_bulk_history(self, symbols: List[str], period: str = STORE_INITIAL_PERIOD, start: Optional[str] = None,
+                           interval: str = DAILY_INTERVAL, chunk_size: int = BULK_DOWNLOAD_CHUNK_SIZE,
+                           max_retries: int = 2) -> Dict[str, pd.DataFrame]:
+        """Download bars for many symbols with one yf.download call per chunk"""
+        frames = {}
+        # Either a trailing period or everything since `start` (delta refresh)
+        window = {"start": start} if start else {"period": period}
+        if interval != DAILY_INTERVAL:
+            window["interval"] = interval
+        
+        for offset in range(0, len(symbols), chunk_size):
+            chunk = symbols[offset:offset + chunk_size]
+            
+            for attempt in range(max_retries + 1):
+                try:
+                    self._wait_for_request_slot()
+                    print(f"📦 Bulk download of {len(chunk)} symbols ({start or period}, {interval})")
+                    data = get_data_provider().download(
+                        chunk, group_by="ticker", auto_adjust=True,
+                        threads=True, progress=False, **window
+                    )
+                    frames.update(self._split_bulk_frame(data, chunk))
+                    break
+                except Exception as e:
+                    print(f"❌ Bulk download attempt {attempt + 1} failed: {str(e)}")
+                    if attempt < max_retries:
+                        wait_time = (attempt + 1) * 2
+                        print(f"Waiting {wait_time} seconds before retrying chunk...")
+                        timed_sleep("bulk_retry", wait_time)
+        
+        # Symbols the bulk path missed get one single-ticker attempt each
+        missing = [s for s in symbols if s not in frames]
+        if missing:
+            print(f"↩️ Falling back to single-ticker fetch for {len(missing)} symbols")
+        for symbol in missing:
+            try:
+                self._wait_for_request_slot()
+                hist = get_data_provider().history(symbol, **window)
+                if hist is not None and not hist.empty:
+                    frames[symbol] = hist
+            except Exception as e:
+                print(f"❌ Single-ticker fallback failed for {symbol}: {str(e)}")
+        
+        print(f"✅ Bulk history ready for {len(frames)}/{len(symbols)} symbols")
+        return frames
+    
+    def _split_bulk_frame(self, data: Optional[pd.DataFrame], chunk: List[str]) -> Dict[str, pd.DataFrame]:
+        """Split a yf.download result into per-symbol OHLCV frames, skipping empty ones"""
+        frames = {}
+        if data is None or data.empty:
+            return frames
+        
+        if not isinstance(data.columns, pd.MultiIndex):
+            # Single-ticker downloads come back with flat columns
+            if len(chunk) == 1:
+                frame = data.dropna(how="all")
+                if not frame.empty and "Close" in frame:
+                    frames[chunk[0]] = frame
+            return frames
+        
+        available = set(data.columns.get_level_values(0))
+        for symbol in chunk:
+            if symbol not in available:
+                continue
+            frame = data[symbol].dropna(how="all")
+            if not frame.empty and frame["Close"].notna().any():
+                frames[symbol] = frame
+        return frames
+    
+    @property
+    def prefetched_history(self) -> Dict:
+        """symbol (or (symbol, interval) for intraday) -> bars loaded for the current run; empty outside one"""
+        frames = _prefetched_history.get()
+        return frames if frames is not None else {}
+    
+    def prefetch_history(self, symbols: List[str], interval: str = DAILY_INTERVAL,
+                         frames: Optional[Dict] = None) -> Dict:
+        """Delta-refresh the price store in bulk, then load the bars for a run into memory (into frames, if given)"""
+        frames = {} if frames is None else frames
+        store = self.price_store.for_interval(interval)
+        try:
+            store.refresh_many(symbols, self.fetch_bulk_history)
+        except Exception as e:
+            print(f"❌ Bulk price store refresh failed: {str(e)}")
+        
+        for symbol in symbols:
+            if store.has(symbol):
+                frames[self._history_key(symbol, interval)] = store.read(symbol)
+        return frames
+    
+    @contextmanager
+    def prefetched(self, frames: Dict):
+        """Serve history from frames inside the block (benchmarks, callers that aren't generators)"""
+        token = _prefetched_history.set(frames)
+        try:
+            yield frames
+        finally:
+            _prefetched_history.reset(token)
+    
+    @staticmethod
+    def _history_key(symbol: str, interval: str = DAILY_INTERVAL):
+        """Key for prefetched bars and indicator state: the bare symbol for daily bars"""
+        return symbol if interval == DAILY_INTERVAL else (symbol, interval)
+    
+    def _get_history(self, symbol: str, period: str, interval: str = DAILY_INTERVAL) -> pd.DataFrame:
+        """Bars for `period` from the batch prefetch or the local price store"""
+        key = self._history_key(symbol, interval)
+        prefetched = self.prefetched_history
+        if key in prefetched:
+            return slice_period(prefetched[key], period)
+        
+        return self.price_store.for_interval(interval).get_history(symbol, period)
+    
     # ===================== TECHNICAL ANALYSIS =====================
     
     def calculate_rsi(self, prices: pd.Series, window: int = 14) -> float:
@@ -216,13 +433,13 @@ class AdvancedStockAnalyzer:
         
         return float(recent_volume / avg_volume) if avg_volume > 0 else 1.0
     
-    def calculate_volatility(self, prices: pd.Series, window: int = 30) -> float:
+    def calculate_volatility(self, prices: pd.Series, window: int = 30, periods_per_year: int = 252) -> float:
         """Annualized volatility calculation"""
         if len(prices) < window:
             return 0.2
             
         returns = prices.pct_change().dropna()
-        volatility = returns.rolling(window).std().iloc[-1] * np.sqrt(252)
+        volatility = returns.rolling(window).std().iloc[-1] * np.sqrt(periods_per_year)
         
         return float(volatility) if not pd.isna(volatility) else 0.2
     
@@ -240,26 +457,48 @@ class AdvancedStockAnalyzer:
         
         return support, resistance
     
-    def get_technical_signals(self, symbol: str) -> TechnicalSignals:
-        """Comprehensive technical analysis"""
+    def _advance_indicator_state(self, symbol: str, prices: pd.Series, interval: str = DAILY_INTERVAL) -> Tuple:
+        """RSI, MACD, Bollinger and volatility from the symbol's incremental state, pushing only unseen bars"""
+        key = self._history_key(symbol, interval)
+        with self._indicator_lock:
+            state = self.indicator_states.get(key)
+            position = None
+            if state is not None and state.last_bar is not None:
+                try:
+                    position = prices.index.get_loc(pd.Timestamp(state.last_bar))
+                except (KeyError, TypeError):
+                    position = None  # Gap or different tz convention: rebuild below
+            
+            if isinstance(position, int):
+                # The newest stored bar may have been a partial (intraday) one
+                if float(prices.iloc[position]) != state.last_price:
+                    state.amend(float(prices.iloc[position]))
+                for timestamp, price in prices.iloc[position + 1:].items():
+                    state.push(float(price), timestamp.isoformat())
+            else:
+                state = IndicatorState.from_prices(prices.to_numpy(dtype=float), prices.index[-1].isoformat(),
+                                                   periods_per_year=INTERVALS[interval]["bars_per_year"])
+                self.indicator_states[key] = state
+            
+            return state.rsi.value(), state.macd.value(), state.bollinger.value(), state.volatility.value()
+    
+    def get_technical_signals(self, symbol: str, interval: str = DAILY_INTERVAL) -> TechnicalSignals:
+        """Comprehensive technical analysis on `interval` bars"""
         try:
-            stock = yf.Ticker(symbol)
-            hist = stock.history(period="6mo")
+            hist = self._get_history(symbol, INTERVALS[interval]["window"], interval)
             
             if hist.empty:
                 return self._default_technical_signals()
             
             prices = hist['Close']
             
-            # Calculate all indicators
-            rsi = self.calculate_rsi(prices)
-            macd, macd_signal, macd_hist = self.calculate_macd(prices)
-            bb_upper, bb_lower, bb_mid, bb_position = self.calculate_bollinger_bands(prices)
+            # Calculate all indicators (close-based ones incrementally, O(1) per new bar)
+            rsi, (macd, macd_signal, macd_hist), (bb_upper, bb_lower, bb_mid, bb_position), volatility = \
+                self._advance_indicator_state(symbol, prices, interval)
             volume_ratio = self.calculate_volume_analysis(hist)
-            volatility = self.calculate_volatility(prices)
             support, resistance = self.calculate_support_resistance(hist)
             
-            # Price momentum (20-day change)
+            # Price momentum (20-bar change)
             price_momentum = float((prices.iloc[-1] / prices.iloc[-20] - 1) * 100) if len(prices) >= 20 else 0.0
             
             return TechnicalSignals(
@@ -278,6 +517,36 @@ class AdvancedStockAnalyzer:
             print(f"Error in technical analysis for {symbol}: {e}")
             return self._default_technical_signals()
     
+    def get_technical_signals_batch(self, symbols: List[str], interval: str = DAILY_INTERVAL) -> Dict[str, TechnicalSignals]:
+        """TechnicalSignals for many symbols from one vectorized pass over a symbols x time matrix"""
+        histories = {}
+        for symbol in symbols:
+            try:
+                hist = self._get_history(symbol, INTERVALS[interval]["window"], interval)
+                if not hist.empty:
+                    histories[symbol] = hist
+            except Exception as e:
+                print(f"Error loading history for {symbol}: {e}")
+        
+        matrix = build_price_matrix(histories)
+        values = compute_indicators(matrix, periods_per_year=INTERVALS[interval]["bars_per_year"])
+        field_names = [f.name for f in fields(TechnicalSignals)]
+        
+        signals = {}
+        for row, symbol in enumerate(matrix.symbols):
+            if not values["vectorized"][row]:
+                # Gaps in the series: the per-symbol pandas path defines the result
+                signals[symbol] = self.get_technical_signals(symbol, interval)
+            elif values["default"][row]:
+                signals[symbol] = self._default_technical_signals()
+            else:
+                signals[symbol] = TechnicalSignals(**{name: float(values[name][row]) for name in field_names})
+        
+        for symbol in symbols:
+            if symbol not in signals:
+                signals[symbol] = self._default_technical_signals()
+        return signals
+    
     def _default_technical_signals(self) -> TechnicalSignals:
         """Default technical signals for error cases"""
         return TechnicalSignals(
@@ -289,13 +558,13 @@ class AdvancedStockAnalyzer:
     
     # ===================== IMPROVED SENTIMENT ANALYSIS =====================
 
-    def scrape_news(self, symbol: str) -> List[str]:
+    def scrape_news(self, symbol: str, feed_snapshot: Optional[Dict[str, List[str]]] = None) -> List[str]:
         """Enhanced news scraping with quality filtering"""
         headlines = []
         
         # Indian stocks
         if symbol.endswith((".NS", ".BO")):
-            headlines.extend(self._scrape_indian_news(symbol))
+            headlines.extend(self._scrape_indian_news(symbol, feed_snapshot))
         else:
             # US stocks
             headlines.extend(self._scrape_us_news(symbol))
@@ -363,16 +632,98 @@ class AdvancedStockAnalyzer:
         
         return filtered
 
-    def _scrape_indian_news(self, symbol: str) -> List[str]:
+    @staticmethod
+    def _rss_titles(content: bytes, limit: int) -> List[str]:
+        """Stripped titles of the first `limit` items of an RSS document"""
+        soup = BeautifulSoup(content, "xml")
+        return [item.title.text.strip() for item in soup.find_all("item")[:limit] if item.title]
+
+    @staticmethod
+    def _google_news_url(query: str, region: bool = True) -> str:
+        if region:
+            return f"https://news.google.com/rss/search?q={query}&hl=en&gl=IN&ceid=IN:en"
+        return f"https://news.google.com/rss/search?q={query}&hl=en"
+
+    @staticmethod
+    def _indian_news_queries(base_symbol: str) -> List[str]:
+        return [
+            f'"{base_symbol}" earnings profit revenue',
+            f'"{base_symbol}" stock news India',
+            f'"{base_symbol}" announcement results'
+        ]
+
+    @staticmethod
+    def _us_news_queries(symbol: str) -> List[str]:
+        return [
+            f"{symbol} earnings",
+            f"{symbol} stock news",
+            f"{symbol} financial results"
+        ]
+
+    @staticmethod
+    def _newsapi_params(query: str) -> Dict:
+        return {
+            "q": query,
+            "apiKey": NEWS_API_KEY,
+            "sortBy": "publishedAt",
+            "pageSize": 3,
+            "language": "en",
+            "domains": "reuters.com,bloomberg.com,cnbc.com,marketwatch.com"
+        }
+
+    @staticmethod
+    def _newsapi_titles(response) -> List[str]:
+        news = response.json()
+        if 'articles' in news and news['articles']:
+            return [article['title'] for article in news['articles'] if article.get('title')]
+        return []
+
+    @staticmethod
+    def _alpha_vantage_params(symbol: str) -> Dict:
+        return {
+            "function": "NEWS_SENTIMENT",
+            "tickers": symbol,
+            "apikey": ALPHA_VANTAGE_KEY,
+            "limit": 5
+        }
+
+    @staticmethod
+    def _alpha_vantage_titles(response) -> List[str]:
+        if response.status_code != 200:
+            return []
+        data = response.json()
+        return [item['title'] for item in data.get('feed', []) if 'title' in item]
+
+    @staticmethod
+    def _fallback_news_terms(base_symbol: str) -> List[str]:
+        return [
+            f"{base_symbol} company news today",
+            f"{base_symbol} stock latest news",
+            f"{base_symbol} quarterly results"
+        ]
+
+    def fetch_feed_snapshot(self) -> Dict[str, List[str]]:
+        """Fetch the shared market RSS feeds once so a batch can reuse them"""
+        snapshot = {}
+        for feed_url in INDIAN_RSS_FEEDS:
+            try:
+                response = get_data_provider().http_get(feed_url, timeout=10)
+                snapshot[feed_url] = self._rss_titles(response.content, 5)
+            except Exception as e:
+                print(f"RSS snapshot failed for {feed_url}: {e}")
+                snapshot[feed_url] = []
+        return snapshot
+
+    def _scrape_indian_news(self, symbol: str, feed_snapshot: Optional[Dict[str, List[str]]] = None) -> List[str]:
         """Improved Indian stock news scraping with multiple methods"""
         headlines = []
         base_symbol = symbol.replace(".NS", "").replace(".BO", "")
         
         # Method 1: Try yfinance first (most reliable)
         try:
-            stock = yf.Ticker(symbol)
-            if hasattr(stock, 'news') and stock.news:
-                for item in stock.news[:5]:
+            news = get_data_provider().news(symbol)
+            if news:
+                for item in news[:5]:
                     if 'title' in item and item['title']:
                         headlines.append(item['title'])
         except Exception as e:
@@ -381,28 +732,18 @@ class AdvancedStockAnalyzer:
         # Method 2: Google News with better queries
         try:
             # Get company name for better search
-            company_queries = [
-                f'"{base_symbol}" earnings profit revenue',
-                f'"{base_symbol}" stock news India',
-                f'"{base_symbol}" announcement results'
-            ]
+            company_queries = self._indian_news_queries(base_symbol)
             
             for query in company_queries:
                 try:
-                    url = f"https://news.google.com/rss/search?q={query}&hl=en&gl=IN&ceid=IN:en"
-                    response = requests.get(url, timeout=10, headers={
+                    response = get_data_provider().http_get(self._google_news_url(query), timeout=10, headers={
                         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
                     })
                     response.raise_for_status()
                     
-                    soup = BeautifulSoup(response.content, "xml")
-                    items = soup.find_all("item")
-                    
-                    for item in items[:3]:
-                        if item.title and item.title.text:
-                            title = item.title.text.strip()
-                            if len(title) > 20 and len(title) < 120:
-                                headlines.append(title)
+                    for title in self._rss_titles(response.content, 3):
+                        if len(title) > 20 and len(title) < 120:
+                            headlines.append(title)
                                 
                 except Exception as e:
                     continue
@@ -410,25 +751,15 @@ class AdvancedStockAnalyzer:
         except Exception as e:
             print(f"Google News failed for {symbol}: {e}")
         
-        # Method 3: Alternative RSS feeds
+        # Method 3: Alternative RSS feeds (shared across symbols, so reuse a snapshot if given)
         try:
-            rss_feeds = [
-                f"https://economictimes.indiatimes.com/markets/stocks/rssfeeds/2146842.cms",
-                f"https://www.business-standard.com/rss/markets-106.rss"
-            ]
+            if feed_snapshot is None:
+                feed_snapshot = self.fetch_feed_snapshot()
             
-            for feed_url in rss_feeds:
-                try:
-                    response = requests.get(feed_url, timeout=10)
-                    soup = BeautifulSoup(response.content, "xml")
-                    items = soup.find_all("item")
-                    
-                    for item in items[:5]:
-                        if item.title and base_symbol.lower() in item.title.text.lower():
-                            headlines.append(item.title.text.strip())
-                            
-                except Exception as e:
-                    continue
+            for titles in feed_snapshot.values():
+                for title in titles:
+                    if base_symbol.lower() in title.lower():
+                        headlines.append(title)
                     
         except Exception as e:
             print(f"RSS feeds failed for {symbol}: {e}")
@@ -442,33 +773,17 @@ class AdvancedStockAnalyzer:
         # Method 1: News API with better queries
         try:
             if NEWS_API_KEY:
-                queries = [
-                    f"{symbol} earnings",
-                    f"{symbol} stock news",
-                    f"{symbol} financial results"
-                ]
+                queries = self._us_news_queries(symbol)
                 
                 for query in queries:
                     try:
-                        response = requests.get(
+                        response = get_data_provider().http_get(
                             "https://newsapi.org/v2/everything",
-                            params={
-                                "q": query,
-                                "apiKey": NEWS_API_KEY,
-                                "sortBy": "publishedAt",
-                                "pageSize": 3,
-                                "language": "en",
-                                "domains": "reuters.com,bloomberg.com,cnbc.com,marketwatch.com"
-                            },
+                            params=self._newsapi_params(query),
                             timeout=10
                         )
                         response.raise_for_status()
-                        
-                        news = response.json()
-                        if 'articles' in news and news['articles']:
-                            for article in news['articles']:
-                                if article.get('title'):
-                                    headlines.append(article['title'])
+                        headlines.extend(self._newsapi_titles(response))
                                     
                     except Exception as e:
                         continue
@@ -480,20 +795,8 @@ class AdvancedStockAnalyzer:
         try:
             if ALPHA_VANTAGE_KEY:
                 url = f"https://www.alphavantage.co/query"
-                params = {
-                    "function": "NEWS_SENTIMENT",
-                    "tickers": symbol,
-                    "apikey": ALPHA_VANTAGE_KEY,
-                    "limit": 5
-                }
-                
-                response = requests.get(url, params=params, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'feed' in data:
-                        for item in data['feed']:
-                            if 'title' in item:
-                                headlines.append(item['title'])
+                response = get_data_provider().http_get(url, params=self._alpha_vantage_params(symbol), timeout=10)
+                headlines.extend(self._alpha_vantage_titles(response))
                                 
         except Exception as e:
             print(f"Alpha Vantage news failed for {symbol}: {e}")
@@ -505,22 +808,8 @@ class AdvancedStockAnalyzer:
         headlines = []
         
         try:
-            stock = yf.Ticker(symbol)
-            
-            # Try multiple yfinance attributes
-            news_sources = []
-            
-            # Primary news attribute
-            if hasattr(stock, 'news') and stock.news:
-                news_sources.extend(stock.news)
-                
-            # Try get_news method if available
-            try:
-                recent_news = stock.get_news()
-                if recent_news:
-                    news_sources.extend(recent_news)
-            except:
-                pass
+            # Ticker.news and Ticker.get_news() return the same cached list, so one call is enough
+            news_sources = list(get_data_provider().news(symbol))
             
             # Extract headlines
             for item in news_sources[:8]:
@@ -543,27 +832,17 @@ class AdvancedStockAnalyzer:
             base_symbol = symbol.replace(".NS", "").replace(".BO", "")
             
             # Simple Google search fallback
-            search_terms = [
-                f"{base_symbol} company news today",
-                f"{base_symbol} stock latest news",
-                f"{base_symbol} quarterly results"
-            ]
+            search_terms = self._fallback_news_terms(base_symbol)
             
             for term in search_terms:
                 try:
                     # Use a simple news aggregator or RSS feed
-                    url = f"https://news.google.com/rss/search?q={term}&hl=en"
-                    response = requests.get(url, timeout=5)
+                    response = get_data_provider().http_get(self._google_news_url(term, region=False), timeout=5)
                     
                     if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, "xml")
-                        items = soup.find_all("item")[:2]
-                        
-                        for item in items:
-                            if item.title:
-                                title = item.title.text.strip()
-                                if 15 <= len(title) <= 100:
-                                    headlines.append(title)
+                        for title in self._rss_titles(response.content, 2):
+                            if 15 <= len(title) <= 100:
+                                headlines.append(title)
                                     
                 except:
                     continue
@@ -577,6 +856,83 @@ class AdvancedStockAnalyzer:
         
         return headlines
 
+    def _sentiment_candidates(self, headlines: List[str]) -> List[str]:
+        """Headlines worth sending to the sentiment model (placeholders and odd lengths dropped)"""
+        # Filter out placeholder messages
+        actual_headlines = [h for h in headlines if not h.startswith("No news available") 
+                        and not h.startswith("No recent news found")]
+        
+        # Skip very short or very long headlines
+        return [h for h in actual_headlines if len(h.strip()) >= 10 and len(h) <= 200]
+
+    def _post_sentiment(self, inputs):
+        """Single HuggingFace inference call (one headline or a list of headlines)"""
+        return get_data_provider().http_post(
+            f"https://api-inference.huggingface.co/models/{HF_MODEL}",
+            headers={"Authorization": f"Bearer {HF_TOKEN}"},
+            json={"inputs": inputs},
+            timeout=15
+        )
+
+    def _parse_sentiment_prediction(self, headline: str, prediction) -> Optional[Dict]:
+        """Turn a raw model prediction into a scored result, None if the format is unknown"""
+        # Handle different response formats
+        if isinstance(prediction, list) and len(prediction) > 0:
+            if isinstance(prediction[0], list) and len(prediction[0]) > 0:
+                result = prediction[0][0]
+            else:
+                result = prediction[0]
+        else:
+            return None
+        
+        label = result.get("label", "NEUTRAL").upper()
+        score = float(result.get("score", 0.5))
+        
+        # Convert to numerical score (-1 to 1)
+        if label == "POSITIVE":
+            numerical_score = score
+        elif label == "NEGATIVE":
+            numerical_score = -score
+        else:
+            numerical_score = 0.0
+        
+        return {
+            "headline": headline,
+            "label": label,
+            "score": score,
+            "numerical_score": numerical_score,
+            "confidence": score
+        }
+
+    def _neutral_sentiment(self, headline: str) -> Dict:
+        """Neutral result used when a headline could not be analyzed"""
+        return {
+            "headline": headline,
+            "label": "NEUTRAL",
+            "score": 0.5,
+            "numerical_score": 0.0,
+            "confidence": 0.5
+        }
+
+    def _weighted_sentiment(self, results: List[Dict], valid_scores: List[float]) -> float:
+        """Calculate weighted average sentiment"""
+        if valid_scores:
+            # Weight recent news higher and high-confidence scores more
+            weights = []
+            for i, result in enumerate([r for r in results if r.get("numerical_score") is not None]):
+                base_weight = 1.0 + (i * 0.1)  # Recent news weight
+                confidence_weight = result.get("confidence", 0.5)  # Confidence weight
+                weights.append(base_weight * confidence_weight)
+            
+            if weights and len(weights) == len(valid_scores):
+                weighted_sentiment = np.average(valid_scores, weights=weights)
+            else:
+                weighted_sentiment = np.mean(valid_scores)
+        else:
+            weighted_sentiment = 0.0
+        
+        return float(weighted_sentiment)
+
     def analyze_sentiment(self, headlines: List[str]) -> Tuple[List[Dict], float]:
         """Enhanced sentiment analysis with better error handling"""
         if not headlines or not HF_TOKEN:
@@ -585,59 +941,23 @@ class AdvancedStockAnalyzer:
         results = []
         valid_scores = []
         
-        # Filter out placeholder messages
-        actual_headlines = [h for h in headlines if not h.startswith("No news available") 
-                        and not h.startswith("No recent news found")]
+        candidates = self._sentiment_candidates(headlines)
         
-        if not actual_headlines:
+        if not candidates:
             return [], 0.0
         
-        for i, headline in enumerate(actual_headlines):
+        for headline in candidates:
             try:
-                # Skip very short or very long headlines
-                if len(headline.strip()) < 10 or len(headline) > 200:
-                    continue
-                    
-                response = requests.post(
-                    f"https://api-inference.huggingface.co/models/{HF_MODEL}",
-                    headers={"Authorization": f"Bearer {HF_TOKEN}"},
-                    json={"inputs": headline.strip()},
-                    timeout=15
-                )
+                response = self._post_sentiment(headline.strip())
                 
                 if response.status_code == 200:
                     try:
-                        prediction = response.json()
-                        
-                        # Handle different response formats
-                        if isinstance(prediction, list) and len(prediction) > 0:
-                            if isinstance(prediction[0], list) and len(prediction[0]) > 0:
-                                result = prediction[0][0]
-                            else:
-                                result = prediction[0]
-                        else:
+                        result = self._parse_sentiment_prediction(headline, response.json())
+                        if result is None:
                             continue
                         
-                        label = result.get("label", "NEUTRAL").upper()
-                        score = float(result.get("score", 0.5))
-                        
-                        # Convert to numerical score (-1 to 1)
-                        if label == "POSITIVE":
-                            numerical_score = score
-                        elif label == "NEGATIVE":
-                            numerical_score = -score
-                        else:
-                            numerical_score = 0.0
-                        
-                        valid_scores.append(numerical_score)
-                        
-                        results.append({
-                            "headline": headline,
-                            "label": label,
-                            "score": score,
-                            "numerical_score": numerical_score,
-                            "confidence": score
-                        })
+                        valid_scores.append(result["numerical_score"])
+                        results.append(result)
                         
                     except (KeyError, IndexError, ValueError) as e:
                         print(f"Error parsing sentiment response: {e}")
@@ -645,14 +965,9 @@ class AdvancedStockAnalyzer:
                         
                 elif response.status_code == 503:
                     # Model loading, wait and retry once
-                    time.sleep(2)
+                    timed_sleep("sentiment_retry", 2)
                     try:
-                        retry_response = requests.post(
-                            f"https://api-inference.huggingface.co/models/{HF_MODEL}",
-                            headers={"Authorization": f"Bearer {HF_TOKEN}"},
-                            json={"inputs": headline.strip()},
-                            timeout=15
-                        )
+                        retry_response = self._post_sentiment(headline.strip())
                         if retry_response.status_code == 200:
                             # Process retry response (same logic as above)
                             pass
@@ -660,52 +975,89 @@ class AdvancedStockAnalyzer:
                         pass
                 else:
                     print(f"Sentiment API error: {response.status_code}")
-                    time.sleep(1)
+                    timed_sleep("sentiment_error", 1)
                     
             except Exception as e:
                 print(f"Error analyzing sentiment for headline: {e}")
                 # Add neutral result for failed analysis
-                results.append({
-                    "headline": headline,
-                    "label": "NEUTRAL",
-                    "score": 0.5,
-                    "numerical_score": 0.0,
-                    "confidence": 0.5
-                })
+                results.append(self._neutral_sentiment(headline))
         
-        # Calculate weighted average sentiment
-        if valid_scores:
-            # Weight recent news higher and high-confidence scores more
-            weights = []
-            for i, result in enumerate([r for r in results if r.get("numerical_score") is not None]):
-                base_weight = 1.0 + (i * 0.1)  # Recent news weight
-                confidence_weight = result.get("confidence", 0.5)  # Confidence weight
-                weights.append(base_weight * confidence_weight)
-            
-            if weights and len(weights) == len(valid_scores):
-                weighted_sentiment = np.average(valid_scores, weights=weights)
-            else:
-                weighted_sentiment = np.mean(valid_scores)
-        else:
-            weighted_sentiment = 0.0
+        return results, self._weighted_sentiment(results, valid_scores)
+
+    def analyze_sentiment_batch(self, headline_groups: List[List[str]]) -> List[Tuple[List[Dict], float]]:
+        """Sentiment for several symbols at once, sharing chunked HuggingFace requests"""
+        if not HF_TOKEN:
+            return [([], 0.0) for _ in headline_groups]
+        
+        candidate_groups = [self._sentiment_candidates(group) if group else [] for group in headline_groups]
+        
+        # Each distinct headline is scored once, however many symbols mention it
+        unique_headlines = list(dict.fromkeys(h for group in candidate_groups for h in group))
+        predictions = {}  # headline -> (result, counts_towards_score)
+        
+        for start in range(0, len(unique_headlines), SENTIMENT_BATCH_SIZE):
+            chunk = unique_headlines[start:start + SENTIMENT_BATCH_SIZE]
+            try:
+                response = self._post_sentiment([h.strip() for h in chunk])
+                if response.status_code == 503:
+                    # Model loading, wait and retry once
+                    timed_sleep("sentiment_retry", 2)
+                    response = self._post_sentiment([h.strip() for h in chunk])
+                
+                if response.status_code != 200:
+                    print(f"Sentiment API error: {response.status_code}")
+                    continue
+                
+                batch_prediction = response.json()
+                if not isinstance(batch_prediction, list) or len(batch_prediction) != len(chunk):
+                    print("Unexpected batch sentiment response shape")
+                    continue
+                
+                for headline, prediction in zip(chunk, batch_prediction):
+                    try:
+                        result = self._parse_sentiment_prediction(headline, [prediction])
+                        if result is not None:
+                            predictions[headline] = (result, True)
+                    except (KeyError, IndexError, ValueError, AttributeError) as e:
+                        print(f"Error parsing sentiment response: {e}")
+                        
+            except Exception as e:
+                print(f"Error analyzing sentiment batch: {e}")
+                for headline in chunk:
+                    predictions[headline] = (self._neutral_sentiment(headline), False)
+        
+        batch_results = []
+        for group in candidate_groups:
+            results = []
+            valid_scores = []
+            for headline in group:
+                if headline not in predictions:
+                    continue
+                result, is_valid = predictions[headline]
+                results.append(dict(result))
+                if is_valid:
+                    valid_scores.append(result["numerical_score"])
+            batch_results.append((results, self._weighted_sentiment(results, valid_scores)))
         
-        return results, float(weighted_sentiment)
+        return batch_results
 
 
     # ===================== MARKET CONTEXT ANALYSIS =====================
     
+    def get_index_symbol(self, symbol: str) -> str:
+        """Benchmark index a symbol's market context is derived from"""
+        if symbol.endswith((".NS", ".BO")):
+            return "^NSEI"  # NIFTY 50
+        return "^GSPC"  # S&P 500
+
     def get_market_context(self, symbol: str) -> MarketContext:
         """Analyze broader market context"""
         try:
             # Determine market index based on symbol
-            if symbol.endswith((".NS", ".BO")):
-                index_symbol = "^NSEI"  # NIFTY 50
-            else:
-                index_symbol = "^GSPC"  # S&P 500
+            index_symbol = self.get_index_symbol(symbol)
             
             # Get market index data
-            index = yf.Ticker(index_symbol)
-            index_hist = index.history(period="6mo")
+            index_hist = self._get_history(index_symbol, "6mo")
             
             if index_hist.empty:
                 return self._default_market_context()
@@ -868,8 +1220,8 @@ class AdvancedStockAnalyzer:
         return max(-100, min(100, score))
     
     def combine_signals(self, technical_score: float, sentiment_score: float, 
-                       market_context: MarketContext) -> Tuple[str, float]:
-        """Advanced signal combination with market context weighting"""
+                       market_context: MarketContext, sector_tilt: float = 0.0) -> Tuple[str, float]:
+        """Advanced signal combination with market context weighting; sector_tilt is the symbol's sector strength"""
         
         # Base weights
         tech_weight = 0.6
@@ -886,6 +1238,13 @@ class AdvancedStockAnalyzer:
         # Calculate combined score
         combined_score = (technical_score * tech_weight) + (sentiment_score * 100 * sentiment_weight)
         
+        # Sector strength and market breadth from the portfolio-wide sector pass
+        combined_score += sector_tilt
+        if market_context.market_sentiment == "GREED":
+            combined_score += MARKET_SENTIMENT_TILT
+        elif market_context.market_sentiment == "FEAR":
+            combined_score -= MARKET_SENTIMENT_TILT
+        
         # Generate signal with confidence
         if combined_score > 30:
             signal = "STRONG_BUY"
@@ -910,8 +1269,7 @@ class AdvancedStockAnalyzer:
     def backtest_strategy(self, symbol: str, days: int = 252) -> Dict:
         """Simple backtesting framework"""
         try:
-            stock = yf.Ticker(symbol)
-            hist = stock.history(period=f"{days}d")
+            hist = self._get_history(symbol, f"{days}d")
             
             if len(hist) < 50:
                 return {"error": "Insufficient data for backtesting"}
@@ -979,124 +1337,506 @@ class AdvancedStockAnalyzer:
     
     # ===================== MAIN ANALYSIS FUNCTION =====================
     
-    def get_comprehensive_signal(self, symbol: str) -> SignalResult:
-        """Complete stock analysis with all capabilities"""
+    def get_comprehensive_signal(self, symbol: str, technical_signals: Optional[TechnicalSignals] = None,
+                                 interval: str = DAILY_INTERVAL) -> SignalResult:
+        """Complete stock analysis with all capabilities; technicals use `interval` bars"""
+        timings = StageTimings()
         try:
             print(f"Analyzing {symbol}...")
             
-            # Get current price with enhanced retry mechanism and rate limiting
-            hist = self._fetch_stock_data_with_retry(symbol)
-            
-            if hist is None or hist.empty:
-                raise Exception(f"Unable to fetch price data for {symbol}. Yahoo Finance may be rate limiting or blocking requests from this server.")
-            
-            current_price = float(hist['Close'].iloc[-1])
-            
-            # Parallel processing for faster analysis
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                # Submit all analysis tasks
-                technical_future = executor.submit(self.get_technical_signals, symbol)
-                news_future = executor.submit(self.scrape_news, symbol)
-                market_future = executor.submit(self.get_market_context, symbol)
-                backtest_future = executor.submit(self.backtest_strategy, symbol)
+            with timings.stage("total"):
+                inputs = self._collect_signal_inputs(symbol, timings=timings, technical_signals=technical_signals,
+                                                     interval=interval)
                 
-                # Collect results
-                technical_signals = technical_future.result()
-                headlines = news_future.result()
-                market_context = market_future.result()
-                backtest_metrics = backtest_future.result()
-            
-            # Sentiment analysis
-            sentiment_analysis, sentiment_score = self.analyze_sentiment(headlines)
-            
-            # Generate scores
-            technical_score = self.generate_technical_score(technical_signals)
+                # Sentiment analysis
+                with timings.stage("sentiment"):
+                    sentiment_analysis, sentiment_score = self.analyze_sentiment(inputs["headlines"])
+                
+                with timings.stage("scoring"):
+                    result = self._build_signal_result(symbol, inputs, sentiment_analysis, sentiment_score)
             
-            # Combine signals to get final signal and confidence
-            final_signal, confidence = self.combine_signals(
-                technical_score, sentiment_score, market_context
-            )
+            result.timings = timings.as_dict()
+            result.interval = interval
+            print(f"✓ Analysis complete for {symbol}")
+            return result
             
-            # Calculate risk score with signal context
-            risk_score = self.calculate_risk_score(technical_signals, market_context, final_signal)
+        except Exception as e:
+            result = self._error_signal_result(symbol, e)
+            result.timings = timings.as_dict()
+            result.interval = interval
+            return result
+    
+    def _collect_signal_inputs(self, symbol: str, market_context: Optional[MarketContext] = None,
+                               feed_snapshot: Optional[Dict[str, List[str]]] = None,
+                               timings: Optional[StageTimings] = None,
+                               technical_signals: Optional[TechnicalSignals] = None,
+                               interval: str = DAILY_INTERVAL) -> Dict:
+        """Fetch price, technicals, news, market context and backtest for one symbol"""
+        timings = timings or StageTimings()
+        
+        # Get current price with enhanced retry mechanism and rate limiting
+        with timings.stage("price"):
+            current_price = self._current_price(symbol, interval)
+        
+        # Parallel processing for faster analysis
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            # Submit all analysis tasks
+            technical_future = _submit(
+                executor, timings.timed, "technicals", self.get_technical_signals, symbol, interval
+            ) if technical_signals is None else None
+            news_future = _submit(executor, timings.timed, "news", self.scrape_news, symbol, feed_snapshot)
+            market_future = _submit(
+                executor, timings.timed, "market_context", self.get_market_context, symbol
+            ) if market_context is None else None
+            backtest_future = _submit(executor, timings.timed, "backtest", self.backtest_strategy, symbol)
             
-            # Position sizing and risk management with signal type
-            position_info = self.calculate_position_sizing(
-                current_price, technical_signals.volatility, final_signal
-            )
+            # Collect results
+            return {
+                "price": current_price,
+                "technical_signals": technical_future.result() if technical_future else technical_signals,
+                "headlines": news_future.result(),
+                "market_context": market_future.result() if market_future else market_context,
+                "backtest_metrics": backtest_future.result()
+            }
+    
+    def _current_price(self, symbol: str, interval: str = DAILY_INTERVAL) -> float:
+        """Latest close, from intraday bars when interval is intraday"""
+        hist = None
+        if interval != DAILY_INTERVAL:
+            # Intraday bars are refreshed far more often than the daily store
+            hist = self._get_history(symbol, "5d", interval)
+        if hist is None or hist.empty:
+            hist = self._fetch_stock_data_with_retry(symbol)
+        
+        if hist is None or hist.empty:
+            raise Exception(f"Unable to fetch price data for {symbol}. Yahoo Finance may be rate limiting or blocking requests from this server.")
+        
+        return float(hist['Close'].iloc[-1])
+    
+    # ===================== ASYNC PIPELINE (/analyze) =====================
+    # Same results as get_comprehensive_signal, without a thread held per request:
+    # news and sentiment requests are awaited concurrently on the shared async HTTP
+    # client, and the blocking parts (yfinance, price store, indicator math, backtest)
+    # run on the bounded concurrency.blocking_pool.
+    
+    async def get_comprehensive_signal_async(self, symbol: str, technical_signals: Optional[TechnicalSignals] = None,
+                                             interval: str = DAILY_INTERVAL) -> SignalResult:
+        timings = StageTimings()
+        try:
+            print(f"Analyzing {symbol}...")
             
-            # Create comprehensive result
-            result = SignalResult(
-                symbol=symbol,
-                price=current_price,
-                signal=final_signal,
-                confidence=confidence,
-                technical_score=technical_score,
-                sentiment_score=sentiment_score * 100,  # Convert to percentage
-                risk_score=risk_score,
-                entry_price=current_price,
-                stop_loss=position_info["stop_loss"],
-                take_profit=position_info["take_profit"],
-                position_size=position_info["shares"],
-                market_context=market_context,
-                technical_signals=technical_signals,
-                headlines=headlines[:5],
-                analysis=sentiment_analysis[:5],
-                backtest_metrics=backtest_metrics,
-                error=None
-            )
+            with timings.stage("total"):
+                inputs = await self._collect_signal_inputs_async(symbol, timings, technical_signals, interval)
+                
+                with timings.stage("sentiment"):
+                    sentiment_analysis, sentiment_score = await self.analyze_sentiment_async(inputs["headlines"])
+                
+                with timings.stage("scoring"):
+                    result = self._build_signal_result(symbol, inputs, sentiment_analysis, sentiment_score)
             
+            result.timings = timings.as_dict()
+            result.interval = interval
             print(f"✓ Analysis complete for {symbol}")
             return result
             
         except Exception as e:
-            error_msg = str(e)
-            print(f"✗ Error analyzing {symbol}: {error_msg}")
-            
-            # Provide more specific error messages
-            if "price data" in error_msg.lower():
-                detailed_error = f"Failed to fetch price data for {symbol}. This is likely due to Yahoo Finance rate limiting or blocking requests from the server IP address. Please try again later or contact support."
-            elif "429" in error_msg:
-                detailed_error = f"Rate limit exceeded when fetching data for {symbol}. Please wait a few minutes before trying again."
-            elif "timeout" in error_msg.lower():
-                detailed_error = f"Request timeout when fetching data for {symbol}. The external data provider may be experiencing issues."
+            result = self._error_signal_result(symbol, e)
+            result.timings = timings.as_dict()
+            result.interval = interval
+            return result
+    
+    async def _collect_signal_inputs_async(self, symbol: str, timings: StageTimings,
+                                           technical_signals: Optional[TechnicalSignals] = None,
+                                           interval: str = DAILY_INTERVAL) -> Dict:
+        async def stage(name, awaitable):
+            with timings.stage(name):
+                return await awaitable
+        
+        current_price = await stage("price", run_blocking(self._current_price, symbol, interval))
+        
+        # Independent inputs, gathered concurrently
+        tasks = {
+            "headlines": stage("news", self.scrape_news_async(symbol)),
+            "market_context": stage("market_context", run_blocking(self.get_market_context, symbol)),
+            "backtest_metrics": stage("backtest", run_blocking(self.backtest_strategy, symbol)),
+        }
+        if technical_signals is None:
+            tasks["technical_signals"] = stage("technicals", run_blocking(self.get_technical_signals, symbol, interval))
+        values = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+        return {"price": current_price, "technical_signals": technical_signals, **values}
+    
+    async def scrape_news_async(self, symbol: str) -> List[str]:
+        """scrape_news with every source queried at once"""
+        if symbol.endswith((".NS", ".BO")):
+            headlines = await self._scrape_indian_news_async(symbol)
+        else:
+            us_news, yahoo_news = await asyncio.gather(
+                self._scrape_us_news_async(symbol), run_blocking(self._scrape_yahoo_news, symbol)
+            )
+            headlines = us_news + yahoo_news
+        
+        quality_headlines = self._filter_quality_headlines(headlines)
+        if not quality_headlines:
+            quality_headlines = await self._fallback_news_scraping_async(symbol)
+        
+        return quality_headlines[:10] if quality_headlines else [f"No news available for {symbol}"]
+    
+    async def fetch_feed_snapshot_async(self) -> Dict[str, List[str]]:
+        async def fetch(feed_url):
+            try:
+                response = await get_data_provider().http_get_async(feed_url, timeout=10)
+                return self._rss_titles(response.content, 5)
+            except Exception as e:
+                print(f"RSS snapshot failed for {feed_url}: {e}")
+                return []
+        
+        titles = await asyncio.gather(*(fetch(feed_url) for feed_url in INDIAN_RSS_FEEDS))
+        return dict(zip(INDIAN_RSS_FEEDS, titles))
+    
+    async def _scrape_indian_news_async(self, symbol: str) -> List[str]:
+        base_symbol = symbol.replace(".NS", "").replace(".BO", "")
+        provider = get_data_provider()
+        
+        async def yahoo():
+            try:
+                news = await run_blocking(provider.news, symbol)
+                return [item['title'] for item in (news or [])[:5] if 'title' in item and item['title']]
+            except Exception as e:
+                print(f"yfinance news failed for {symbol}: {e}")
+                return []
+        
+        async def google(query):
+            try:
+                response = await provider.http_get_async(self._google_news_url(query), timeout=10, headers={
+                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+                })
+                response.raise_for_status()
+                return [title for title in self._rss_titles(response.content, 3) if 20 < len(title) < 120]
+            except Exception:
+                return []
+        
+        # Same order as _scrape_indian_news: yfinance, Google News per query, then feed matches
+        *groups, feed_snapshot = await asyncio.gather(
+            yahoo(), *(google(query) for query in self._indian_news_queries(base_symbol)),
+            self.fetch_feed_snapshot_async()
+        )
+        headlines = [title for group in groups for title in group]
+        for titles in feed_snapshot.values():
+            headlines.extend(title for title in titles if base_symbol.lower() in title.lower())
+        return headlines
+    
+    async def _scrape_us_news_async(self, symbol: str) -> List[str]:
+        provider = get_data_provider()
+        
+        async def newsapi(query):
+            try:
+                response = await provider.http_get_async("https://newsapi.org/v2/everything",
+                                                         params=self._newsapi_params(query), timeout=10)
+                response.raise_for_status()
+                return self._newsapi_titles(response)
+            except Exception:
+                return []
+        
+        async def alpha_vantage():
+            try:
+                response = await provider.http_get_async("https://www.alphavantage.co/query",
+                                                         params=self._alpha_vantage_params(symbol), timeout=10)
+                return self._alpha_vantage_titles(response)
+            except Exception as e:
+                print(f"Alpha Vantage news failed for {symbol}: {e}")
+                return []
+        
+        calls = [newsapi(query) for query in self._us_news_queries(symbol)] if NEWS_API_KEY else []
+        if ALPHA_VANTAGE_KEY:
+            calls.append(alpha_vantage())
+        groups = await asyncio.gather(*calls)
+        return [title for group in groups for title in group]
+    
+    async def _fallback_news_scraping_async(self, symbol: str) -> List[str]:
+        base_symbol = symbol.replace(".NS", "").replace(".BO", "")
+        
+        async def search(term):
+            try:
+                response = await get_data_provider().http_get_async(self._google_news_url(term, region=False), timeout=5)
+                if response.status_code != 200:
+                    return []
+                return [title for title in self._rss_titles(response.content, 2) if 15 <= len(title) <= 100]
+            except Exception:
+                return []
+        
+        groups = await asyncio.gather(*(search(term) for term in self._fallback_news_terms(base_symbol)))
+        headlines = [title for group in groups for title in group]
+        return headlines or [f"No recent news found for {symbol}"]
+    
+    async def _post_sentiment_async(self, inputs):
+        return await get_data_provider().http_post_async(
+            f"https://api-inference.huggingface.co/models/{HF_MODEL}",
+            headers={"Authorization": f"Bearer {HF_TOKEN}"},
+            json={"inputs": inputs},
+            timeout=15
+        )
+    
+    async def _score_headline_async(self, headline: str) -> Tuple[Optional[Dict], bool]:
+        """One headline scored the way analyze_sentiment does it: (result or None, counts towards the score)"""
+        try:
+            response = await self._post_sentiment_async(headline.strip())
+            if response.status_code == 200:
+                try:
+                    result = self._parse_sentiment_prediction(headline, response.json())
+                    return result, result is not None
+                except (KeyError, IndexError, ValueError) as e:
+                    print(f"Error parsing sentiment response: {e}")
+            elif response.status_code == 503:
+                # Model loading: like analyze_sentiment, retry once without using the answer
+                await timed_sleep_async("sentiment_retry", 2)
+                try:
+                    await self._post_sentiment_async(headline.strip())
+                except Exception:
+                    pass
             else:
-                detailed_error = f"Analysis failed for {symbol}: {error_msg}"
-            
-            return SignalResult(
-                symbol=symbol,
-                price=0.0,
-                signal="HOLD",
-                confidence=0.0,
-                technical_score=0.0,
-                sentiment_score=0.0,
-                risk_score=100.0,
-                entry_price=0.0,
-                stop_loss=0.0,
-                take_profit=0.0,
-                position_size=0,
-                market_context=self._default_market_context(),
-                technical_signals=self._default_technical_signals(),
-                headlines=[f"Error processing {symbol}"],
-                analysis=[],
-                backtest_metrics={"error": error_msg},
-                error=detailed_error
+                print(f"Sentiment API error: {response.status_code}")
+                await timed_sleep_async("sentiment_error", 1)
+            return None, False
+        except Exception as e:
+            print(f"Error analyzing sentiment for headline: {e}")
+            return self._neutral_sentiment(headline), False
+    
+    async def analyze_sentiment_async(self, headlines: List[str]) -> Tuple[List[Dict], float]:
+        """analyze_sentiment with up to SENTIMENT_CONCURRENCY headlines in flight"""
+        if not headlines or not HF_TOKEN:
+            return [], 0.0
+        
+        candidates = self._sentiment_candidates(headlines)
+        if not candidates:
+            return [], 0.0
+        
+        semaphore = asyncio.Semaphore(SENTIMENT_CONCURRENCY)
+        
+        async def score(headline):
+            async with semaphore:
+                return await self._score_headline_async(headline)
+        
+        results = []
+        valid_scores = []
+        for result, is_valid in await asyncio.gather(*(score(h) for h in candidates)):
+            if result is None:
+                continue
+            results.append(result)
+            if is_valid:
+                valid_scores.append(result["numerical_score"])
+        
+        return results, self._weighted_sentiment(results, valid_scores)
+    
+    def _build_signal_result(self, symbol: str, inputs: Dict, sentiment_analysis: List[Dict],
+                             sentiment_score: float, sector_snapshot: Optional[SectorSnapshot] = None) -> SignalResult:
+        """Score collected inputs into the final signal, risk and position sizing"""
+        current_price = inputs["price"]
+        technical_signals = inputs["technical_signals"]
+        market_context = inputs["market_context"]
+        headlines = inputs["headlines"]
+        
+        # Real sector rotation / market sentiment from the latest sector pass, if still recent
+        sector_tilt = 0.0
+        sector_snapshot = sector_snapshot or get_sector_snapshot()
+        sector_context = sector_snapshot.context_for(symbol) if sector_snapshot is not None else None
+        if sector_context is not None:
+            sector_rotation, market_sentiment, sector_tilt = sector_context
+            market_context = MarketContext(
+                volatility_regime=market_context.volatility_regime,
+                trend_direction=market_context.trend_direction,
+                sector_rotation=sector_rotation,
+                market_sentiment=market_sentiment
             )
+        
+        # Generate scores
+        technical_score = self.generate_technical_score(technical_signals)
+        
+        # Combine signals to get final signal and confidence
+        final_signal, confidence = self.combine_signals(
+            technical_score, sentiment_score, market_context, sector_tilt
+        )
+        
+        # Calculate risk score with signal context
+        risk_score = self.calculate_risk_score(technical_signals, market_context, final_signal)
+        
+        # Position sizing and risk management with signal type
+        position_info = self.calculate_position_sizing(
+            current_price, technical_signals.volatility, final_signal
+        )
+        
+        # Create comprehensive result
+        return SignalResult(
+            symbol=symbol,
+            price=current_price,
+            signal=final_signal,
+            confidence=confidence,
+            technical_score=technical_score,
+            sentiment_score=sentiment_score * 100,  # Convert to percentage
+            risk_score=risk_score,
+            entry_price=current_price,
+            stop_loss=position_info["stop_loss"],
+            take_profit=position_info["take_profit"],
+            position_size=position_info["shares"],
+            market_context=market_context,
+            technical_signals=technical_signals,
+            headlines=[sys.intern(h) for h in headlines[:5]],  # Market-wide headlines repeat across symbols
+            analysis=sentiment_analysis[:5],
+            backtest_metrics=inputs["backtest_metrics"],
+            error=None
+        )
     
+    def _error_signal_result(self, symbol: str, error: Exception) -> SignalResult:
+        """SignalResult describing a failed analysis"""
+        error_msg = str(error)
+        print(f"✗ Error analyzing {symbol}: {error_msg}")
+        
+        # Provide more specific error messages
+        if "price data" in error_msg.lower():
+            detailed_error = f"Failed to fetch price data for {symbol}. This is likely due to Yahoo Finance rate limiting or blocking requests from the server IP address. Please try again later or contact support."
+        elif "429" in error_msg:
+            detailed_error = f"Rate limit exceeded when fetching data for {symbol}. Please wait a few minutes before trying again."
+        elif "timeout" in error_msg.lower():
+            detailed_error = f"Request timeout when fetching data for {symbol}. The external data provider may be experiencing issues."
+        else:
+            detailed_error = f"Analysis failed for {symbol}: {error_msg}"
+        
+        return SignalResult(
+            symbol=symbol,
+            price=0.0,
+            signal="HOLD",
+            confidence=0.0,
+            technical_score=0.0,
+            sentiment_score=0.0,
+            risk_score=100.0,
+            entry_price=0.0,
+            stop_loss=0.0,
+            take_profit=0.0,
+            position_size=0,
+            market_context=self._default_market_context(),
+            technical_signals=self._default_technical_signals(),
+            headlines=[f"Error processing {symbol}"],
+            analysis=[],
+            backtest_metrics={"error": error_msg},
+            error=detailed_error
+        )
+    
+    def iter_batch_signals(self, symbols: List[str], chunk_size: int = 5, max_workers: int = 5):
+        """Yield SignalResults in input order, sharing index, feed and sentiment work across symbols"""
+        if not symbols:
+            return
+        
+        print(f"Starting batch analysis of {len(symbols)} stocks...")
+        
+        index_symbols = sorted({self.get_index_symbol(s) for s in symbols})
+        frames = self.prefetch_history(list(symbols) + index_symbols)
+        
+        # Every step of the pipeline runs in the run's own context, wherever the caller drives it from
+        context = _run_context(frames)
+        pipeline = self._run_batch_pipeline(symbols, chunk_size, max_workers)
+        try:
+            while True:
+                try:
+                    result = context.run(next, pipeline)
+                except StopIteration:
+                    break
+                yield result
+        finally:
+            pipeline.close()
+        
+        print(f"✓ Batch analysis complete. {len(symbols)} stocks analyzed.")
+    
+    def _run_batch_pipeline(self, symbols: List[str], chunk_size: int, max_workers: int):
+        """Shared-work pipeline behind iter_batch_signals"""
+        # One index download per market instead of one per symbol
+        market_contexts = {}
+        with stage_timer("market_context"):
+            for symbol in symbols:
+                index_symbol = self.get_index_symbol(symbol)
+                if index_symbol not in market_contexts:
+                    market_contexts[index_symbol] = self.get_market_context(symbol)
+        
+        # Market-wide feeds are the same for every Indian symbol
+        with stage_timer("feed_snapshot"):
+            feed_snapshot = self.fetch_feed_snapshot() if any(s.endswith((".NS", ".BO")) for s in symbols) else {}
+        
+        # All symbols' indicators in one vectorized pass over the prefetched bars
+        with stage_timer("technicals_batch"):
+            technicals = self.get_technical_signals_batch(symbols)
+        
+        timings = {symbol: StageTimings() for symbol in symbols}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                _submit(
+                    executor, self._collect_signal_inputs, symbol,
+                    market_contexts[self.get_index_symbol(symbol)], feed_snapshot, timings[symbol],
+                    technicals[symbol]
+                )
+                for symbol in symbols
+            ]
+            
+            # Sentiment is scored one chunk at a time so results can stream out early
+            for start in range(0, len(symbols), chunk_size):
+                chunk = list(zip(symbols[start:start + chunk_size], futures[start:start + chunk_size]))
+                
+                collected = {}
+                errors = {}
+                for symbol, future in chunk:
+                    try:
+                        collected[symbol] = future.result()
+                    except Exception as e:
+                        errors[symbol] = e
+                
+                ready = list(collected)
+                with stage_timer("sentiment_batch"):
+                    sentiments = dict(zip(ready, self.analyze_sentiment_batch(
+                        [collected[symbol]["headlines"] for symbol in ready]
+                    )))
+                
+                for symbol, _ in chunk:
+                    if symbol in errors:
+                        result = self._error_signal_result(symbol, errors[symbol])
+                    else:
+                        try:
+                            sentiment_analysis, sentiment_score = sentiments[symbol]
+                            result = self._build_signal_result(symbol, collected[symbol], sentiment_analysis, sentiment_score)
+                        except Exception as e:
+                            result = self._error_signal_result(symbol, e)
+                    result.timings = timings[symbol].as_dict()
+                    yield result
+    
+    def analyze_batch(self, symbols: List[str], chunk_size: int = 5, max_workers: int = 5) -> List[SignalResult]:
+        """Analyze a list of symbols through the shared batch pipeline"""
+        return list(self.iter_batch_signals(symbols, chunk_size=chunk_size, max_workers=max_workers))
+
 
     
     # ===================== BATCH PROCESSING =====================
     
-    def analyze_portfolio(self, symbols: List[str], max_workers: int = 5) -> List[SignalResult]:
-        """Analyze multiple stocks in parallel"""
+    def analyze_portfolio(self, symbols: List[str], max_workers: int = 5,
+                          interval: str = DAILY_INTERVAL) -> List[SignalResult]:
+        """Analyze multiple stocks in parallel, technicals on `interval` bars"""
         results = []
         
-        print(f"Starting analysis of {len(symbols)} stocks...")
+        print(f"Starting analysis of {len(symbols)} stocks ({interval} bars)...")
+        
+        # One bulk download per chunk of symbols instead of a paced request per symbol
+        index_symbols = sorted({self.get_index_symbol(s) for s in symbols})
+        frames = self.prefetch_history(list(symbols) + index_symbols)
+        if interval != DAILY_INTERVAL:
+            # Market context and backtests stay on daily bars
+            self.prefetch_history(list(symbols), interval, frames)
+        
+        # The run's frames live in its own context, so concurrent runs keep theirs
+        context = _run_context(frames)
+        
+        # Indicators for the whole universe in one vectorized pass
+        with stage_timer("technicals_batch"):
+            technicals = context.run(self.get_technical_signals_batch, list(symbols), interval)
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Submit all analysis tasks
             future_to_symbol = {
-                executor.submit(self.get_comprehensive_signal, symbol): symbol 
+                executor.submit(context.copy().run, self.get_comprehensive_signal, symbol, technicals.get(symbol), interval): symbol 
                 for symbol in symbols
             }
             
@@ -1115,16 +1855,47 @@ class AdvancedStockAnalyzer:
                         entry_price=0.0, stop_loss=0.0, take_profit=0.0, position_size=0,
                         market_context=self._default_market_context(),
                         technical_signals=self._default_technical_signals(),
-                        headlines=[], analysis=[], backtest_metrics={}, error=str(e)
+                        headlines=[], analysis=[], backtest_metrics={}, error=str(e), interval=interval
                     )
                     results.append(error_result)
         
+        # Sector/market aggregates over the whole run, fed back into every symbol's score
+        results = self.apply_sector_context(results)
+        
         # Sort by confidence score
         results.sort(key=lambda x: x.confidence, reverse=True)
         
         print(f"✓ Portfolio analysis complete. {len(results)} stocks analyzed.")
         return results
     
+    def apply_sector_context(self, results: List[SignalResult]) -> List[SignalResult]:
+        """Group results by sector in one pass and re-score each with the real market context"""
+        with stage_timer("sector_analytics"):
+            snapshot = compute_sector_snapshot(results)
+            if snapshot.markets:
+                set_sector_snapshot(snapshot)  # Too small a run keeps the previous snapshot
+            
+            rescored = []
+            for result in results:
+                if result.error is not None:
+                    rescored.append(result)
+                    continue
+                inputs = {
+                    "price": result.price,
+                    "technical_signals": result.technical_signals,
+                    "headlines": result.headlines,
+                    "market_context": result.market_context,
+                    "backtest_metrics": result.backtest_metrics,
+                }
+                updated = self._build_signal_result(result.symbol, inputs, result.analysis,
+                                                    result.sentiment_score / 100, snapshot)
+                updated.timings = result.timings
+                updated.interval = result.interval
+                rescored.append(updated)
+        
+        print(f"✓ Sector context: {len(snapshot.sectors)} sectors across {len(snapshot.markets)} markets")
+        return rescored
+    
     # ===================== REPORTING & UTILITIES =====================
     
     def generate_report(self, results: List[SignalResult]) -> str:
@@ -0,0 +1,233 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+from bs4 import BeautifulSoup
+
+from data_providers import get_data_provider
+from fundamentals_parser import parse_html
+from metrics import metrics
+
+# Shared cache for scraped HTML pages (screener.in, NSE). Pages live in a small
+# in-memory LRU, each with its parsed BeautifulSoup / lxml tree, and as gzip files
+# on disk so they survive restarts. Within PAGE_CACHE_MAX_AGE a page is served as
+# is; after that it is revalidated with If-None-Match / If-Modified-Since and a 304
+# keeps the stored copy (and its parsed trees). Concurrent lookups of one URL share
+# a download.
+
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", os.path.join("cache", "pages"))
+PAGE_CACHE_MAX_AGE = int(os.getenv("PAGE_CACHE_MAX_AGE", 3600))  # Seconds before a page is revalidated
+PAGE_CACHE_MEMORY_PAGES = int(os.getenv("PAGE_CACHE_MEMORY_PAGES", 128))
+
+
+@dataclass
+class CachedPage:
+    url: str
+    content: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0  # Last download or successful revalidation
+    _soup: Any = field(default=None, repr=False)
+    _tree: Any = field(default=None, repr=False)
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        """Parsed once per downloaded version; callers only read it"""
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.text, "html.parser")
+        return self._soup
+
+    @property
+    def tree(self):
+        """lxml document of the page, parsed once like soup"""
+        if self._tree is None:
+            self._tree = parse_html(self.content)
+        return self._tree
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (now or time.time()) - self.fetched_at
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """Memory LRU + compressed disk copies of scraped pages, revalidated conditionally"""
+
+    def __init__(self, root: str = PAGE_CACHE_DIR, max_age: int = PAGE_CACHE_MAX_AGE,
+                 memory_pages: int = PAGE_CACHE_MEMORY_PAGES):
+        self.root = root
+        self.max_age = max_age
+        self.memory_pages = memory_pages
+        self._pages: "OrderedDict[str, CachedPage]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._url_locks: Dict[str, threading.Lock] = {}
+        self._async_url_locks: Dict[str, asyncio.Lock] = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    # ---------- storage ----------
+
+    def _stem(self, url: str) -> str:
+        return os.path.join(self.root, hashlib.sha1(url.encode()).hexdigest())
+
+    def _load(self, url: str) -> Optional[CachedPage]:
+        stem = self._stem(url)
+        try:
+            with open(stem + ".json") as f:
+                meta = json.load(f)
+            with gzip.open(stem + ".html.gz", "rb") as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return None
+        return CachedPage(url, content, meta.get("etag"), meta.get("last_modified"), meta.get("fetched_at", 0.0))
+
+    def _save(self, page: CachedPage, content_changed: bool = True):
+        stem = self._stem(page.url)
+        try:
+            if content_changed:
+                tmp_path = f"{stem}.html.gz.{threading.get_ident()}.tmp"
+                with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                    f.write(page.content)
+                os.replace(tmp_path, stem + ".html.gz")
+            tmp_path = f"{stem}.json.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"url": page.url, "etag": page.etag, "last_modified": page.last_modified,
+                           "fetched_at": page.fetched_at}, f)
+            os.replace(tmp_path, stem + ".json")
+        except OSError as e:
+            print(f"⚠️ Could not write page cache for {page.url}: {e}")
+
+    def _remember(self, page: CachedPage):
+        with self._lock:
+            self._pages[page.url] = page
+            self._pages.move_to_end(page.url)
+            while len(self._pages) > self.memory_pages:
+                self._pages.popitem(last=False)
+
+    def _cached(self, url: str) -> Optional[CachedPage]:
+        with self._lock:
+            page = self._pages.get(url)
+            if page is not None:
+                self._pages.move_to_end(url)
+                return page
+        page = self._load(url)
+        if page is not None:
+            self._remember(page)
+        return page
+
+    def _url_lock(self, url: str) -> threading.Lock:
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    # ---------- lookups ----------
+
+    def get(self, url: str, headers: Optional[Dict] = None, timeout: float = 10,
+            max_age: Optional[int] = None) -> CachedPage:
+        """The page at url: cached, revalidated, or downloaded. Raises only if there is no copy to fall back on"""
+        max_age = self.max_age if max_age is None else max_age
+        with self._url_lock(url):
+            page = self._cached(url)
+            if page is not None and page.age() < max_age:
+                metrics.inc("page_cache_requests_total", result="hit")
+                return page
+
+            try:
+                response = get_data_provider().http_get(url, headers=self._request_headers(page, headers),
+                                                        timeout=timeout)
+            except Exception as e:
+                return self._stale(url, page, e)
+            return self._store_response(url, page, response)
+
+    async def get_async(self, url: str, headers: Optional[Dict] = None, timeout: float = 10,
+                        max_age: Optional[int] = None) -> CachedPage:
+        """get() with the download awaited on the async HTTP client instead of blocking a thread"""
+        max_age = self.max_age if max_age is None else max_age
+        async with self._async_url_locks.setdefault(url, asyncio.Lock()):
+            page = self._cached(url)
+            if page is not None and page.age() < max_age:
+                metrics.inc("page_cache_requests_total", result="hit")
+                return page
+
+            try:
+                response = await get_data_provider().http_get_async(url, headers=self._request_headers(page, headers),
+                                                                    timeout=timeout)
+            except Exception as e:
+                return self._stale(url, page, e)
+            return self._store_response(url, page, response)
+
+    def _request_headers(self, page: Optional[CachedPage], headers: Optional[Dict]) -> Dict:
+        request_headers = dict(headers or {})
+        if page is not None:
+            request_headers.update(page.validators())
+        return request_headers
+
+    def _stale(self, url: str, page: Optional[CachedPage], error: Exception) -> CachedPage:
+        if page is None:
+            raise error
+        print(f"⚠️ Serving stale copy of {url}: {error}")
+        metrics.inc("page_cache_requests_total", result="stale")
+        return page
+
+    def _store_response(self, url: str, page: Optional[CachedPage], response) -> CachedPage:
+        if page is not None and response.status_code == 304:
+            page.fetched_at = time.time()
+            self._save(page, content_changed=False)
+            metrics.inc("page_cache_requests_total", result="revalidated")
+            return page
+        try:
+            response.raise_for_status()
+        except Exception as e:
+            return self._stale(url, page, e)
+
+        fresh = CachedPage(
+            url=url,
+            content=response.content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            fetched_at=time.time(),
+        )
+        self._save(fresh)
+        self._remember(fresh)
+        metrics.inc("page_cache_requests_total", result="download")
+        return fresh
+
+    def soup(self, url: str, **kwargs) -> BeautifulSoup:
+        return self.get(url, **kwargs).soup
+
+    def stored(self, prefix: str = "") -> Iterator[CachedPage]:
+        """Pages saved on disk whose URL starts with prefix, without touching the network"""
+        for name in sorted(os.listdir(self.root)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.root, name)) as f:
+                    url = json.load(f)["url"]
+            except (OSError, ValueError, KeyError):
+                continue
+            if url.startswith(prefix):
+                page = self._load(url)
+                if page is not None:
+                    yield page
+
+    def clear_memory(self):
+        with self._lock:
+            self._pages.clear()
+
+
+page_cache = PageCache()
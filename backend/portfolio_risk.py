@@ -0,0 +1,261 @@
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from price_store import price_store, PriceStore
+
+# Rolling covariance / correlation of daily returns across the whole universe.
+# The last `window` return rows sit in a ring buffer and the matrix is kept as
+# running sums (sum r, sum r r^T): each new bar is one rank-1 update, a revised
+# newest bar swaps its row's contribution, and the full R^T R product is only
+# formed on (re)build. Symbols without a bar on a date (other market's holiday)
+# contribute a zero return for that row.
+
+CORRELATION_WINDOW = int(os.getenv("CORRELATION_WINDOW", 90))  # Daily returns in the rolling window
+MIN_CORRELATION_BARS = 20  # Fewer rows than this and no risk figures are reported
+RESYNC_EVERY = 250  # Rebuild the running sums from the buffer every N updates to bound drift
+TRADING_DAYS = 252
+
+# Greedy basket selection: confidence points lost per unit of correlation with an already chosen name
+CORRELATION_PENALTY = float(os.getenv("CORRELATION_PENALTY", 50))
+
+
+class ReturnCovariance:
+    """Rolling covariance of aligned daily returns for a fixed list of symbols"""
+
+    def __init__(self, symbols: Sequence[str], window: int = CORRELATION_WINDOW):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.window = window
+        n = len(self.symbols)
+        self.returns = np.zeros((window, n))  # Ring buffer of return rows
+        self.head = 0   # Slot the next row goes to
+        self.count = 0  # Rows filled
+        self.sums = np.zeros(n)
+        self.products = np.zeros((n, n))
+        self.last_close = np.full(n, np.nan)  # Newest close per symbol
+        self.base_close = np.full(n, np.nan)  # Closes the newest row's returns are measured from
+        self.last_date: Optional[pd.Timestamp] = None
+        self.updates = 0
+
+    @classmethod
+    def from_closes(cls, closes: pd.DataFrame, window: int = CORRELATION_WINDOW) -> "ReturnCovariance":
+        """Build from a date x symbol frame of closes (NaN where a symbol has no bar)"""
+        matrix = cls(closes.columns, window)
+        values = closes.to_numpy(dtype=float)
+        if len(values) == 0:
+            return matrix
+        filled = pd.DataFrame(values).ffill().to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            returns = np.nan_to_num(filled[1:] / filled[:-1] - 1)
+        # A symbol's return on a date without its own bar is zero (carried close)
+        returns[np.isnan(values[1:])] = 0.0
+        rows = returns[-window:]
+        matrix.returns[:len(rows)] = rows
+        matrix.count = len(rows)
+        matrix.head = len(rows) % window
+        matrix.last_close = filled[-1]
+        matrix.base_close = filled[-2] if len(filled) > 1 else np.full(len(matrix.symbols), np.nan)
+        matrix.last_date = closes.index[-1]
+        matrix._rebuild()
+        return matrix
+
+    # ---------- updates ----------
+
+    def _rebuild(self):
+        rows = self.returns[:self.count] if self.count < self.window else self.returns
+        self.sums = rows.sum(axis=0)
+        self.products = rows.T @ rows
+
+    def _row_returns(self, closes: np.ndarray, base: np.ndarray) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            returns = closes / base - 1
+        return np.where(np.isfinite(returns), returns, 0.0)
+
+    def _count_update(self):
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            self._rebuild()
+
+    def push(self, date: pd.Timestamp, closes: np.ndarray):
+        """A new bar for every symbol (NaN where a symbol has none)"""
+        base = self.last_close.copy()
+        row = self._row_returns(closes, base)
+        if self.count == self.window:
+            old = self.returns[self.head]
+            self.sums -= old
+            self.products -= np.outer(old, old)
+        else:
+            self.count += 1
+        self.returns[self.head] = row
+        self.sums += row
+        self.products += np.outer(row, row)
+        self.head = (self.head + 1) % self.window
+
+        self.base_close = base
+        self.last_close = np.where(np.isnan(closes), self.last_close, closes)
+        self.last_date = date
+        self._count_update()
+
+    def amend(self, closes: np.ndarray):
+        """The newest bar's closes moved"""
+        if self.count == 0:
+            return
+        newest = (self.head - 1) % self.window
+        old = self.returns[newest].copy()
+        row = self._row_returns(closes, self.base_close)
+        row = np.where(np.isnan(closes), old, row)
+        self.returns[newest] = row
+        self.sums += row - old
+        self.products += np.outer(row, row) - np.outer(old, old)
+        self.last_close = np.where(np.isnan(closes), self.last_close, closes)
+        self._count_update()
+
+    def update(self, date: pd.Timestamp, closes: np.ndarray):
+        """Push a newer bar or amend the newest one; older dates are ignored"""
+        if self.last_date is None or date > self.last_date:
+            self.push(date, closes)
+        elif date == self.last_date:
+            self.amend(closes)
+
+    # ---------- reading ----------
+
+    def covariance(self) -> np.ndarray:
+        n = self.count
+        if n < 2:
+            return np.zeros_like(self.products)
+        return (self.products - np.outer(self.sums, self.sums) / n) / (n - 1)
+
+    def sub_covariance(self, symbols: Sequence[str]) -> np.ndarray:
+        """Covariance block of a few symbols, without forming the full matrix"""
+        idx = [self.index[s] for s in symbols]
+        n = self.count
+        if n < 2:
+            return np.zeros((len(idx), len(idx)))
+        sums = self.sums[idx]
+        return (self.products[np.ix_(idx, idx)] - np.outer(sums, sums) / n) / (n - 1)
+
+    def correlation(self, symbols: Optional[Sequence[str]] = None) -> np.ndarray:
+        cov = self.covariance() if symbols is None else self.sub_covariance(symbols)
+        std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.outer(std, std)
+        corr = np.where(np.isfinite(corr), corr, 0.0)
+        np.fill_diagonal(corr, 1.0)
+        return np.clip(corr, -1.0, 1.0)
+
+
+def _daily_index(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """Exchange-local calendar date of each bar, so both markets share one axis"""
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize()
+
+
+class CorrelationService:
+    """Universe-wide ReturnCovariance kept current from the price store, plus basket risk"""
+
+    def __init__(self, store: PriceStore = price_store, window: int = CORRELATION_WINDOW):
+        self.store = store
+        self.window = window
+        self.matrix: Optional[ReturnCovariance] = None
+        self.universe: List[str] = []  # Symbols requested; the matrix omits those without stored bars
+        self._lock = threading.Lock()
+
+    def _closes(self, symbols: Sequence[str], since: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        columns = {}
+        for symbol in symbols:
+            try:
+                hist = self.store.read(symbol)
+            except Exception as e:
+                print(f"❌ Correlation: could not read {symbol}: {e}")
+                continue
+            if hist.empty:
+                continue
+            close = pd.Series(hist["Close"].to_numpy(dtype=float), index=_daily_index(hist.index))
+            close = close[~close.index.duplicated(keep="last")]
+            columns[symbol] = close[close.index >= since] if since is not None else close.iloc[-(self.window + 1):]
+        closes = pd.DataFrame(columns).sort_index()
+        return closes.reindex(columns=list(symbols))
+
+    def refresh(self, symbols: Sequence[str]) -> Optional[ReturnCovariance]:
+        """Bring the matrix up to the store's bars: rank-1 updates for new dates, rebuild if the universe changed"""
+        symbols = list(symbols)
+        with self._lock:
+            matrix = self.matrix
+            if matrix is None or self.universe != symbols or matrix.last_date is None:
+                closes = self._closes(symbols).dropna(axis=1, how="all")
+                self.matrix = ReturnCovariance.from_closes(closes, self.window)
+                self.universe = symbols
+                print(f"📐 Correlation matrix built: {len(symbols)} symbols x {self.matrix.count} returns")
+                return self.matrix
+
+            closes = self._closes(matrix.symbols, since=matrix.last_date)
+            for date, row in zip(closes.index, closes.to_numpy(dtype=float)):
+                matrix.update(date, row)
+            return matrix
+
+    def basket_risk(self, symbols: Sequence[str]) -> Optional[Dict]:
+        """Equal-weight risk of a basket: annualized volatility, average correlation, diversification"""
+        with self._lock:
+            matrix = self.matrix
+            if matrix is None or matrix.count < MIN_CORRELATION_BARS:
+                return None
+            covered = [s for s in dict.fromkeys(symbols) if s in matrix.index]
+            if not covered:
+                return None
+            cov = matrix.sub_covariance(covered)
+            corr = matrix.correlation(covered)
+
+        k = len(covered)
+        weights = np.full(k, 1.0 / k)
+        stds = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+        basket_std = float(np.sqrt(max(weights @ cov @ weights, 0.0)))
+        risk = {
+            "symbols": k,
+            "coverage": round(k / len(symbols), 2),
+            "volatility": round(basket_std * float(np.sqrt(TRADING_DAYS)) * 100, 2),  # Annualized %
+            "avg_volatility": round(float(stds.mean() * np.sqrt(TRADING_DAYS)) * 100, 2),
+            "avg_correlation": None,
+            "diversification_ratio": round(float(weights @ stds) / basket_std, 2) if basket_std > 0 else None,
+            "max_pair": None,
+        }
+        if k > 1:
+            upper = np.triu_indices(k, 1)
+            pairs = corr[upper]
+            best = int(np.argmax(pairs))
+            risk["avg_correlation"] = round(float(pairs.mean()), 3)
+            risk["max_pair"] = {
+                "symbols": [covered[upper[0][best]], covered[upper[1][best]]],
+                "correlation": round(float(pairs[best]), 3),
+            }
+        return risk
+
+    def diversify(self, candidates: List, n: int, penalty: float = CORRELATION_PENALTY) -> List:
+        """Greedy top-n by confidence, discounting each pick by its highest correlation with those already picked"""
+        with self._lock:
+            matrix = self.matrix
+            if matrix is None or matrix.count < MIN_CORRELATION_BARS:
+                return sorted(candidates, key=lambda r: r.confidence, reverse=True)[:n]
+            covered = [r.symbol for r in candidates if r.symbol in matrix.index]
+            corr = matrix.correlation(covered) if covered else np.zeros((0, 0))
+        position = {symbol: i for i, symbol in enumerate(covered)}
+
+        chosen, remaining = [], list(candidates)
+        while remaining and len(chosen) < n:
+            def adjusted(r):
+                i = position.get(r.symbol)
+                picked = [position[c.symbol] for c in chosen if c.symbol in position]
+                if i is None or not picked:
+                    return r.confidence
+                return r.confidence - penalty * max(0.0, float(corr[i, picked].max()))
+            best = max(remaining, key=adjusted)
+            chosen.append(best)
+            remaining.remove(best)
+        return chosen
+
+
+correlation_service = CorrelationService()
@@ -0,0 +1,347 @@
+import os
+import re
+import json
+import time
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_providers import get_data_provider
+
+# Local on-disk OHLCV warehouse: one memory-mappable .npy file per symbol
+# plus a small JSON sidecar recording the last stored date. Daily bars live
+# directly under PRICE_STORE_DIR, intraday bars in one subdirectory per interval.
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", os.path.join("cache", "prices"))
+STORE_INITIAL_PERIOD = "2y"  # First download per symbol, later refreshes only fetch the tail
+PRICE_STORE_MAX_AGE = int(os.getenv("PRICE_STORE_MAX_AGE", 6 * 3600))  # Seconds before a delta refresh
+# Yahoo serves split/dividend-adjusted bars, so a corporate action re-scales the whole
+# history. A delta refresh re-fetches a completed stored bar; if its close moved by more
+# than this fraction the stored bars are on the old scale and the symbol is reloaded.
+PRICE_REBASE_TOLERANCE = float(os.getenv("PRICE_REBASE_TOLERANCE", 0.001))
+
+DAILY_INTERVAL = "1d"
+
+# Supported bar intervals. `window` is what the technical indicators look at,
+# `initial_period` the first download (inside Yahoo's 60-day limit for
+# sub-hourly bars) and also how much intraday history is kept, `max_age` the
+# seconds before a delta refresh, `bars_per_year` annualizes volatility
+# (US session length; NSE's 6h15m session is close enough).
+INTERVALS = {
+    "1d": {"window": "6mo", "initial_period": STORE_INITIAL_PERIOD, "max_age": PRICE_STORE_MAX_AGE, "bars_per_year": 252},
+    "1h": {"window": "1mo", "initial_period": "6mo", "max_age": 900, "bars_per_year": 252 * 7},
+    "15m": {"window": "5d", "initial_period": "1mo", "max_age": 300, "bars_per_year": 252 * 26},
+    "5m": {"window": "5d", "initial_period": "1mo", "max_age": 120, "bars_per_year": 252 * 78},
+}
+
+BAR_DTYPE = np.dtype([
+    ("date", "<i8"),  # nanoseconds since epoch (UTC)
+    ("Open", "<f8"),
+    ("High", "<f8"),
+    ("Low", "<f8"),
+    ("Close", "<f8"),
+    ("Volume", "<f8"),
+])
+# Intraday bars in single precision: 28 bytes per bar instead of 48, so a
+# month of 5m bars for the whole universe stays in memory comfortably
+COMPACT_BAR_DTYPE = np.dtype([
+    ("date", "<i8"),
+    ("Open", "<f4"),
+    ("High", "<f4"),
+    ("Low", "<f4"),
+    ("Close", "<f4"),
+    ("Volume", "<f4"),
+])
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def _period_offset(period: str):
+    if period.endswith("mo"):
+        return pd.DateOffset(months=int(period[:-2]))
+    if period.endswith("y"):
+        return pd.DateOffset(years=int(period[:-1]))
+    if period.endswith("d"):
+        return pd.Timedelta(days=int(period[:-1]))
+    return None
+
+
+def slice_period(hist: pd.DataFrame, period: str) -> pd.DataFrame:
+    """Trim a longer history to what yfinance would return for `period`"""
+    if hist is None or hist.empty:
+        return hist
+    offset = _period_offset(period)
+    if offset is None:
+        return hist
+
+    # Anchored on the newest bar rather than the wall clock so replayed recordings slice the same way
+    cutoff = hist.index[-1].normalize() - offset
+    return hist[hist.index >= cutoff]
+
+
+class PriceStore:
+    """Per-symbol bar files of one interval under cache/prices with incremental tail refresh"""
+
+    def __init__(self, root: str = PRICE_STORE_DIR, max_age: Optional[int] = None, interval: str = DAILY_INTERVAL):
+        if interval not in INTERVALS:
+            raise ValueError(f"Unsupported interval {interval!r}, expected one of {', '.join(INTERVALS)}")
+        self.root = root
+        self.interval = interval
+        self.max_age = INTERVALS[interval]["max_age"] if max_age is None else max_age
+        self.initial_period = INTERVALS[interval]["initial_period"]
+        self.bar_dtype = BAR_DTYPE if interval == DAILY_INTERVAL else COMPACT_BAR_DTYPE
+        # Daily requests keep their original shape (and recording keys)
+        self._fetch_kwargs = {} if interval == DAILY_INTERVAL else {"interval": interval}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._interval_stores: Dict[str, "PriceStore"] = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def for_interval(self, interval: str) -> "PriceStore":
+        """The store holding `interval` bars, kept in a subdirectory of this one"""
+        if interval == self.interval:
+            return self
+        with self._locks_guard:
+            store = self._interval_stores.get(interval)
+            if store is None:
+                store = self._interval_stores[interval] = PriceStore(os.path.join(self.root, interval), interval=interval)
+            return store
+
+    # ---------- paths & metadata ----------
+
+    def _file_stem(self, symbol: str) -> str:
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9._-]", "_", symbol.upper()))
+
+    def _bars_path(self, symbol: str) -> str:
+        return self._file_stem(symbol) + ".npy"
+
+    def _meta_path(self, symbol: str) -> str:
+        return self._file_stem(symbol) + ".json"
+
+    def _lock_for(self, symbol: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(symbol.upper(), threading.Lock())
+
+    def read_meta(self, symbol: str) -> Dict:
+        try:
+            with open(self._meta_path(symbol), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, symbol: str, meta: Dict):
+        tmp_path = self._meta_path(symbol) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(symbol))
+
+    def has(self, symbol: str) -> bool:
+        return os.path.exists(self._bars_path(symbol))
+
+    def last_date(self, symbol: str) -> Optional[pd.Timestamp]:
+        last = self.read_meta(symbol).get("last_date")
+        return pd.Timestamp(last) if last else None
+
+    def is_stale(self, symbol: str, max_age: Optional[int] = None) -> bool:
+        max_age = self.max_age if max_age is None else max_age
+        checked_at = self.read_meta(symbol).get("checked_at", 0)
+        return not self.has(symbol) or time.time() - checked_at > max_age
+
+    def stale_symbols(self, symbols: List[str], max_age: Optional[int] = None) -> List[str]:
+        return [s for s in symbols if self.is_stale(s, max_age)]
+
+    # ---------- reading ----------
+
+    def read(self, symbol: str) -> pd.DataFrame:
+        """Stored bars as a DataFrame shaped like yf.Ticker.history()"""
+        if not self.has(symbol):
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+        bars = np.load(self._bars_path(symbol), mmap_mode="r")
+        tz = self.read_meta(symbol).get("tz")
+        index = pd.to_datetime(np.asarray(bars["date"]), unit="ns", utc=True)
+        index = index.tz_convert(tz) if tz else index.tz_localize(None)
+        # Columns keep the stored dtype (float32 for intraday bars)
+        return pd.DataFrame({col: np.asarray(bars[col]) for col in OHLCV_COLUMNS}, index=index)
+
+    # ---------- writing ----------
+
+    def _to_bars(self, hist: pd.DataFrame) -> np.ndarray:
+        index = hist.index
+        if index.tz is None:
+            dates = index.tz_localize("UTC")
+        else:
+            dates = index.tz_convert("UTC")
+        bars = np.empty(len(hist), dtype=self.bar_dtype)
+        bars["date"] = dates.as_unit("ns").asi8
+        for col in OHLCV_COLUMNS:
+            bars[col] = hist[col].to_numpy(dtype=float) if col in hist else np.nan
+        return bars
+
+    def _trim(self, bars: np.ndarray) -> np.ndarray:
+        """Intraday files keep a rolling `initial_period` of bars instead of growing forever"""
+        if self.interval == DAILY_INTERVAL or len(bars) == 0:
+            return bars
+        newest = pd.Timestamp(int(bars["date"][-1]), unit="ns")
+        cutoff = (newest.normalize() - _period_offset(self.initial_period)).value
+        return bars[bars["date"] >= cutoff]
+
+    def _aligned(self, new_hist: pd.DataFrame, meta: Dict, existing: bool) -> pd.DataFrame:
+        """Fetched bars deduplicated, sorted and in the stored timezone convention"""
+        new_hist = new_hist[~new_hist.index.duplicated(keep="last")].sort_index()
+        # The first write fixes the symbol's timezone convention; bulk downloads
+        # can come back tz-naive while single-ticker history is tz-aware
+        if existing and meta.get("tz") and new_hist.index.tz is None:
+            new_hist = new_hist.tz_localize(meta["tz"])
+        elif existing and not meta.get("tz") and new_hist.index.tz is not None:
+            new_hist = new_hist.tz_localize(None)
+        return new_hist
+
+    def merge(self, symbol: str, new_hist: Optional[pd.DataFrame]):
+        """Append freshly fetched bars, replacing any overlapping (possibly partial) ones"""
+        meta = self.read_meta(symbol)
+        meta["checked_at"] = time.time()
+
+        if new_hist is not None and not new_hist.empty:
+            existing = self.has(symbol) and "last_date" in meta
+            new_hist = self._aligned(new_hist, meta, existing)
+            new_bars = self._to_bars(new_hist)
+
+            if existing:
+                stored = np.load(self._bars_path(symbol))
+                stored = stored[stored["date"] < new_bars["date"][0]]
+                bars = self._trim(np.concatenate([stored, new_bars]))
+            else:
+                bars = new_bars
+
+            tmp_path = self._bars_path(symbol) + ".tmp.npy"
+            np.save(tmp_path, bars)
+            os.replace(tmp_path, self._bars_path(symbol))
+
+            meta["last_date"] = new_hist.index[-1].isoformat()
+            meta["rows"] = int(len(bars))
+            if not existing:
+                meta["tz"] = str(new_hist.index.tz) if new_hist.index.tz is not None else None
+
+        self._write_meta(symbol, meta)
+
+    # ---------- refreshing ----------
+
+    def tail_start(self, symbol: str) -> Optional[str]:
+        """Date a delta refresh starts from: the day of the stored bar before the last one.
+        The last stored bar may have been partial; the one before it is complete, so the
+        overlap shows whether the upstream adjusted history was re-based since (see _rebased)."""
+        last = self.last_date(symbol)
+        if last is None or not self.has(symbol):
+            return None
+        dates = np.load(self._bars_path(symbol), mmap_mode="r")["date"]
+        if len(dates) < 2:
+            return last.strftime("%Y-%m-%d")
+        previous = pd.Timestamp(int(dates[-2]), unit="ns", tz="UTC")
+        previous = previous.tz_convert(last.tz) if last.tz is not None else previous.tz_localize(None)
+        return previous.strftime("%Y-%m-%d")
+
+    def _rebased(self, symbol: str, new_hist: Optional[pd.DataFrame]) -> bool:
+        """The oldest re-fetched bar closes away from its stored copy: a split or dividend
+        re-scaled the adjusted history, so appending the tail would leave a fake jump"""
+        if new_hist is None or new_hist.empty or not self.has(symbol):
+            return False
+        meta = self.read_meta(symbol)
+        new_bars = self._to_bars(self._aligned(new_hist, meta, "last_date" in meta))
+        stored = np.load(self._bars_path(symbol), mmap_mode="r")
+        overlap = np.flatnonzero(stored["date"] == new_bars["date"][0])
+        if len(overlap) == 0:
+            return False
+        old_close, new_close = float(stored["Close"][overlap[0]]), float(new_bars["Close"][0])
+        if not (np.isfinite(old_close) and np.isfinite(new_close)) or old_close == 0:
+            return False
+        return abs(new_close / old_close - 1) > PRICE_REBASE_TOLERANCE
+
+    def _drop(self, symbol: str):
+        """Forget the stored bars of a symbol, so the next merge starts it afresh (caller holds its lock)"""
+        for path in (self._bars_path(symbol), self._meta_path(symbol)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def fetch_tail(self, symbol: str) -> pd.DataFrame:
+        """Only the bars missing since the last stored date (the whole window on first use)"""
+        provider = get_data_provider()
+        start = self.tail_start(symbol)
+        if start is None:
+            return provider.history(symbol, period=self.initial_period, **self._fetch_kwargs)
+        return provider.history(symbol, start=start, **self._fetch_kwargs)
+
+    def refresh(self, symbol: str, max_age: Optional[int] = None):
+        """Delta-refresh one symbol if its stored bars are older than max_age"""
+        with self._lock_for(symbol):
+            if not self.is_stale(symbol, max_age):
+                return
+            print(f"💾 Refreshing stored {self.interval} bars for {symbol}")
+            tail = self.fetch_tail(symbol)
+            if self._rebased(symbol, tail):
+                print(f"💾 {symbol} history was re-adjusted upstream, reloading {self.initial_period} of {self.interval} bars")
+                self._drop(symbol)
+                tail = self.fetch_tail(symbol)
+            self.merge(symbol, tail)
+
+    def _merge_fetched(self, symbols: List[str], frames: Dict[str, pd.DataFrame],
+                       max_age: Optional[int]) -> List[str]:
+        """Merge bulk-fetched frames under each symbol's lock; returns the symbols whose
+        history was re-based upstream (dropped here, to be reloaded in full)"""
+        rebased = []
+        for symbol in symbols:
+            with self._lock_for(symbol):
+                if not self.is_stale(symbol, max_age):
+                    continue  # A concurrent refresh() got there first
+                frame = frames.get(symbol)
+                if self._rebased(symbol, frame):
+                    self._drop(symbol)
+                    rebased.append(symbol)
+                    continue
+                self.merge(symbol, frame)
+        return rebased
+
+    def refresh_many(self, symbols: List[str],
+                     bulk_fetch: Callable[..., Dict[str, pd.DataFrame]],
+                     max_age: Optional[int] = None):
+        """Delta-refresh many symbols through a multi-ticker fetcher"""
+        stale = self.stale_symbols(symbols, max_age)
+        if not stale:
+            return
+
+        # One bulk request per refetch start date, so a symbol that fell behind
+        # doesn't widen the delta request of every other one
+        starts: Dict[str, List[str]] = {}
+        new_symbols = []
+        for symbol in stale:
+            start = self.tail_start(symbol)
+            if start is None:
+                new_symbols.append(symbol)
+            else:
+                starts.setdefault(start, []).append(symbol)
+
+        for start, group in sorted(starts.items()):
+            frames = bulk_fetch(group, start=start, **self._fetch_kwargs)
+            rebased = self._merge_fetched(group, frames, max_age)
+            if rebased:
+                print(f"💾 History re-adjusted upstream for {', '.join(rebased)}, reloading {self.initial_period}")
+                new_symbols += rebased
+
+        if new_symbols:
+            frames = bulk_fetch(new_symbols, period=self.initial_period, **self._fetch_kwargs)
+            self._merge_fetched(new_symbols, frames, max_age)
+
+    def get_history(self, symbol: str, period: str = "6mo", max_age: Optional[int] = None) -> pd.DataFrame:
+        """Stored bars for `period`, refreshing the tail first if they are stale"""
+        try:
+            self.refresh(symbol, max_age)
+        except Exception as e:
+            # Serve whatever is on disk if the delta request fails
+            print(f"❌ Price store refresh failed for {symbol}: {e}")
+        return slice_period(self.read(symbol), period)
+
+
+# Shared store used by the analyzer, the backtester and the options router
+price_store = PriceStore()
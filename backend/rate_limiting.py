@@ -0,0 +1,294 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from metrics import metrics
+
+try:
+    import redis.asyncio as redis
+except ImportError:
+    redis = None
+
+# Per-client request limits. Each key (client IP, or client IP + route for routes with
+# their own limit) keeps two integers: the count of the current fixed window and the
+# count of the previous one. The sliding-window estimate weights the previous count by
+# how much of it still overlaps the last `window` seconds, so a check is O(1) and a key
+# costs the same memory at 1 request or 1000. Counts live in a backend: in-process
+# (LRU of keys, idle ones swept out) or Redis, so several workers can share limits.
+
+RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", 1000))  # Requests per window, per client
+RATE_LIMIT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW", 3600))  # Seconds
+# Extra limits for expensive routes, by path prefix: "/analyze/batch=60/3600,/fundamentals=600"
+RATE_LIMIT_ROUTES = os.getenv("RATE_LIMIT_ROUTES", "")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()  # memory | redis
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100_000))  # Memory backend bound
+RATE_LIMIT_SWEEP_SECONDS = 60  # Memory backend: how often idle keys are dropped
+
+
+def parse_route_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    """'/analyze/batch=60/3600,/fundamentals=600' -> {prefix: (requests, window)}"""
+    limits = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        prefix, _, limit = part.partition("=")
+        requests, _, window = limit.partition("/")
+        limits[prefix.strip()] = (int(requests), int(window or RATE_LIMIT_WINDOW))
+    return limits
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: int  # Seconds until the current fixed window rolls over
+    retry_after: int  # Seconds until the estimate drops below the limit (0 when allowed)
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(self.reset_after),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+
+def _decide(previous: int, current: int, limit: int, window: int, now: float) -> Decision:
+    """Sliding-window decision from the two window counts, before counting this request"""
+    elapsed = now % window
+    weight = 1 - elapsed / window  # Share of the previous window still inside the last `window` seconds
+    estimate = previous * weight + current
+    reset_after = max(1, int(window - elapsed))
+    if estimate + 1 <= limit:
+        remaining = int(limit - estimate - 1)
+        return Decision(True, limit, remaining, reset_after, 0)
+    if current + 1 > limit or previous == 0:
+        retry_after = reset_after  # Over the limit on this window alone
+    else:
+        # Seconds until previous * weight has decayed enough to admit one more
+        needed = (previous - (limit - current - 1)) / previous
+        retry_after = max(1, int((needed * window) - elapsed) + 1)
+    return Decision(False, limit, 0, reset_after, min(retry_after, reset_after))
+
+
+# Backends answer for several (key, window) pairs at once, so a request checks its
+# route and global limits in one round trip and only counts itself once both pass.
+
+class MemoryBackend:
+    """Window counts per key in an LRU; keys idle for two windows are swept out"""
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, sweep_seconds: float = RATE_LIMIT_SWEEP_SECONDS):
+        self.max_keys = max_keys
+        self.sweep_seconds = sweep_seconds
+        # key -> [window index, current count, previous count, window, last seen]
+        self._keys: "OrderedDict[str, List]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._swept_at = time.time()
+        self.evicted = 0
+
+    def _state(self, key: str, window: int, now: float) -> List:
+        """Counts of key rolled forward to now's window (caller holds the lock)"""
+        index = int(now // window)
+        state = self._keys.get(key)
+        if state is None:
+            state = self._keys[key] = [index, 0, 0, window, now]
+        elif state[0] != index:
+            # Roll over: the old current window becomes the previous one if adjacent
+            state[2] = state[1] if state[0] == index - 1 else 0
+            state[0], state[1] = index, 0
+        self._keys.move_to_end(key)
+        state[4] = now
+        return state
+
+    async def counts(self, keys: List[Tuple[str, int]], now: float) -> List[Tuple[int, int]]:
+        """(previous, current) count per (key, window)"""
+        with self._lock:
+            states = [self._state(key, window, now) for key, window in keys]
+            counts = [(state[2], state[1]) for state in states]
+            if now - self._swept_at >= self.sweep_seconds or len(self._keys) > self.max_keys:
+                self._sweep(now)
+        return counts
+
+    async def add(self, keys: List[Tuple[str, int]], now: float):
+        with self._lock:
+            for key, window in keys:
+                self._state(key, window, now)[1] += 1
+
+    def _sweep(self, now: float):
+        """Drop idle keys from the LRU end (caller holds the lock)"""
+        while self._keys:
+            key, state = next(iter(self._keys.items()))
+            if now - state[4] < 2 * state[3] and len(self._keys) <= self.max_keys:
+                break  # Everything after this one was seen more recently
+            del self._keys[key]
+            self.evicted += 1
+        self._swept_at = now
+
+    def stats(self) -> Dict:
+        return {"keys": len(self._keys), "max_keys": self.max_keys, "evicted": self.evicted}
+
+
+class RedisBackend:
+    """Window counts as expiring Redis integers ({prefix}{key}:{window index}), shared by all workers.
+    Takes an asyncio client (redis.asyncio), so the event loop never blocks on Redis."""
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: str, index: int) -> str:
+        return f"{self.prefix}{key}:{index}"
+
+    async def counts(self, keys: List[Tuple[str, int]], now: float) -> List[Tuple[int, int]]:
+        names = []
+        for key, window in keys:
+            index = int(now // window)
+            names += [self._key(key, index - 1), self._key(key, index)]
+        values = [int(value or 0) for value in await self.client.mget(*names)]
+        return [(values[i], values[i + 1]) for i in range(0, len(values), 2)]
+
+    async def add(self, keys: List[Tuple[str, int]], now: float):
+        # Check-then-increment: concurrent workers can overshoot by a request or two
+        pipe = self.client.pipeline()
+        for key, window in keys:
+            name = self._key(key, int(now // window))
+            pipe.incr(name)
+            pipe.expire(name, 2 * window)
+        await pipe.execute()
+
+    def stats(self) -> Dict:
+        return {"prefix": self.prefix}
+
+
+class LocalRedis:
+    """In-process stand-in for the few redis.asyncio commands RedisBackend uses (offline runs, benchmarks)"""
+
+    def __init__(self):
+        self._values: Dict[str, int] = {}
+        self._expires: Dict[str, float] = {}
+
+    def _live(self, key: str) -> Optional[int]:
+        if key in self._expires and self._expires[key] <= time.time():
+            self._values.pop(key, None)
+            self._expires.pop(key, None)
+        return self._values.get(key)
+
+    async def mget(self, *keys: str) -> List[Optional[bytes]]:
+        values = [self._live(key) for key in keys]
+        return [None if value is None else str(value).encode() for value in values]
+
+    def _incr(self, key: str) -> int:
+        self._values[key] = (self._live(key) or 0) + 1
+        return self._values[key]
+
+    def _expire(self, key: str, seconds: int) -> bool:
+        if self._live(key) is None:
+            return False
+        self._expires[key] = time.time() + seconds
+        return True
+
+    def pipeline(self):
+        return _LocalPipeline(self)
+
+
+class _LocalPipeline:
+    def __init__(self, client: LocalRedis):
+        self.client = client
+        self.commands = []
+
+    def incr(self, key: str):
+        self.commands.append((self.client._incr, (key,)))
+
+    def expire(self, key: str, seconds: int):
+        self.commands.append((self.client._expire, (key, seconds)))
+
+    async def execute(self) -> List:
+        results = [command(*args) for command, args in self.commands]
+        self.commands = []
+        return results
+
+
+def make_backend(kind: str = RATE_LIMIT_BACKEND, url: str = RATE_LIMIT_REDIS_URL):
+    if kind == "redis":
+        if redis is None:
+            print("⚠️ RATE_LIMIT_BACKEND=redis but the redis package is not installed, using in-process limits")
+            return MemoryBackend()
+        return RedisBackend(redis.Redis.from_url(url, socket_timeout=0.5))
+    if kind == "local-redis":
+        return RedisBackend(LocalRedis())
+    return MemoryBackend()
+
+
+class RateLimiter:
+    """Global per-client limit plus optional per-route limits, checked against one backend"""
+
+    def __init__(self, backend=None, limit: int = RATE_LIMIT_REQUESTS, window: int = RATE_LIMIT_WINDOW,
+                 routes: Optional[Dict[str, Tuple[int, int]]] = None):
+        self.backend = backend if backend is not None else make_backend()
+        self.limit = limit
+        self.window = window
+        self.routes = routes if routes is not None else parse_route_limits(RATE_LIMIT_ROUTES)
+        # Admitted requests are already counted by http_requests_total; only refusals here
+        self.counts = {"rejected": 0, "backend_errors": 0}
+
+    def route_limit(self, path: str) -> Optional[Tuple[str, int, int]]:
+        """Longest configured prefix of path, with its (requests, window)"""
+        matches = [prefix for prefix in self.routes if path.startswith(prefix)]
+        if not matches:
+            return None
+        prefix = max(matches, key=len)
+        return (prefix, *self.routes[prefix])
+
+    async def check(self, client: str, path: str, now: Optional[float] = None) -> Decision:
+        """Decide on the route limit (if any) and the client's global limit, and count the request
+        against both only if both allow it; the tighter answer wins"""
+        now = now or time.time()
+        limits = [("global", client, self.limit, self.window)]
+        route = self.route_limit(path)
+        if route is not None:
+            prefix, limit, window = route
+            limits.insert(0, ("route", f"{client}|{prefix}", limit, window))
+        keys = [(key, window) for _, key, _, window in limits]
+        try:
+            counts = await self.backend.counts(keys, now)
+            decisions = [_decide(previous, current, limit, window, now)
+                         for (_, _, limit, window), (previous, current) in zip(limits, counts)]
+            refused = [(scope, decision) for (scope, *_), decision in zip(limits, decisions) if not decision.allowed]
+            if not refused:
+                await self.backend.add(keys, now)
+        except Exception as e:
+            # A limiter outage (Redis down) should not take the API down with it
+            self.counts["backend_errors"] += 1
+            print(f"⚠️ Rate limit backend error, letting request through: {e}")
+            return Decision(True, self.limit, self.limit, self.window, 0)
+
+        if refused:
+            scope, decision = refused[0]
+            self.counts["rejected"] += 1
+            metrics.inc("rate_limit_rejections_total", scope=scope)
+            return decision
+        return min(decisions, key=lambda decision: decision.remaining)
+
+    def stats(self) -> Dict:
+        return {
+            "backend": self.backend.name,
+            "limit": self.limit,
+            "window": self.window,
+            "routes": {prefix: {"limit": limit, "window": window} for prefix, (limit, window) in self.routes.items()},
+            **self.backend.stats(),
+            **self.counts,
+        }
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,275 @@
+import gzip
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from metrics import metrics
+
+# Bounded cache for expensive per-symbol results (fundamentals). Entries sit in an
+# in-memory LRU capped by their pickled size, successful and failed results get
+# separate TTLs, concurrent loads of one key share a single loader call, and
+# successful results are also written to disk so a restart starts warm.
+
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join("cache", "results"))
+
+
+def _is_error(value: Any) -> bool:
+    return isinstance(value, dict) and "error" in value
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    stored_at: float
+    ttl: float
+    size: int  # Pickled bytes, what the memory bound counts
+
+    def expired(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) - self.stored_at >= self.ttl
+
+    def remaining(self, now: Optional[float] = None) -> float:
+        return max(0.0, self.stored_at + self.ttl - (now or time.time()))
+
+
+@dataclass
+class _Flight:
+    """A load in progress; later callers for the same key wait on it"""
+    done: threading.Event = field(default_factory=threading.Event)
+    value: Any = None
+    error: Optional[BaseException] = None
+
+
+class ResultCache:
+    """Size-bounded LRU of loader results with success/failure TTLs, single-flight loads and a disk tier"""
+
+    def __init__(self, name: str, ttl: float, error_ttl: float, max_bytes: int,
+                 is_error: Callable[[Any], bool] = _is_error, disk_dir: Optional[str] = RESULT_CACHE_DIR):
+        self.name = name
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_bytes = max_bytes
+        self.is_error = is_error
+        self.root = os.path.join(disk_dir, name) if disk_dir else None
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.counts = {"hits": 0, "disk_hits": 0, "loads": 0, "refreshes": 0, "coalesced": 0, "failed_results": 0,
+                       "load_exceptions": 0, "evictions": 0, "expired": 0}
+        if self.root:
+            os.makedirs(self.root, exist_ok=True)
+            self._prune_disk()
+
+    # ---------- memory tier ----------
+
+    def _count(self, name: str, result: Optional[str] = None):
+        with self._lock:
+            self.counts[name] += 1
+        if result:
+            metrics.inc("result_cache_requests_total", cache=self.name, result=result)
+
+    def _fresh(self, key: Hashable) -> Optional[CacheEntry]:
+        """Unexpired memory entry, marked most recently used (caller holds the lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expired():
+            self._drop(key)
+            self.counts["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _drop(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _remember(self, key: Hashable, entry: CacheEntry):
+        with self._lock:
+            self._drop(key)
+            if entry.size > self.max_bytes:
+                return  # Larger than the whole budget: disk only
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.counts["evictions"] += 1
+
+    # ---------- disk tier ----------
+
+    def _path(self, key: Hashable) -> str:
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9._-]", "_", str(key)) + ".pkl.gz")
+
+    def _read_disk(self, key: Hashable) -> Optional[CacheEntry]:
+        if not self.root:
+            return None
+        try:
+            with gzip.open(self._path(key), "rb") as f:
+                record = pickle.load(f)
+            if record["key"] != key:  # Another key with the same file name
+                return None
+            entry = CacheEntry(pickle.loads(record["payload"]), record["stored_at"], record["ttl"], len(record["payload"]))
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, KeyError, TypeError, ValueError):
+            return None
+        return None if entry.expired() else entry
+
+    def _write_disk(self, key: Hashable, entry: CacheEntry, payload: bytes):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            # The value goes in already pickled (payload), so it isn't serialized twice
+            record = {"key": key, "stored_at": entry.stored_at, "ttl": entry.ttl, "payload": payload}
+            with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                pickle.dump(record, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except (OSError, pickle.PicklingError) as e:
+            print(f"⚠️ Could not write {self.name} cache entry for {key}: {e}")
+
+    def _prune_disk(self):
+        """Drop expired files so the directory only holds what a restart can use"""
+        now, kept = time.time(), 0
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+                continue
+            try:
+                with gzip.open(path, "rb") as f:
+                    record = pickle.load(f)
+                if now - record["stored_at"] < record["ttl"]:
+                    kept += 1
+                    continue
+            except Exception:
+                pass
+            os.remove(path)
+        if kept:
+            print(f"🗄️ {self.name} cache: {kept} entries on disk from a previous run")
+
+    # ---------- lookups ----------
+
+    def entry(self, key: Hashable) -> Optional[CacheEntry]:
+        """Unexpired entry from memory, else from disk (moved into memory)"""
+        with self._lock:
+            entry = self._fresh(key)
+        if entry is None:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+        return entry
+
+    def get(self, key: Hashable) -> Any:
+        """Cached value or None, without loading"""
+        entry = self.entry(key)
+        return entry.value if entry is not None else None
+
+    def expires_in(self, key: Hashable) -> float:
+        """Seconds until the cached value expires, 0 if there is none"""
+        entry = self.entry(key)
+        return entry.remaining() if entry is not None else 0.0
+
+    def put(self, key: Hashable, value: Any) -> CacheEntry:
+        failed = self.is_error(value)
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        entry = CacheEntry(value, time.time(), self.error_ttl if failed else self.ttl, len(payload))
+        self._remember(key, entry)
+        if failed:
+            self._count("failed_results")
+        elif self.root:
+            self._write_disk(key, entry, payload)
+        return entry
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Cached value, else one loader() call shared by every concurrent caller for the key"""
+        return self._single_flight(key, loader, refresh=False)
+
+    def refresh(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Reload ahead of expiry; readers keep getting the cached value meanwhile, and a failed
+        reload leaves an unexpired successful value in place"""
+        return self._single_flight(key, loader, refresh=True)
+
+    def _single_flight(self, key: Hashable, loader: Callable[[], Any], refresh: bool) -> Any:
+        with self._lock:
+            entry = None if refresh else self._fresh(key)
+            if entry is None:
+                flight = self._inflight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._inflight[key] = _Flight()
+
+        if entry is not None:
+            self._count("hits", "hit")
+            return entry.value
+        if not leader:
+            self._count("coalesced", "coalesced")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            entry = None if refresh else self._read_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+                self._count("disk_hits", "disk")
+                flight.value = entry.value
+                return flight.value
+
+            self._count("refreshes" if refresh else "loads", "refresh" if refresh else "load")
+            value = loader()
+            current = self.entry(key) if refresh and self.is_error(value) else None
+            if current is not None and not self.is_error(current.value):
+                value = current.value
+            else:
+                self.put(key, value)
+            flight.value = value
+            return value
+        except BaseException as e:
+            self._count("load_exceptions")
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._drop(key)
+        if self.root:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries, used = len(self._entries), self._bytes
+            failed = sum(1 for entry in self._entries.values() if self.is_error(entry.value))
+            counts = dict(self.counts)
+        lookups = counts["hits"] + counts["disk_hits"] + counts["loads"] + counts["coalesced"]
+        return {
+            "entries": entries,
+            "failed_entries": failed,
+            "bytes": used,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "error_ttl": self.error_ttl,
+            "inflight": len(self._inflight),
+            "hit_ratio": round((lookups - counts["loads"]) / lookups, 3) if lookups else None,
+            **counts,
+        }
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import Dict, List
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 from news_analysis import AdvancedStockAnalyzer
-from stocks import INDIA_STOCKS, US_STOCKS
+from price_store import INTERVALS
+from stocks import symbol_registry
+from sector_analytics import get_sector_snapshot
+from portfolio_risk import correlation_service
+from streaming import SignalStream, PollingQuoteSource, SimulatedQuoteSource
+from serialization import EncodedCache, body_etag, cached_json_response, dumps, with_fields
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import threading
@@ -15,6 +20,36 @@ analyzer = AdvancedStockAnalyzer()
 # Thread pool for heavy operations
 executor = ThreadPoolExecutor(max_workers=2)
 
+# Bar interval of the live-signals run (1d, 1h, 15m or 5m), switchable via /force-analysis
+LIVE_SIGNALS_INTERVAL = os.getenv("LIVE_SIGNALS_INTERVAL", "1d")
+if LIVE_SIGNALS_INTERVAL not in INTERVALS:
+    print(f"⚠️ Unknown LIVE_SIGNALS_INTERVAL {LIVE_SIGNALS_INTERVAL!r}, using 1d")
+    LIVE_SIGNALS_INTERVAL = "1d"
+
+# How old live signals may get before a re-run, per interval
+SIGNALS_MAX_AGE = {
+    "1d": timedelta(hours=24),
+    "1h": timedelta(hours=1),
+    "15m": timedelta(minutes=15),
+    "5m": timedelta(minutes=5),
+}
+
+# Optional quote stream keeping the top signals current between full runs (off | yahoo | simulated)
+LIVE_STREAM_SOURCE = os.getenv("LIVE_STREAM_SOURCE", "off")
+LIVE_STREAM_POLL_SECONDS = float(os.getenv("LIVE_STREAM_POLL_SECONDS", 15))
+# With a running stream, full runs are only needed to refresh news and sentiment
+STREAMED_MAX_AGE = timedelta(hours=1)
+
+signal_stream = None
+
+# Encoded bytes of signal_cache["data"], redone only when the cached lists are replaced
+signals_encoding = EncodedCache()
+# Polls within a minute may be served from the browser/CDN cache; after that they revalidate (304 if unchanged)
+LIVE_SIGNALS_CACHE_CONTROL = "public, max-age=60"
+
+# Pick each top-5 basket with a correlation penalty instead of by confidence alone
+LIVE_SIGNALS_DIVERSIFY = os.getenv("LIVE_SIGNALS_DIVERSIFY", "false").lower() in ("1", "true", "yes")
+
 # Auto-start analysis on module load
 def auto_start_analysis():
     """Auto-start analysis when the module is loaded."""
@@ -30,8 +65,8 @@ def auto_start_analysis():
             should_start = True
         elif signal_cache["last_updated"]:
             age_hours = (datetime.now() - signal_cache["last_updated"]).total_seconds() / 3600
-            if age_hours > 24:
-                print(f"🚀 Data is {age_hours:.1f}h old - starting refresh analysis...")
+            if signals_are_stale(datetime.now()):
+                print(f"🚀 Data is {age_hours:.1f}h old ({signal_cache['data_interval']} bars) - starting refresh analysis...")
                 should_start = True
         
         if should_start and not signal_cache["is_analyzing"]:
@@ -50,9 +85,54 @@ signal_cache = {
     "is_analyzing": False,
     "analysis_progress": 0,
     "analysis_count": 0,  # Track number of analyses completed
-    "last_error": None    # Track last error for debugging
+    "last_error": None,   # Track last error for debugging
+    "interval": LIVE_SIGNALS_INTERVAL,  # Interval the next run analyzes
+    "data_interval": None,  # Interval the cached signals were computed on
+    "stream_updated": None,  # Last time the quote stream re-scored the cached signals
+    "diversify": LIVE_SIGNALS_DIVERSIFY  # Correlation-aware basket selection
 }
 
+
+def signals_are_stale(now: datetime) -> bool:
+    """Cached signals are older than their interval allows, or from a different interval"""
+    interval = signal_cache["interval"]
+    max_age = SIGNALS_MAX_AGE.get(interval, timedelta(hours=24))
+    if signal_stream is not None and signal_stream.running and signal_stream.interval == interval:
+        max_age = max(max_age, STREAMED_MAX_AGE)
+    return (
+        signal_cache["last_updated"] is None
+        or signal_cache["data_interval"] != interval
+        or (now - signal_cache["last_updated"]) > max_age
+    )
+
+
+def restart_signal_stream(results, interval: str):
+    """Re-seed the quote stream from a finished analysis run and (re)start polling"""
+    global signal_stream
+    if LIVE_STREAM_SOURCE == "off":
+        return
+    if signal_stream is not None:
+        signal_stream.stop()
+
+    analyzed = [r for r in results if not r.error]
+    if LIVE_STREAM_SOURCE == "simulated":
+        source = SimulatedQuoteSource({r.symbol: r.price for r in analyzed})
+    else:
+        source = PollingQuoteSource([r.symbol for r in analyzed])
+
+    stream = SignalStream(analyzer, source, interval)
+    stream.seed(analyzed)
+
+    def on_update(changed):
+        if stream is not signal_stream:
+            return  # A poll of a replaced stream finishing late
+        signal_cache["data"] = build_signal_lists(stream.snapshot())
+        signal_cache["stream_updated"] = datetime.now()
+
+    stream.on_update = on_update
+    signal_stream = stream
+    stream.start(LIVE_STREAM_POLL_SECONDS)
+
 # File paths for data persistence
 CACHE_DIR = "cache"
 SIGNALS_CACHE_FILE = os.path.join(CACHE_DIR, "live_signals.json")
@@ -119,6 +199,7 @@ def initialize_from_previous_data():
             signal_cache["data"] = saved_data
             signal_cache["last_updated"] = saved_metadata.get("last_updated")
             signal_cache["analysis_count"] = saved_metadata.get("analysis_count", 0)
+            signal_cache["data_interval"] = saved_metadata.get("interval", "1d")
             
             # Calculate age
             if signal_cache["last_updated"]:
@@ -131,10 +212,89 @@ def initialize_from_previous_data():
             # Don't set any default data - let the analysis run first
 
 
+def format_signal(r):
+    """Live-signal entry for one SignalResult"""
+    try:
+        # Ensure all values are properly typed and not NaN/inf
+        price = r.price if r.price is not None and str(r.price).lower() not in ['nan', 'inf', '-inf'] else None
+        confidence = r.confidence if r.confidence is not None and str(r.confidence).lower() not in ['nan', 'inf', '-inf'] else None
+
+        # Get technical signals safely
+        rsi = getattr(r.technical_signals, "rsi", None) if hasattr(r, 'technical_signals') and r.technical_signals else None
+        change = getattr(r.technical_signals, "price_momentum", None) if hasattr(r, 'technical_signals') and r.technical_signals else None
+
+        # Clean numeric values
+        if rsi is not None and str(rsi).lower() not in ['nan', 'inf', '-inf']:
+            rsi = round(float(rsi), 1)
+        else:
+            rsi = None
+
+        if change is not None and str(change).lower() not in ['nan', 'inf', '-inf']:
+            change = round(float(change), 1)
+        else:
+            change = None
+
+        return {
+            "symbol": str(r.symbol) if r.symbol else "UNKNOWN",
+            "price": round(float(price), 2) if price is not None else None,
+            "signal": str(r.signal) if r.signal else "UNKNOWN",
+            "confidence": round(float(confidence), 1) if confidence is not None else None,
+            "rsi": rsi,
+            "change": change,
+            "last_updated": datetime.now().isoformat()
+        }
+    except Exception as e:
+        print(f"Error formatting signal for {getattr(r, 'symbol', 'UNKNOWN')}: {e}")
+        return {
+            "symbol": str(getattr(r, 'symbol', 'UNKNOWN')),
+            "price": None,
+            "signal": str(getattr(r, 'signal', 'UNKNOWN')),
+            "confidence": None,
+            "rsi": None,
+            "change": None,
+            "last_updated": datetime.now().isoformat()
+        }
+
+
+def process_stocks(results, market):
+    """Top buy and sell signals of one market"""
+    market_results = [r for r in results if symbol_registry.market_of(r.symbol) == market]
+
+    # Filter signals with minimum confidence threshold and sort by confidence
+    buy_candidates = [r for r in market_results if r.signal in ("STRONG_BUY", "BUY") and r.confidence >= 20.0]
+    sell_candidates = [r for r in market_results if r.signal in ("STRONG_SELL", "SELL") and r.confidence >= 20.0]
+
+    if signal_cache["diversify"]:
+        buy_signals = correlation_service.diversify(buy_candidates, 5)
+        sell_signals = correlation_service.diversify(sell_candidates, 5)
+    else:
+        buy_signals = sorted(buy_candidates, key=lambda x: x.confidence, reverse=True)[:5]
+        sell_signals = sorted(sell_candidates, key=lambda x: x.confidence, reverse=True)[:5]
+
+    return {
+        "buy": [format_signal(r) for r in buy_signals],
+        "sell": [format_signal(r) for r in sell_signals],
+        # Equal-weight basket volatility and correlation from the universe return matrix
+        "risk": {
+            "buy": correlation_service.basket_risk([r.symbol for r in buy_signals]),
+            "sell": correlation_service.basket_risk([r.symbol for r in sell_signals])
+        }
+    }
+
+
+def build_signal_lists(results) -> Dict[str, Dict[str, List[Dict]]]:
+    """Top buy/sell lists per market, as cached and served by /live-top-signals"""
+    return {
+        "india": process_stocks(results, "india"),
+        "us": process_stocks(results, "us")
+    }
+
+
 def analyze_all_stocks_sync() -> Dict[str, Dict[str, List[Dict]]]:
     """Synchronous stock analysis function to run in thread pool."""
     try:
-        print("🔄 Starting daily stock analysis in background...")
+        interval = signal_cache["interval"]
+        print(f"🔄 Starting {interval} stock analysis in background...")
         start_time = datetime.now()
         
         # Mark as analyzing
@@ -142,82 +302,27 @@ def analyze_all_stocks_sync() -> Dict[str, Dict[str, List[Dict]]]:
         signal_cache["analysis_progress"] = 0
 
         # Run the heavy analysis
-        results = analyzer.analyze_portfolio(INDIA_STOCKS + US_STOCKS)
+        universe = symbol_registry.symbols("india") + symbol_registry.symbols("us")
+        results = analyzer.analyze_portfolio(universe, interval=interval)
         signal_cache["analysis_progress"] = 50
 
         # Validate results
         if not results or not isinstance(results, list):
             raise ValueError("Invalid results from analyzer")
 
-        # Internal helper to process market data
-        def process_stocks(stock_list):
-            market_results = [r for r in results if r.symbol in stock_list]
-
-            # Filter signals with minimum confidence threshold and sort by confidence
-            buy_candidates = [r for r in market_results if r.signal in ("STRONG_BUY", "BUY") and r.confidence >= 20.0]
-            sell_candidates = [r for r in market_results if r.signal in ("STRONG_SELL", "SELL") and r.confidence >= 20.0]
-            
-            buy_signals = sorted(buy_candidates, key=lambda x: x.confidence, reverse=True)[:5]
-            sell_signals = sorted(sell_candidates, key=lambda x: x.confidence, reverse=True)[:5]
-            
-            
-
-            def format_signal(r):
-                try:
-                    # Ensure all values are properly typed and not NaN/inf
-                    price = r.price if r.price is not None and str(r.price).lower() not in ['nan', 'inf', '-inf'] else None
-                    confidence = r.confidence if r.confidence is not None and str(r.confidence).lower() not in ['nan', 'inf', '-inf'] else None
-                    
-                    # Get technical signals safely
-                    rsi = getattr(r.technical_signals, "rsi", None) if hasattr(r, 'technical_signals') and r.technical_signals else None
-                    change = getattr(r.technical_signals, "price_momentum", None) if hasattr(r, 'technical_signals') and r.technical_signals else None
-                    
-                    # Clean numeric values
-                    if rsi is not None and str(rsi).lower() not in ['nan', 'inf', '-inf']:
-                        rsi = round(float(rsi), 1)
-                    else:
-                        rsi = None
-                        
-                    if change is not None and str(change).lower() not in ['nan', 'inf', '-inf']:
-                        change = round(float(change), 1)
-                    else:
-                        change = None
-                    
-                    return {
-                        "symbol": str(r.symbol) if r.symbol else "UNKNOWN",
-                        "price": round(float(price), 2) if price is not None else None,
-                        "signal": str(r.signal) if r.signal else "UNKNOWN",
-                        "confidence": round(float(confidence), 1) if confidence is not None else None,
-                        "rsi": rsi,
-                        "change": change,
-                        "last_updated": datetime.now().isoformat()
-                    }
-                except Exception as e:
-                    print(f"Error formatting signal for {getattr(r, 'symbol', 'UNKNOWN')}: {e}")
-                    return {
-                        "symbol": str(getattr(r, 'symbol', 'UNKNOWN')),
-                        "price": None,
-                        "signal": str(getattr(r, 'signal', 'UNKNOWN')),
-                        "confidence": None,
-                        "rsi": None,
-                        "change": None,
-                        "last_updated": datetime.now().isoformat()
-                    }
-
-            return {
-                "buy": [format_signal(r) for r in buy_signals],
-                "sell": [format_signal(r) for r in sell_signals]
-            }
-
         signal_cache["analysis_progress"] = 75
 
+        # New daily bars from this run go into the universe correlation matrix
+        try:
+            correlation_service.refresh(universe)
+        except Exception as e:
+            print(f"❌ Correlation matrix update failed: {e}")
+
         # Update cache AFTER successful processing
-        processed_data = {
-            "india": process_stocks(INDIA_STOCKS),
-            "us": process_stocks(US_STOCKS)
-        }
+        processed_data = build_signal_lists(results)
 
         signal_cache["data"] = processed_data
+        signal_cache["data_interval"] = interval
         signal_cache["last_updated"] = datetime.now()
         signal_cache["is_analyzing"] = False
         signal_cache["analysis_progress"] = 100
@@ -228,10 +333,17 @@ def analyze_all_stocks_sync() -> Dict[str, Dict[str, List[Dict]]]:
         metadata = {
             "last_updated": signal_cache["last_updated"],
             "analysis_count": signal_cache["analysis_count"],
-            "analysis_duration": str(datetime.now() - start_time)
+            "analysis_duration": str(datetime.now() - start_time),
+            "interval": interval
         }
         save_signals_to_file(processed_data, metadata)
 
+        # Keep the lists current from quotes until the next full run
+        try:
+            restart_signal_stream(results, interval)
+        except Exception as e:
+            print(f"❌ Could not start quote stream: {e}")
+
         print(f"✅ Analysis #{signal_cache['analysis_count']} completed in {datetime.now() - start_time}")
         print(f"📅 Cache updated at: {signal_cache['last_updated']}")
         return processed_data
@@ -275,16 +387,13 @@ def start_background_analysis():
 
 
 @router.get("/live-top-signals")
-async def get_live_top_signals():
+async def get_live_top_signals(request: Request):
     """Always return cached data if available, trigger background analysis if needed."""
     try:
         now = datetime.now()
         
-        # Check if cache is stale (older than 24 hours)
-        cache_is_stale = (
-            signal_cache["last_updated"] is None
-            or (now - signal_cache["last_updated"]) > timedelta(hours=24)
-        )
+        # Check if cache is stale (older than its interval allows, 24 hours for daily bars)
+        cache_is_stale = signals_are_stale(now)
         
         # Start background analysis if cache is stale and not already analyzing
         if cache_is_stale and not signal_cache["is_analyzing"]:
@@ -302,37 +411,38 @@ async def get_live_top_signals():
                 if signal_cache["last_updated"] else 999
             )
             
-            # Ensure all metadata values are JSON serializable
+            # Ensure all metadata values are JSON serializable. Only fields that change with the
+            # data go in the body (the ETag depends on them); clients work out the cache age from
+            # last_updated, which carries its UTC offset for that
             try:
-                cache_age_hours = round(float(cache_age_hours), 1) if cache_age_hours != 999 else None
                 analysis_progress = int(signal_cache["analysis_progress"]) if signal_cache["analysis_progress"] is not None else 0
                 analysis_count = int(signal_cache["analysis_count"]) if signal_cache["analysis_count"] is not None else 0
                 
-                response_data = {
-                    **signal_cache["data"],
-                    "metadata": {
-                        "last_updated": signal_cache["last_updated"].isoformat() if signal_cache["last_updated"] else None,
-                        "is_analyzing": bool(signal_cache["is_analyzing"]),
-                        "analysis_progress": analysis_progress,
-                        "cache_age_hours": cache_age_hours,
-                        "analysis_count": analysis_count,
-                        "status": "analyzing" if signal_cache["is_analyzing"] else ("stale" if cache_age_hours and cache_age_hours > 24 else "fresh"),
-                        "message": (
-                            f"Analysis in progress ({analysis_progress}%), showing cached data"
-                            if signal_cache["is_analyzing"]
-                            else f"Data is {cache_age_hours}h old" if cache_age_hours and cache_age_hours > 1
-                            else "Fresh data"
-                        ),
-                        "next_update": "In progress" if signal_cache["is_analyzing"] else "Within 24 hours"
-                    }
+                metadata = {
+                    "last_updated": signal_cache["last_updated"].astimezone().isoformat() if signal_cache["last_updated"] else None,
+                    "is_analyzing": bool(signal_cache["is_analyzing"]),
+                    "analysis_progress": analysis_progress,
+                    "analysis_count": analysis_count,
+                    "interval": signal_cache["data_interval"],
+                    "diversified": bool(signal_cache["diversify"]),
+                    "stream_updated": signal_cache["stream_updated"].astimezone().isoformat() if signal_cache["stream_updated"] else None,
+                    "status": "analyzing" if signal_cache["is_analyzing"] else ("stale" if cache_is_stale else "fresh"),
+                    "next_update": "In progress" if signal_cache["is_analyzing"] else f"Within {SIGNALS_MAX_AGE.get(signal_cache['interval'], timedelta(hours=24))}"
                 }
             except Exception as e:
                 print(f"Error creating response metadata: {e}")
                 # Fallback to basic response
-                response_data = signal_cache["data"]
+                metadata = None
             
-            print(f"✅ Returning cached data (Age: {response_data['metadata']['cache_age_hours']:.1f}h, Status: {response_data['metadata']['status']})")
-            return response_data
+            # The signal lists are encoded once per analysis run or stream update
+            encoded = signals_encoding.get(signal_cache["data"])
+            if metadata is None:
+                return cached_json_response(request, encoded.body, LIVE_SIGNALS_CACHE_CONTROL, encoded.etag)
+            print(f"✅ Returning cached data (Age: {cache_age_hours:.1f}h, Status: {metadata['status']})")
+            # Version = the lists' ETag plus the metadata, so polls get a 304 until the data changes
+            metadata_json = dumps(metadata)
+            etag = body_etag(encoded.etag.encode() + metadata_json)
+            return cached_json_response(request, with_fields(encoded.body, metadata=metadata), LIVE_SIGNALS_CACHE_CONTROL, etag)
         
         # No cached data available - first time or after error
         if signal_cache["is_analyzing"]:
@@ -381,6 +491,8 @@ async def get_analysis_status():
         "progress": signal_cache["analysis_progress"],
         "last_updated": signal_cache["last_updated"].isoformat() if signal_cache["last_updated"] else None,
         "has_data": signal_cache["data"] is not None,
+        "interval": signal_cache["interval"],
+        "data_interval": signal_cache["data_interval"],
         "cache_age_hours": (
             (datetime.now() - signal_cache["last_updated"]).total_seconds() / 3600
             if signal_cache["last_updated"] else None
@@ -388,20 +500,57 @@ async def get_analysis_status():
     }
 
 
+@router.get("/stream-status")
+async def get_stream_status():
+    """Quote stream state: source, symbols tracked and the last re-score."""
+    stream = signal_stream
+    return {
+        "source": LIVE_STREAM_SOURCE,
+        "running": bool(stream and stream.running),
+        "interval": stream.interval if stream else None,
+        "symbols": len(stream.rings) if stream else 0,
+        "updates": stream.updates if stream else 0,
+        "last_tick": datetime.fromtimestamp(stream.last_tick).isoformat() if stream and stream.last_tick else None,
+    }
+
+
+@router.get("/sector-analytics")
+async def get_sector_analytics():
+    """Sector scores, breadth and momentum plus each market's rotation and sentiment from the last full run."""
+    snapshot = get_sector_snapshot()
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="No recent sector analytics, run an analysis first")
+    data = snapshot.to_dict()
+    data["created"] = datetime.fromtimestamp(snapshot.created).isoformat()
+    return data
+
+
 @router.post("/force-analysis")
-async def force_analysis(background_tasks: BackgroundTasks):
-    """Force start a new analysis (admin endpoint)."""
+async def force_analysis(background_tasks: BackgroundTasks, interval: Optional[str] = None,
+                         diversify: Optional[bool] = None):
+    """Force start a new analysis (admin endpoint), optionally switching the bar interval or basket selection."""
     if signal_cache["is_analyzing"]:
         raise HTTPException(
             status_code=409,  # Conflict
             detail="Analysis already in progress"
         )
+    if interval is not None:
+        if interval not in INTERVALS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported interval, use one of: {', '.join(INTERVALS)}"
+            )
+        signal_cache["interval"] = interval
+    if diversify is not None:
+        signal_cache["diversify"] = diversify
     
-    print("🔄 Force starting analysis...")
+    print(f"🔄 Force starting {signal_cache['interval']} analysis...")
     start_background_analysis()
     
     return {
         "message": "Analysis started in background",
+        "interval": signal_cache["interval"],
+        "diversify": signal_cache["diversify"],
         "estimated_time": "2-3 minutes"
     }
 
@@ -6,6 +6,8 @@ from typing import Optional, Dict, List
 from fastapi.middleware.cors import CORSMiddleware
 import numpy as np
 from pydantic import BaseModel
+from price_store import price_store
+from stocks import get_full_symbol
 
 app = FastAPI()
 
@@ -18,6 +20,7 @@ app.add_middleware(
 )
 
 LOT_SIZE = 100
+SPOT_PRICE_MAX_AGE = 300  # Spot quotes only need a delta refresh every 5 minutes
 router = APIRouter()
 
 def normalize_premiums(premium_dict):
@@ -402,15 +405,42 @@ class OptionStrategies:
         profit = (net_payoff - net_debit) * LOT_SIZE
         return round(profit, 2)
 
+STRATEGY_NAMES = [
+    "long_call", "long_put", "covered_call", "protective_put",
+    "straddle", "strangle", "bull_call_spread", "bear_put_spread",
+    "bear_call_spread", "bull_put_spread", "iron_condor", "butterfly_spread"
+]
+
+def evaluate_strategy_grid(price_points, selected_strike, current_price, calls, puts,
+                           user_premiums=None, user_strategy_premiums=None):
+    """P&L of every strategy at each expiry price, one row per price point"""
+    results = []
+    for price in price_points:
+        row = {'Price at Expiry': f"${round(price, 2)}"}
+        strategies = OptionStrategies(
+            price, selected_strike, current_price, calls, puts,
+            user_premiums=user_premiums, user_strategy_premiums=user_strategy_premiums
+        )
+        for strat in STRATEGY_NAMES:
+            try:
+                pnl = getattr(strategies, strat)()
+                row[strat] = round(pnl, 2) if pnl is not None else "N/A"
+            except Exception:
+                row[strat] = "N/A"
+        row['premium_breakdown'] = strategies.premium_breakdown()
+        results.append(row)
+    return results
+
 @router.get("/options-strategy-pnl")
 def get_strategy_pnl(
     ticker: str = Query(...), 
     expiry: Optional[str] = Query(None), 
     strike: Optional[float] = Query(None)
 ):
+    ticker = get_full_symbol(ticker)  # Aliases like RELIANCE -> RELIANCE.NS
     try:
         stock = yf.Ticker(ticker.upper())
-        current_price = stock.history(period='1d')['Close'].iloc[-1]
+        current_price = price_store.get_history(ticker.upper(), "5d", max_age=SPOT_PRICE_MAX_AGE)['Close'].iloc[-1]
         if pd.isna(current_price) or current_price <= 0:
             return JSONResponse({"error": f"Invalid price data for {ticker}."}, status_code=400)
 
@@ -440,22 +470,7 @@ def get_strategy_pnl(
         upper_bound = selected_strike * 1.1
         price_points = [s for s in valid_strikes if lower_bound <= s <= upper_bound]
 
-        results = []
-        for price in price_points:
-            row = {'Price at Expiry': f"${round(price, 2)}"}
-            strategies = OptionStrategies(price, selected_strike, current_price, calls, puts)
-            for strat in [
-                "long_call", "long_put", "covered_call", "protective_put",
-                "straddle", "strangle", "bull_call_spread", "bear_put_spread",
-                "bear_call_spread", "bull_put_spread", "iron_condor", "butterfly_spread"
-            ]:
-                try:
-                    pnl = getattr(strategies, strat)()
-                    row[strat] = round(pnl, 2) if pnl is not None else "N/A"
-                except Exception:
-                    row[strat] = "N/A"
-            row['premium_breakdown'] = strategies.premium_breakdown()
-            results.append(row)
+        results = evaluate_strategy_grid(price_points, selected_strike, current_price, calls, puts)
 
         df = pd.DataFrame(results)
 
@@ -515,9 +530,10 @@ async def get_strategy_pnl_custom(
     else:
         strategy_premiums = json_body  # e.g. {"bull_call_spread": {"buy_premium": ...}}
 
+    ticker = get_full_symbol(ticker)  # Aliases like RELIANCE -> RELIANCE.NS
     try:
         stock = yf.Ticker(ticker.upper())
-        current_price = stock.history(period='1d')['Close'].iloc[-1]
+        current_price = price_store.get_history(ticker.upper(), "5d", max_age=SPOT_PRICE_MAX_AGE)['Close'].iloc[-1]
         if pd.isna(current_price) or current_price <= 0:
             return JSONResponse({"error": f"Invalid price data for {ticker}."}, status_code=400)
 
@@ -547,25 +563,10 @@ async def get_strategy_pnl_custom(
         upper_bound = selected_strike * 1.1
         price_points = [s for s in valid_strikes if lower_bound <= s <= upper_bound]
 
-        results = []
-        for price in price_points:
-            row = {'Price at Expiry': f"${round(price, 2)}"}
-            strategies = OptionStrategies(
-                price, selected_strike, current_price, calls, puts,
-                user_premiums=premium_data, user_strategy_premiums=strategy_premiums
-            )
-            for strat in [
-                "long_call", "long_put", "covered_call", "protective_put",
-                "straddle", "strangle", "bull_call_spread", "bear_put_spread",
-                "bear_call_spread", "bull_put_spread", "iron_condor", "butterfly_spread"
-            ]:
-                try:
-                    pnl = getattr(strategies, strat)()
-                    row[strat] = round(pnl, 2) if pnl is not None else "N/A"
-                except Exception:
-                    row[strat] = "N/A"
-            row['premium_breakdown'] = strategies.premium_breakdown()
-            results.append(row)
+        results = evaluate_strategy_grid(
+            price_points, selected_strike, current_price, calls, puts,
+            user_premiums=premium_data, user_strategy_premiums=strategy_premiums
+        )
 
         df = pd.DataFrame(results)
 
@@ -0,0 +1,227 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from stocks import symbol_registry
+
+# Sector and market aggregates over one portfolio run's results. Every symbol is
+# grouped by (market, sector) from the symbol registry and the group statistics
+# are bincounts over flat arrays, so the pass costs one grouped computation and
+# no extra fetches. The aggregates give MarketContext real sector_rotation and
+# market_sentiment values and each symbol a small score tilt toward strong sectors.
+
+# Investment style of each registry sector, for sector rotation
+SECTOR_STYLES = {
+    "Information Technology": "GROWTH",
+    "Communication Services": "GROWTH",
+    "Consumer Discretionary": "GROWTH",
+    "Financials": "VALUE",
+    "Energy": "VALUE",
+    "Industrials": "VALUE",
+    "Materials": "VALUE",
+    "Consumer Staples": "DEFENSIVE",
+    "Health Care": "DEFENSIVE",
+    "Utilities": "DEFENSIVE",
+    "Real Estate": "DEFENSIVE",
+}
+
+# Group score: mean technical score, mean sentiment (%) and breadth, each on -100..100
+TECHNICAL_WEIGHT, SENTIMENT_WEIGHT, BREADTH_WEIGHT = 0.4, 0.3, 0.3
+
+MIN_MARKET_SYMBOLS = 10  # Fewer analyzed symbols than this and a market gets no context
+MIN_SECTOR_SYMBOLS = 3   # Smaller sectors get no relative-strength tilt
+SENTIMENT_THRESHOLD = 25  # Market mood score beyond +/- this is GREED / FEAR
+
+SECTOR_TILT_SCALE = 0.2  # Score points per point of sector-vs-market score
+MAX_SECTOR_TILT = 8.0
+ROTATION_TILT = 3.0      # Extra points for sectors of the leading style
+
+SNAPSHOT_MAX_AGE = 6 * 3600  # Seconds a snapshot keeps feeding single-symbol analysis
+
+
+@dataclass(slots=True)
+class SectorStats:
+    market: str
+    sector: str
+    style: Optional[str]
+    count: int
+    technical_score: float
+    sentiment_score: float
+    momentum: float  # Mean 20-bar price momentum (%)
+    breadth: float   # % of symbols with positive momentum
+    score: float
+
+
+@dataclass(slots=True)
+class MarketStats:
+    market: str
+    count: int
+    momentum: float
+    breadth: float
+    score: float
+    sector_rotation: str   # Style with the strongest mean momentum
+    market_sentiment: str  # FEAR, GREED, NEUTRAL
+    style_momentum: Dict[str, float]
+
+
+@dataclass
+class SectorSnapshot:
+    """Aggregates of one portfolio run plus each symbol's market and score tilt"""
+    sectors: Dict[Tuple[str, str], SectorStats]
+    markets: Dict[str, MarketStats]
+    tilts: Dict[str, float]
+    created: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() - self.created < SNAPSHOT_MAX_AGE
+
+    def context_for(self, symbol: str) -> Optional[Tuple[str, str, float]]:
+        """(sector_rotation, market_sentiment, score tilt) for a symbol, None if not covered"""
+        market = self.markets.get(symbol_registry.market_of(symbol))
+        if market is None:
+            return None
+        return market.sector_rotation, market.market_sentiment, self.tilts.get(symbol, 0.0)
+
+    def to_dict(self) -> Dict:
+        return {
+            "created": self.created,
+            "markets": {name: _stats_dict(stats) for name, stats in self.markets.items()},
+            "sectors": [_stats_dict(stats) for stats in self.sectors.values()],
+        }
+
+
+def _stats_dict(stats) -> Dict:
+    return {name: getattr(stats, name) for name in stats.__slots__}
+
+
+def _codes(keys: List) -> Tuple[np.ndarray, List]:
+    """Dense integer group code per key, and the distinct keys in first-seen order"""
+    index = {}
+    codes = np.fromiter((index.setdefault(key, len(index)) for key in keys), dtype=np.intp, count=len(keys))
+    return codes, list(index)
+
+
+def _group_mean(values: np.ndarray, codes: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    return np.bincount(codes, weights=values, minlength=len(counts)) / counts
+
+
+def _score(technical: np.ndarray, sentiment: np.ndarray, breadth: np.ndarray) -> np.ndarray:
+    return TECHNICAL_WEIGHT * technical + SENTIMENT_WEIGHT * sentiment + BREADTH_WEIGHT * (2 * breadth - 100)
+
+
+def _market_sentiment(breadth: float, sentiment: float) -> str:
+    mood = 0.5 * (2 * breadth - 100) + 0.5 * sentiment
+    if mood >= SENTIMENT_THRESHOLD:
+        return "GREED"
+    if mood <= -SENTIMENT_THRESHOLD:
+        return "FEAR"
+    return "NEUTRAL"
+
+
+def compute_sector_snapshot(results: Iterable) -> SectorSnapshot:
+    """Group successful results (SignalResults or SignalViews) by market and sector in one pass"""
+    rows = []
+    for r in results:
+        info = symbol_registry.get(r.symbol)
+        if r.error is None and info is not None:
+            rows.append((r.symbol, info.market, info.sector, r.technical_score, r.sentiment_score,
+                         r.technical_signals.price_momentum))
+
+    # Markets with too few analyzed symbols would give noisy context
+    market_sizes: Dict[str, int] = {}
+    for row in rows:
+        market_sizes[row[1]] = market_sizes.get(row[1], 0) + 1
+    rows = [row for row in rows if market_sizes[row[1]] >= MIN_MARKET_SYMBOLS]
+    if not rows:
+        return SectorSnapshot({}, {}, {}, time.time())
+
+    symbols, markets, sectors, technical, sentiment, momentum = zip(*rows)
+    technical = np.asarray(technical, dtype=float)
+    sentiment = np.asarray(sentiment, dtype=float)
+    momentum = np.nan_to_num(np.asarray(momentum, dtype=float))
+    advancing = (momentum > 0).astype(float)
+    styles = [SECTOR_STYLES.get(sector) for sector in sectors]
+
+    sector_codes, sector_keys = _codes(list(zip(markets, sectors)))
+    market_codes, market_keys = _codes(list(markets))
+    style_codes, style_keys = _codes(list(zip(markets, styles)))
+
+    def aggregate(codes: np.ndarray, keys: List):
+        counts = np.bincount(codes, minlength=len(keys)).astype(float)
+        means = {name: _group_mean(values, codes, counts) for name, values in
+                 (("technical", technical), ("sentiment", sentiment), ("momentum", momentum))}
+        means["breadth"] = _group_mean(advancing, codes, counts) * 100
+        means["score"] = _score(means["technical"], means["sentiment"], means["breadth"])
+        return counts, means
+
+    sector_counts, sector_means = aggregate(sector_codes, sector_keys)
+    market_counts, market_means = aggregate(market_codes, market_keys)
+    _, style_means = aggregate(style_codes, style_keys)
+
+    style_momentum: Dict[str, Dict[str, float]] = {market: {} for market in market_keys}
+    for i, (market, style) in enumerate(style_keys):
+        if style is not None:
+            style_momentum[market][style] = round(float(style_means["momentum"][i]), 4)
+
+    market_stats = {}
+    for i, market in enumerate(market_keys):
+        momenta = style_momentum[market]
+        market_stats[market] = MarketStats(
+            market=market,
+            count=int(market_counts[i]),
+            momentum=float(market_means["momentum"][i]),
+            breadth=float(market_means["breadth"][i]),
+            score=float(market_means["score"][i]),
+            sector_rotation=max(momenta, key=momenta.get) if momenta else "GROWTH",
+            market_sentiment=_market_sentiment(float(market_means["breadth"][i]),
+                                               float(market_means["sentiment"][i])),
+            style_momentum=momenta,
+        )
+
+    sector_stats = {
+        key: SectorStats(
+            market=key[0],
+            sector=key[1],
+            style=SECTOR_STYLES.get(key[1]),
+            count=int(sector_counts[i]),
+            technical_score=float(sector_means["technical"][i]),
+            sentiment_score=float(sector_means["sentiment"][i]),
+            momentum=float(sector_means["momentum"][i]),
+            breadth=float(sector_means["breadth"][i]),
+            score=float(sector_means["score"][i]),
+        )
+        for i, key in enumerate(sector_keys)
+    }
+
+    # Per-symbol tilt: relative strength of its sector within its market, plus the rotation bonus
+    relative = sector_means["score"][sector_codes] - market_means["score"][market_codes]
+    tilts = np.clip(SECTOR_TILT_SCALE * relative, -MAX_SECTOR_TILT, MAX_SECTOR_TILT)
+    tilts = np.where(sector_counts[sector_codes] >= MIN_SECTOR_SYMBOLS, tilts, 0.0)
+    leading = np.array([style is not None and style == market_stats[market].sector_rotation
+                        for market, style in zip(markets, styles)])
+    tilts = tilts + np.where(leading, ROTATION_TILT, 0.0)
+
+    return SectorSnapshot(
+        sectors=sector_stats,
+        markets=market_stats,
+        tilts={symbol: float(tilt) for symbol, tilt in zip(symbols, tilts)},
+        created=time.time(),
+    )
+
+
+_latest_snapshot: Optional[SectorSnapshot] = None
+
+
+def get_sector_snapshot() -> Optional[SectorSnapshot]:
+    """Latest portfolio run's snapshot, None once older than SNAPSHOT_MAX_AGE"""
+    snapshot = _latest_snapshot
+    return snapshot if snapshot is not None and snapshot.fresh else None
+
+
+def set_sector_snapshot(snapshot: Optional[SectorSnapshot]):
+    """Publish a snapshot process-wide (every analyzer instance reads it)"""
+    global _latest_snapshot
+    _latest_snapshot = snapshot
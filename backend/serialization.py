@@ -0,0 +1,228 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional
+
+import numpy as np
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from news_analysis import signal_labels
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Response encoding for the hot endpoints. Bodies are encoded with orjson (numpy
+# scalars and arrays natively, NaN/inf as null) and handed to Starlette as bytes,
+# skipping FastAPI's jsonable_encoder walk. An /analyze body is encoded once per
+# SignalResult and kept on it; the live-signals lists once per cached data object.
+# Per-request fields (timings, metadata) are spliced onto the cached bytes.
+# Cacheable endpoints also send a strong ETag (hash of the body) with Cache-Control,
+# and answer a matching If-None-Match with an empty 304.
+
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def _default(value: Any) -> Any:
+    """Types neither encoder handles on its own: numpy scalars, then anything as str (like json default=str)"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def with_fields(encoded: bytes, **fields: Any) -> bytes:
+    """A JSON object's bytes with extra top-level fields appended, without decoding it"""
+    if not fields:
+        return encoded
+    extra = dumps(fields)  # b'{"timings":...}'
+    if encoded == b"{}":
+        return extra
+    return encoded[:-1] + b"," + extra[1:]
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; content may also be bytes that are already encoded JSON"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
+
+
+def build_analysis_response(result) -> dict:
+    """Return ALL calculated data for a SignalResult - frontend picks what it needs"""
+    ts = result.technical_signals
+    labels = getattr(result, "labels", None) or signal_labels(result)  # SignalViews carry no labels
+    return {
+        # Basic Info
+        "symbol": result.symbol,
+        "price": result.price,
+        "interval": result.interval,  # Bar interval behind the technical analysis
+        "timestamp": "2025-07-31T12:00:00Z",  # Add current timestamp if needed
+
+        # Main Signal & Confidence (Backend calculated)
+        "signal": result.signal,  # STRONG_BUY, BUY, HOLD, SELL, STRONG_SELL
+        "confidence": result.confidence,  # 0-100 numerical value
+        "confidence_text": labels["confidence_text"],  # Formatted for display
+
+        # Technical Analysis (All calculations done in backend)
+        "technical_analysis": {
+            "rsi": ts.rsi,
+            "rsi_signal": labels["rsi_signal"],
+            "macd": ts.macd,
+            "macd_signal": ts.macd_signal,
+            "macd_trend": labels["macd_trend"],
+            "bollinger_position": ts.bb_position,
+            "bollinger_signal": labels["bollinger_signal"],
+            "volume_ratio": ts.volume_ratio,
+            "volume_signal": labels["volume_signal"],
+            "volatility": ts.volatility,
+            "volatility_percent": labels["volatility_percent"],
+            "price_momentum": ts.price_momentum,
+            "momentum_signal": labels["momentum_signal"],
+            "support_level": ts.support_level,
+            "resistance_level": ts.resistance_level,
+            "technical_score": result.technical_score  # -100 to +100
+        },
+
+        # Sentiment Analysis (All calculations done in backend)
+        "sentiment_analysis": {
+            "sentiment_score": result.sentiment_score,  # -100 to +100
+            "sentiment_signal": labels["sentiment_signal"],
+            "news_count": len(result.headlines),
+            "headlines": result.headlines,
+            "detailed_analysis": result.analysis  # Individual headline sentiments
+        },
+
+        # Risk Assessment (All calculations done in backend)
+        "risk_analysis": {
+            "risk_score": result.risk_score,  # 0-100 (higher = riskier)
+            "risk_level": labels["risk_level"],
+            "position_size": result.position_size,
+            "entry_price": result.entry_price,
+            "stop_loss": result.stop_loss,
+            "take_profit": result.take_profit,
+            "risk_reward_ratio": labels["risk_reward_ratio"]
+        },
+
+        # Market Context (All calculations done in backend)
+        "market_context": {
+            "volatility_regime": result.market_context.volatility_regime,  # LOW, MEDIUM, HIGH
+            "trend_direction": result.market_context.trend_direction,      # BULL, BEAR, SIDEWAYS
+            "sector_rotation": result.market_context.sector_rotation,      # GROWTH, VALUE, DEFENSIVE
+            "market_sentiment": result.market_context.market_sentiment     # FEAR, GREED, NEUTRAL
+        },
+
+        # Performance Metrics (All calculations done in backend)
+        "backtest_performance": result.backtest_metrics,
+
+        # Summary Scores (Pre-calculated for easy frontend use)
+        "summary": {
+            "overall_signal": result.signal,
+            "buy_probability": labels["buy_probability"],
+            "sell_probability": labels["sell_probability"],
+            "hold_probability": labels["hold_probability"],
+            "technical_strength": labels["technical_strength"],
+            "sentiment_strength": labels["sentiment_strength"],
+            "investment_grade": labels["investment_grade"]
+        },
+
+        # Quick Reference (For simple frontend displays)
+        "quick_stats": {
+            "current_price": result.price,
+            "signal_emoji": labels["signal_emoji"],
+            "confidence_emoji": labels["confidence_emoji"],
+            "risk_emoji": labels["risk_emoji"],
+            "trend_emoji": labels["trend_emoji"]
+        }
+    }
+
+
+def analysis_json(result) -> bytes:
+    """Encoded /analyze body of a result, built on first use and kept on the SignalResult.
+    Results are not modified once served, so the bytes stay valid for the result's lifetime."""
+    encoded = getattr(result, "encoded", None)
+    if encoded is None:
+        encoded = dumps(build_analysis_response(result))
+        if hasattr(result, "encoded"):
+            result.encoded = encoded
+    return encoded
+
+
+def body_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+@dataclass(frozen=True)
+class EncodedBody:
+    """An encoded JSON body and its version hash (the ETag)"""
+    body: bytes
+    etag: str
+
+    @classmethod
+    def of(cls, body: bytes) -> "EncodedBody":
+        return cls(body, body_etag(body))
+
+
+def encode_body(content: Any) -> EncodedBody:
+    return EncodedBody.of(dumps(content))
+
+
+class EncodedCache:
+    """Encoded bodies per key (the most recent max_entries keys), redone only when a
+    different object is passed in for the key"""
+
+    def __init__(self, max_entries: int = 1):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (source object, EncodedBody)
+        self._lock = threading.Lock()
+        self.encodes = 0
+
+    def get(self, value: Any, key: Hashable = None) -> EncodedBody:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] is value:
+                self._entries.move_to_end(key)
+                return cached[1]
+        encoded = encode_body(value)
+        with self._lock:
+            self._entries[key] = (value, encoded)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.encodes += 1
+        return encoded
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = sum(len(encoded.body) for _, encoded in self._entries.values())
+            return {"entries": len(self._entries), "encodes": self.encodes, "bytes": size}
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match names this ETag (weak comparison, as RFC 9110 asks for If-None-Match) or is *"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def cached_json_response(request: Request, body: bytes, cache_control: str, etag: Optional[str] = None) -> Response:
+    """200 with the body, or an empty 304 when the client already holds this version"""
+    headers = {"ETag": etag or body_etag(body), "Cache-Control": cache_control}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(body, headers=headers)
@@ -0,0 +1,227 @@
+from dataclasses import fields
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from news_analysis import MarketContext, SignalResult, TechnicalSignals
+
+# Struct-of-arrays storage for many SignalResults: one float64 column per
+# numeric field, small integer codes for the label fields, and headlines kept
+# once in a shared HeadlineStore with rows holding tuples of ids. SignalView
+# reads a row in place with the same attributes as SignalResult, so
+# build_analysis_response and format_signal take it without conversion.
+
+RESULT_FIELDS = ("price", "confidence", "technical_score", "sentiment_score", "risk_score",
+                 "entry_price", "stop_loss", "take_profit", "position_size")
+INTEGER_FIELDS = ("position_size",)  # Share counts, read back as int
+TECHNICAL_FIELDS = tuple(f.name for f in fields(TechnicalSignals))
+CONTEXT_FIELDS = tuple(f.name for f in fields(MarketContext))
+LABEL_FIELDS = ("signal", "interval") + CONTEXT_FIELDS
+
+INITIAL_ROWS = 256
+
+
+class HeadlineStore:
+    """Each distinct headline (and its sentiment analysis) stored once, referenced by id"""
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.analysis: Dict[int, Dict] = {}
+
+    def add(self, text: str) -> int:
+        headline_id = self.ids.get(text)
+        if headline_id is None:
+            headline_id = self.ids[text] = len(self.texts)
+            self.texts.append(text)
+        return headline_id
+
+    def add_analysis(self, item: Dict) -> int:
+        headline_id = self.add(item.get("headline", ""))
+        self.analysis[headline_id] = item
+        return headline_id
+
+
+class SignalTable:
+    """Many SignalResults as columns, upserted by symbol"""
+
+    def __init__(self, headlines: Optional[HeadlineStore] = None, capacity: int = INITIAL_ROWS):
+        self.headlines = headlines or HeadlineStore()
+        self.symbols: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.columns = {name: np.zeros(capacity) for name in RESULT_FIELDS + TECHNICAL_FIELDS}
+        self.codes = {name: np.zeros(capacity, dtype=np.int16) for name in LABEL_FIELDS}
+        self.labels: Dict[str, List[str]] = {name: [] for name in LABEL_FIELDS}
+        self._label_codes: Dict[str, Dict[str, int]] = {name: {} for name in LABEL_FIELDS}
+        self.headline_ids: List[tuple] = []
+        self.analysis_ids: List[tuple] = []
+        self.backtest_metrics: List[Dict] = []
+        self.errors: List[Optional[str]] = []
+        self.timings: List[Dict] = []
+
+    @classmethod
+    def from_results(cls, results: Iterable[SignalResult], headlines: Optional[HeadlineStore] = None) -> "SignalTable":
+        table = cls(headlines)
+        for result in results:
+            table.set(result)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.rows
+
+    # ---------- writing ----------
+
+    def _code(self, name: str, label: str) -> int:
+        code = self._label_codes[name].get(label)
+        if code is None:
+            code = self._label_codes[name][label] = len(self.labels[name])
+            self.labels[name].append(label)
+        return code
+
+    def _grow(self):
+        capacity = len(self.columns["price"]) * 2
+        for store in (self.columns, self.codes):
+            for name, column in store.items():
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:len(column)] = column
+                store[name] = grown
+
+    def _row_for(self, symbol: str) -> int:
+        row = self.rows.get(symbol)
+        if row is not None:
+            return row
+        row = self.rows[symbol] = len(self.symbols)
+        if row == len(self.columns["price"]):
+            self._grow()
+        self.symbols.append(symbol)
+        self.headline_ids.append(())
+        self.analysis_ids.append(())
+        self.backtest_metrics.append({})
+        self.errors.append(None)
+        self.timings.append({})
+        return row
+
+    def set(self, result) -> int:
+        """Insert or overwrite the row of result.symbol (a SignalResult or a SignalView)"""
+        row = self._row_for(result.symbol)
+        for name in RESULT_FIELDS:
+            self.columns[name][row] = getattr(result, name)
+        for name in TECHNICAL_FIELDS:
+            self.columns[name][row] = getattr(result.technical_signals, name)
+        self.codes["signal"][row] = self._code("signal", result.signal)
+        self.codes["interval"][row] = self._code("interval", result.interval)
+        for name in CONTEXT_FIELDS:
+            self.codes[name][row] = self._code(name, getattr(result.market_context, name))
+
+        if isinstance(result, SignalView) and result._table.headlines is self.headlines:
+            self.headline_ids[row] = result._table.headline_ids[result._row]
+            self.analysis_ids[row] = result._table.analysis_ids[result._row]
+        else:
+            self.headline_ids[row] = tuple(self.headlines.add(h) for h in result.headlines)
+            self.analysis_ids[row] = tuple(self.headlines.add_analysis(a) for a in result.analysis)
+        self.backtest_metrics[row] = result.backtest_metrics
+        self.errors[row] = result.error
+        self.timings[row] = result.timings
+        return row
+
+    # ---------- reading ----------
+
+    def view(self, symbol: str) -> "SignalView":
+        return SignalView(self, self.rows[symbol])
+
+    def views(self) -> Iterator["SignalView"]:
+        return (SignalView(self, row) for row in range(len(self.symbols)))
+
+    def to_result(self, symbol: str) -> SignalResult:
+        """A standalone SignalResult copy of one row"""
+        view = self.view(symbol)
+        return SignalResult(
+            **{name: getattr(view, name) for name in ("symbol", "signal", "headlines", "analysis",
+                                                      "backtest_metrics", "error", "timings", "interval")},
+            **{name: getattr(view, name) for name in RESULT_FIELDS},
+            market_context=MarketContext(**{name: getattr(view.market_context, name) for name in CONTEXT_FIELDS}),
+            technical_signals=TechnicalSignals(**{name: getattr(view.technical_signals, name) for name in TECHNICAL_FIELDS}),
+        )
+
+
+def _column_property(name: str):
+    cast = int if name in INTEGER_FIELDS else float
+    return property(lambda self: cast(self._table.columns[name][self._row]))
+
+
+def _label_property(name: str):
+    return property(lambda self: self._table.labels[name][self._table.codes[name][self._row]])
+
+
+class TechnicalView:
+    """TechnicalSignals attributes of one SignalTable row"""
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: SignalTable, row: int):
+        self._table = table
+        self._row = row
+
+
+class MarketContextView:
+    """MarketContext attributes of one SignalTable row"""
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: SignalTable, row: int):
+        self._table = table
+        self._row = row
+
+
+class SignalView:
+    """SignalResult attributes of one SignalTable row, read in place"""
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: SignalTable, row: int):
+        self._table = table
+        self._row = row
+
+    @property
+    def symbol(self) -> str:
+        return self._table.symbols[self._row]
+
+    @property
+    def technical_signals(self) -> TechnicalView:
+        return TechnicalView(self._table, self._row)
+
+    @property
+    def market_context(self) -> MarketContextView:
+        return MarketContextView(self._table, self._row)
+
+    @property
+    def headlines(self) -> List[str]:
+        texts = self._table.headlines.texts
+        return [texts[i] for i in self._table.headline_ids[self._row]]
+
+    @property
+    def analysis(self) -> List[Dict]:
+        analysis = self._table.headlines.analysis
+        return [analysis[i] for i in self._table.analysis_ids[self._row]]
+
+    @property
+    def backtest_metrics(self) -> Dict:
+        return self._table.backtest_metrics[self._row]
+
+    @property
+    def error(self) -> Optional[str]:
+        return self._table.errors[self._row]
+
+    @property
+    def timings(self) -> Dict:
+        return self._table.timings[self._row]
+
+
+for _name in RESULT_FIELDS:
+    setattr(SignalView, _name, _column_property(_name))
+for _name in ("signal", "interval"):
+    setattr(SignalView, _name, _label_property(_name))
+for _name in TECHNICAL_FIELDS:
+    setattr(TechnicalView, _name, _column_property(_name))
+for _name in CONTEXT_FIELDS:
+    setattr(MarketContextView, _name, _label_property(_name))
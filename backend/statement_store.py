@@ -0,0 +1,307 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Typed financial statements. Each fundamentals result (screener.in rows of strings
+# for Indian symbols, yfinance {line item: {Timestamp: value}} dicts for US ones) is
+# converted once into float64 matrices, line items x periods in chronological order,
+# with Indian ("1,23,456") and US ("(1,234)") number formats handled at ingest.
+# Ratios (ROCE, ROE, margins, growth) are then computed for every period at once
+# with array arithmetic, and the API reads the matrices without touching HTML again.
+
+STATEMENT_STORE_MAX_SYMBOLS = int(os.getenv("STATEMENT_STORE_MAX_SYMBOLS", 1000))
+
+STATEMENTS = ("income_statement", "balance_sheet", "cash_flow")
+UNITS = {"India": "INR crore", "US": "USD"}
+
+# Line items by concept: yfinance names first, then screener.in's
+LINE_ITEMS = {
+    "revenue": ("Total Revenue", "Operating Revenue", "Revenue", "Sales", "Revenue from Operations"),
+    "operating_profit": ("Operating Income", "Operating Profit"),
+    "ebit": ("EBIT",),
+    "pretax_income": ("Pretax Income", "Profit before tax"),
+    "interest": ("Interest Expense", "Interest"),
+    "depreciation": ("Reconciled Depreciation", "Depreciation"),
+    "net_income": ("Net Income", "Net Income Common Stockholders", "Net Profit"),
+    "total_assets": ("Total Assets",),
+    "current_liabilities": ("Current Liabilities",),
+    "equity": ("Stockholders Equity", "Common Stock Equity"),
+    "equity_capital": ("Equity Capital",),
+    "reserves": ("Reserves",),
+    "debt": ("Total Debt", "Borrowings"),
+}
+
+RATIOS = ("roce", "roe", "operating_margin", "net_margin", "revenue_growth", "net_income_growth")
+
+_NUMBER_JUNK = re.compile(r"Rs\.?|Cr\.?|[,\s\xa0₹$%]")
+_LABEL_SUFFIX = re.compile(r"[\s\xa0]*\+$")
+_PERIOD_FORMATS = ("%Y-%m-%d", "%b %Y")
+
+
+def parse_number(value: Any) -> float:
+    """Float of a statement cell ("1,23,456", "₹ 1,234 Cr.", "12.5%", "(1,234)", "−5"); NaN if blank"""
+    if value is None:
+        return np.nan
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    text = _NUMBER_JUNK.sub("", str(value)).replace("−", "-")
+    negative = text.startswith("(") and text.endswith(")")
+    if negative:
+        text = text[1:-1]
+    try:
+        number = float(text)
+    except ValueError:
+        return np.nan  # "", "-", "N/A", "--"
+    return -number if negative else number
+
+
+def clean_label(label: Any) -> str:
+    # Screener row labels end in an expand button: "Sales\xa0+"
+    return _LABEL_SUFFIX.sub("", str(label)).strip()
+
+
+def _period_label(key: Any) -> str:
+    if isinstance(key, (pd.Timestamp, np.datetime64)) or hasattr(key, "strftime"):
+        return pd.Timestamp(key).strftime("%Y-%m-%d")
+    return str(key).strip()
+
+
+def _period_date(label: str) -> Optional[pd.Timestamp]:
+    for fmt in _PERIOD_FORMATS:
+        try:
+            return pd.to_datetime(label, format=fmt)
+        except (ValueError, TypeError):
+            continue
+    return None  # "TTM" and other undated columns
+
+
+@dataclass
+class Statement:
+    """One statement as a float64 matrix: values[i, j] is items[i] in periods[j], NaN where blank"""
+    name: str
+    periods: List[str]
+    items: List[str]
+    values: np.ndarray
+    dated: np.ndarray = field(default=None, repr=False)  # Periods that are real dates (not TTM)
+    _rows: Dict[str, int] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.dated is None:
+            self.dated = np.array([_period_date(p) is not None for p in self.periods], dtype=bool)
+        self._rows = {item.lower(): i for i, item in enumerate(self.items)}
+
+    def row(self, *names: str) -> Optional[np.ndarray]:
+        """The first of the named line items present (case-insensitive), None if none are"""
+        for name in names:
+            i = self._rows.get(name.lower())
+            if i is not None:
+                return self.values[i]
+        return None
+
+    def aligned(self, names: Iterable[str], periods: List[str]) -> Optional[np.ndarray]:
+        """row(*names) laid out on another statement's periods, NaN where this one has no column"""
+        values = self.row(*names)
+        if values is None:
+            return None
+        columns = {p: j for j, p in enumerate(self.periods)}
+        index = np.array([columns.get(p, -1) for p in periods], dtype=np.intp)
+        out = np.full(len(periods), np.nan)
+        found = index >= 0
+        out[found] = values[index[found]]
+        return out
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.values, index=self.items, columns=self.periods)
+
+    def to_dict(self) -> Dict:
+        values = np.where(np.isnan(self.values), None, np.round(self.values, 4)).tolist()
+        return {"periods": self.periods, "items": self.items, "values": values}
+
+    @classmethod
+    def from_rows(cls, name: str, rows: List[Dict]) -> "Statement":
+        """Screener table rows ({"label": ..., period: "1,234", ...}) parsed in one pass"""
+        periods: Dict[str, None] = {}
+        for row in rows:
+            periods.update((key, None) for key in row if key != "label")
+        labels = [clean_label(row.get("label", "")) for row in rows]
+        values = np.array([[parse_number(row.get(p)) for p in periods] for row in rows],
+                          dtype=np.float64).reshape(len(rows), len(periods))
+        return cls._chronological(name, list(periods), labels, values)
+
+    @classmethod
+    def from_columns(cls, name: str, data: Dict) -> "Statement":
+        """yfinance statement as {line item: {period: value}}"""
+        items = list(data)
+        periods: Dict[Any, None] = {}
+        for series in data.values():
+            periods.update((key, None) for key in series)
+        values = np.array([[parse_number(data[item].get(p)) for p in periods] for item in items],
+                          dtype=np.float64).reshape(len(items), len(periods))
+        return cls._chronological(name, [_period_label(p) for p in periods], [str(i) for i in items], values)
+
+    @classmethod
+    def _chronological(cls, name: str, periods: List[str], items: List[str], values: np.ndarray) -> "Statement":
+        # Oldest first; undated columns (TTM) keep their place after the dated ones
+        dates = [_period_date(p) for p in periods]
+        order = sorted(range(len(periods)), key=lambda j: (dates[j] is None, dates[j] or pd.Timestamp.min, j))
+        dated = np.array([dates[j] is not None for j in order], dtype=bool)
+        return cls(name, [periods[j] for j in order], items, values[:, order], dated)
+
+
+def _ratio(numerator: Optional[np.ndarray], denominator: Optional[np.ndarray], scale: float = 100.0) -> Optional[np.ndarray]:
+    if numerator is None or denominator is None:
+        return None
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = numerator / denominator * scale
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+
+def _growth(values: Optional[np.ndarray], dated: np.ndarray) -> Optional[np.ndarray]:
+    """% change from the previous dated period; the undated TTM column gets none"""
+    if values is None or len(values) == 0:
+        return None
+    previous = np.concatenate(([np.nan], values[:-1]))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = (values - previous) / np.abs(previous) * 100
+    out[~(dated & np.concatenate(([False], dated[:-1])))] = np.nan
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+
+def compute_ratios(income: Optional[Statement], balance: Optional[Statement]) -> Optional[Statement]:
+    """ROCE, ROE, margins and growth for every income statement period at once"""
+    if income is None or not income.periods:
+        return None
+    periods = income.periods
+    n = len(periods)
+
+    def first(*rows):
+        return next((r for r in rows if r is not None), None)
+
+    def sheet(concept):
+        return balance.aligned(LINE_ITEMS[concept], periods) if balance is not None else None
+
+    revenue = income.row(*LINE_ITEMS["revenue"])
+    operating_profit = income.row(*LINE_ITEMS["operating_profit"])
+    net_income = income.row(*LINE_ITEMS["net_income"])
+    pretax, interest = income.row(*LINE_ITEMS["pretax_income"]), income.row(*LINE_ITEMS["interest"])
+    depreciation = income.row(*LINE_ITEMS["depreciation"])
+    # EBIT: reported, else profit before tax + interest, else operating profit - depreciation
+    ebit = first(income.row(*LINE_ITEMS["ebit"]),
+                 pretax + np.nan_to_num(interest) if pretax is not None and interest is not None else None,
+                 operating_profit - depreciation if operating_profit is not None and depreciation is not None else None,
+                 operating_profit)
+
+    equity = sheet("equity")
+    capital, reserves = sheet("equity_capital"), sheet("reserves")
+    if equity is None and capital is not None:
+        equity = capital + (np.nan_to_num(reserves) if reserves is not None else 0.0)
+    total_assets, current_liabilities, debt = sheet("total_assets"), sheet("current_liabilities"), sheet("debt")
+    # Capital employed: total assets - current liabilities, else equity + debt
+    employed = total_assets - current_liabilities if total_assets is not None and current_liabilities is not None else None
+    if equity is not None:
+        fallback = equity + np.nan_to_num(debt) if debt is not None else equity
+        employed = fallback if employed is None else np.where(np.isnan(employed) | (employed == 0), fallback, employed)
+
+    columns = {
+        "roce": _ratio(ebit, employed),
+        "roe": _ratio(net_income, equity),
+        "operating_margin": _ratio(operating_profit, revenue),
+        "net_margin": _ratio(net_income, revenue),
+        "revenue_growth": _growth(revenue, income.dated),
+        "net_income_growth": _growth(net_income, income.dated),
+    }
+    values = np.vstack([columns[name] if columns[name] is not None else np.full(n, np.nan) for name in RATIOS])
+    return Statement("ratios", periods, list(RATIOS), values, income.dated)
+
+
+@dataclass
+class SymbolStatements:
+    symbol: str
+    market: str
+    statements: Dict[str, Statement]
+    ratios: Optional[Statement]
+    as_of: float  # When the fundamentals result behind these was fetched
+
+    @property
+    def unit(self) -> str:
+        return UNITS.get(self.market, "")
+
+    def latest_ratios(self) -> Dict[str, Optional[float]]:
+        """Most recent non-blank value of each ratio"""
+        latest = {}
+        for name in RATIOS:
+            values = self.ratios.row(name) if self.ratios is not None else None
+            found = np.flatnonzero(~np.isnan(values)) if values is not None else []
+            latest[name] = round(float(values[found[-1]]), 2) if len(found) else None
+        return latest
+
+    def to_dict(self, statement: Optional[str] = None, statements: bool = True) -> Dict:
+        """API form; statement picks one statement, statements=False leaves them out (ratios only)"""
+        names = [statement] if statement else list(self.statements) if statements else []
+        data = {"symbol": self.symbol, "market": self.market, "unit": self.unit, "as_of": self.as_of}
+        if names:
+            data["statements"] = {name: self.statements[name].to_dict() for name in names if name in self.statements}
+        data["ratios"] = self.ratios.to_dict() if self.ratios is not None else None
+        data["latest_ratios"] = self.latest_ratios()
+        return data
+
+
+def build_statements(symbol: str, result: Dict, as_of: Optional[float] = None) -> Optional[SymbolStatements]:
+    """Typed statements of one fundamentals result; None for error results"""
+    if not isinstance(result, dict) or "error" in result:
+        return None
+    statements = {}
+    for name in STATEMENTS:
+        data = result.get(name)
+        if isinstance(data, list) and data:
+            statements[name] = Statement.from_rows(name, data)
+        elif isinstance(data, dict) and data:
+            statements[name] = Statement.from_columns(name, data)
+    ratios = compute_ratios(statements.get("income_statement"), statements.get("balance_sheet"))
+    return SymbolStatements(symbol, result.get("market", ""), statements, ratios, as_of or time.time())
+
+
+class StatementStore:
+    """Typed statements per symbol, rebuilt only when the fundamentals result behind them changes"""
+
+    def __init__(self, max_symbols: int = STATEMENT_STORE_MAX_SYMBOLS):
+        self.max_symbols = max_symbols
+        self._symbols: "OrderedDict[str, SymbolStatements]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, symbol: str, as_of: Optional[float] = None) -> Optional[SymbolStatements]:
+        """Stored statements, if they were built from the result fetched at as_of (any, if None)"""
+        with self._lock:
+            stored = self._symbols.get(symbol)
+            if stored is None or (as_of is not None and stored.as_of != as_of):
+                return None
+            self._symbols.move_to_end(symbol)
+            return stored
+
+    def ingest(self, symbol: str, result: Dict, as_of: Optional[float] = None) -> Optional[SymbolStatements]:
+        built = build_statements(symbol, result, as_of)
+        if built is None:
+            return None
+        with self._lock:
+            self._symbols[symbol] = built
+            self._symbols.move_to_end(symbol)
+            while len(self._symbols) > self.max_symbols:
+                self._symbols.popitem(last=False)
+            self.builds += 1
+        return built
+
+    def stats(self) -> Dict:
+        return {"symbols": len(self._symbols), "max_symbols": self.max_symbols, "builds": self.builds}
+
+
+statement_store = StatementStore()
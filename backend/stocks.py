@@ -1,38 +1,130 @@
-# Top 50 US stocks (S&P 50)
-US_STOCKS = [
-    "AAPL","ABBV","ABT","ACN","ADBE","AIG","AMD","AMGN","AMT","AMZN",
-    "AVGO","AXP","BA","BAC","BK","BKNG","BLK","BMY","BRK.B","C","CAT",
-    "CHTR","CL","CMCSA","COF","COP","COST","CRM","CSCO","CVS","CVX","DE",
-    "DHR","DIS","DUK","EMR","FDX","GD","GE","GILD","GM","GOOG","GOOGL",
-    "GS","HD","HON","IBM","INTC","INTU","ISRG","JNJ","JPM","KO","LIN",
-    "LLY","LMT","LOW","MA","MCD","MDLZ","MDT","MET","META","MMM","MO",
-    "MRK","MS","MSFT","NEE","NFLX","NKE","NOW","NVDA","ORCL","PEP","PFE",
-    "PG","PLTR","PM","PYPL","QCOM","RTX","SBUX","SCHW","SO","SPG","T",
-    "TGT","TMO","TMUS","TSLA","TXN","UNH","UNP","UPS","USB","V","VZ","WFC",
-    "WMT","XOM"
-]
-
-
-# Top 50 India stocks (Nifty 50)
-INDIA_STOCKS = [
-   'RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'BHARTIARTL.NS', 'ICICIBANK.NS',
-    'INFY.NS', 'SBIN.NS', 'LICI.NS', 'ITC.NS', 'HINDUNILVR.NS',
-    'LT.NS', 'HCLTECH.NS', 'MARUTI.NS', 'SUNPHARMA.NS', 'BAJFINANCE.NS',
-    'ONGC.NS', 'TATAMOTORS.NS', 'TITAN.NS', 'WIPRO.NS', 'ASIANPAINT.NS',
-    'M&M.NS', 'ULTRACEMCO.NS', 'DMART.NS', 'NESTLEIND.NS', 'KOTAKBANK.NS',
-    'AXISBANK.NS', 'BAJAJFINSV.NS', 'NTPC.NS', 'HDFCLIFE.NS', 'TECHM.NS',
-    'POWERGRID.NS', 'JSWSTEEL.NS', 'COALINDIA.NS', 'SBILIFE.NS', 'GRASIM.NS',
-    'INDUSINDBK.NS', 'ADANIENT.NS', 'TATACONSUM.NS', 'CIPLA.NS', 'BRITANNIA.NS',
-    'BPCL.NS', 'EICHERMOT.NS', 'APOLLOHOSP.NS', 'TATASTEEL.NS', 'HINDALCO.NS',
-    'DRREDDY.NS', 'BAJAJ-AUTO.NS', 'HEROMOTOCO.NS', 'ADANIPORTS.NS', 'DIVISLAB.NS'
-]
+import csv
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+# Tradable universe, loaded from a CSV (one row per Yahoo symbol) and indexed by
+# dict so lookups stay O(1) however many symbols are listed. Besides its own
+# symbol, a row is reachable through its `aliases` column (';'-separated) and,
+# on exchanges with a Yahoo suffix, its bare ticker (RELIANCE -> RELIANCE.NS).
+SYMBOLS_FILE = os.getenv("SYMBOLS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "symbols.csv"))
+
+EXCHANGE_SUFFIXES = {"NSE": ".NS", "BSE": ".BO"}
+
+
+@dataclass(frozen=True, slots=True)
+class SymbolInfo:
+    symbol: str
+    name: str
+    market: str  # "us" | "india"
+    exchange: str
+    sector: str
+
+
+class SymbolRegistry:
+    """Symbols with market/sector/exchange metadata and alias resolution"""
+
+    def __init__(self):
+        self.entries: Dict[str, SymbolInfo] = {}
+        self.aliases: Dict[str, str] = {}
+        self._by_market: Dict[str, List[str]] = {}
+        self._by_sector: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_csv(cls, path: str) -> "SymbolRegistry":
+        registry = cls()
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                info = SymbolInfo(
+                    symbol=row["symbol"].strip().upper(),
+                    name=row.get("name", "").strip(),
+                    market=row["market"].strip().lower(),
+                    exchange=row.get("exchange", "").strip().upper(),
+                    sector=row.get("sector", "").strip() or "Unknown",
+                )
+                registry.add(info, (a for a in (row.get("aliases") or "").split(";") if a.strip()))
+        print(f"📇 Loaded {len(registry)} symbols from {path}")
+        return registry
+
+    def add(self, info: SymbolInfo, aliases: Iterable[str] = ()):
+        if info.symbol in self.entries:
+            print(f"⚠️ Duplicate symbol {info.symbol} ignored")
+            return
+        self.entries[info.symbol] = info
+        self._by_market.setdefault(info.market, []).append(info.symbol)
+        self._by_sector.setdefault(info.sector.lower(), []).append(info.symbol)
+        # A listed symbol always wins over another row's alias
+        self.aliases.pop(info.symbol, None)
+
+        names = [a.strip().upper() for a in aliases]
+        suffix = EXCHANGE_SUFFIXES.get(info.exchange)
+        if suffix and info.symbol.endswith(suffix):
+            names.append(info.symbol[:-len(suffix)])
+        for alias in names:
+            if alias in self.entries or alias in self.aliases:
+                continue
+            self.aliases[alias] = info.symbol
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, symbol: str) -> bool:
+        return self.resolve(symbol) is not None
+
+    def resolve(self, symbol: str) -> Optional[str]:
+        """Listed symbol for a symbol or alias, None if unknown"""
+        symbol = symbol.strip().upper()
+        if symbol in self.entries:
+            return symbol
+        return self.aliases.get(symbol)
+
+    def normalize(self, symbol: str) -> str:
+        """Listed symbol if known, else the upper-cased input"""
+        return self.resolve(symbol) or symbol.strip().upper()
+
+    def get(self, symbol: str) -> Optional[SymbolInfo]:
+        resolved = self.resolve(symbol)
+        return self.entries[resolved] if resolved else None
+
+    def market_of(self, symbol: str) -> Optional[str]:
+        info = self.entries.get(symbol)
+        return info.market if info else None
+
+    def sector_of(self, symbol: str) -> Optional[str]:
+        info = self.entries.get(symbol)
+        return info.sector if info else None
+
+    @property
+    def markets(self) -> List[str]:
+        return list(self._by_market)
+
+    @property
+    def sectors(self) -> List[str]:
+        return sorted({self.entries[symbols[0]].sector for symbols in self._by_sector.values()})
+
+    def symbols(self, market: Optional[str] = None, sector: Optional[str] = None) -> List[str]:
+        """Listed symbols in file order, optionally of one market and/or sector (case-insensitive)"""
+        if market is None and sector is None:
+            return list(self.entries)
+        if sector is None:
+            return list(self._by_market.get(market.lower(), []))
+        in_sector = self._by_sector.get(sector.lower(), [])
+        if market is None:
+            return list(in_sector)
+        market = market.lower()
+        return [s for s in in_sector if self.entries[s].market == market]
+
+
+symbol_registry = SymbolRegistry.from_csv(SYMBOLS_FILE)
+
+US_STOCKS = symbol_registry.symbols("us")
+INDIA_STOCKS = symbol_registry.symbols("india")
 
 
 def is_valid_stock(symbol: str) -> bool:
-    symbol = symbol.upper()
-    return (
-        symbol in US_STOCKS or
-        symbol in INDIA_STOCKS or
-        (symbol + ".NS") in INDIA_STOCKS  # Support cases like RELIANCE -> RELIANCE.NS
-    )
+    return symbol_registry.resolve(symbol) is not None
+
 
+def get_full_symbol(symbol: str) -> str:
+    """Normalize symbol to its listed form (RELIANCE -> RELIANCE.NS)"""
+    return symbol_registry.normalize(symbol)
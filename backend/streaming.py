@@ -0,0 +1,349 @@
+import time
+import zlib
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_providers import get_data_provider
+from indicators import IndicatorState
+from news_analysis import TechnicalSignals
+from price_store import DAILY_INTERVAL, INTERVALS, slice_period
+from signal_table import SignalTable
+from batch_technicals import SR_WINDOW, MOMENTUM_WINDOW, momentum, support_resistance, volume_ratio
+
+# Streaming ingestion: a quote source is polled, quotes are folded into a
+# fixed-size ring of bars per symbol, and only symbols whose bars changed get
+# their TechnicalSignals, technical score and combined signal recomputed.
+# Sentiment, market context and backtest come from the last full analysis.
+
+STREAM_BUFFER_BARS = 64  # Bars kept per symbol; long-window indicators live in IndicatorState
+STREAM_TAIL_BARS = max(SR_WINDOW, MOMENTUM_WINDOW, 20)  # Widest window read from the ring
+QUOTE_VOLUME_MEMORY = 16  # Recent quote timestamps remembered per symbol for volume revisions
+POLL_SUB_INTERVAL = "1m"  # Resolution the Yahoo poller asks for
+
+INTERVAL_SECONDS = {"1d": 86400, "1h": 3600, "15m": 900, "5m": 300}
+
+
+@dataclass
+class Quote:
+    """One price update; a quote repeating a recent timestamp revises it (volume included)"""
+    symbol: str
+    timestamp: float  # Epoch seconds
+    price: float
+    volume: float = 0.0
+    high: Optional[float] = None
+    low: Optional[float] = None
+
+
+class SimulatedQuoteSource:
+    """Deterministic random-walk ticks for local runs and tests"""
+
+    def __init__(self, prices: Dict[str, float], seed: str = "stream", tick_seconds: float = 1.0,
+                 active: float = 0.3, volatility: float = 0.0005, start: Optional[float] = None):
+        self.prices = dict(prices)
+        self.symbols = list(self.prices)
+        self.tick_seconds = tick_seconds
+        self.active = active  # Share of symbols that trade on each poll
+        self.volatility = volatility
+        self.clock = time.time() if start is None else start
+        self._rng = np.random.default_rng(zlib.crc32(seed.encode()))
+
+    def poll(self) -> List[Quote]:
+        self.clock += self.tick_seconds
+        traded = self._rng.random(len(self.symbols)) < self.active
+        moves = np.exp(self._rng.normal(0.0, self.volatility, len(self.symbols)))
+        sizes = self._rng.integers(100, 5_000, len(self.symbols))
+        quotes = []
+        for i in np.flatnonzero(traded):
+            symbol = self.symbols[i]
+            self.prices[symbol] *= float(moves[i])
+            quotes.append(Quote(symbol, self.clock, self.prices[symbol], float(sizes[i])))
+        return quotes
+
+
+class PollingQuoteSource:
+    """Quotes from the newest 1m bars of one bulk download per chunk of symbols"""
+
+    def __init__(self, symbols: List[str], chunk_size: int = 50):
+        self.symbols = list(symbols)
+        self.chunk_size = chunk_size
+
+    def poll(self) -> List[Quote]:
+        quotes = []
+        for offset in range(0, len(self.symbols), self.chunk_size):
+            chunk = self.symbols[offset:offset + self.chunk_size]
+            try:
+                data = get_data_provider().download(
+                    chunk, period="1d", interval=POLL_SUB_INTERVAL, group_by="ticker",
+                    auto_adjust=True, threads=True, progress=False
+                )
+            except Exception as e:
+                print(f"❌ Quote poll failed for {len(chunk)} symbols: {e}")
+                continue
+            quotes.extend(self._to_quotes(data, chunk))
+        return quotes
+
+    def _to_quotes(self, data: Optional[pd.DataFrame], chunk: List[str]) -> List[Quote]:
+        if data is None or data.empty:
+            return []
+        quotes = []
+        multi = isinstance(data.columns, pd.MultiIndex)
+        available = set(data.columns.get_level_values(0)) if multi else set()
+        for symbol in chunk:
+            if multi:
+                if symbol not in available:
+                    continue
+                frame = data[symbol]
+            elif len(chunk) == 1:
+                frame = data
+            else:
+                continue
+            # The last two minutes: the one that just closed (final revision) and the forming one
+            frame = frame.dropna(subset=["Close"]).tail(2)
+            index = frame.index if frame.index.tz is not None else frame.index.tz_localize("UTC")
+            for ts, row in zip(index.asi8 / 1e9, frame.itertuples()):
+                quotes.append(Quote(symbol, float(ts), float(row.Close), float(row.Volume),
+                                    float(row.High), float(row.Low)))
+        return quotes
+
+
+class BarRing:
+    """Fixed-capacity OHLCV ring of one symbol's bars, aggregated from quotes"""
+
+    def __init__(self, capacity: int, bar_seconds: int, anchor: float = 0.0):
+        self.capacity = capacity
+        self.bar_seconds = bar_seconds
+        self.anchor = anchor  # Any bar start; later bars are whole bar_seconds away from it
+        self.starts = np.zeros(capacity)
+        self.open = np.full(capacity, np.nan)
+        self.high = np.full(capacity, np.nan)
+        self.low = np.full(capacity, np.nan)
+        self.close = np.full(capacity, np.nan)
+        self.volume = np.full(capacity, np.nan)
+        self.head = -1
+        self.count = 0
+        self.quote_volumes: Dict[float, float] = {}  # Recent quote timestamp -> volume already counted
+        self.last_quote_ts = float("-inf")
+
+    @classmethod
+    def from_history(cls, hist: pd.DataFrame, capacity: int, bar_seconds: int) -> "BarRing":
+        tail = hist.tail(capacity)
+        index = tail.index if tail.index.tz is not None else tail.index.tz_localize("UTC")
+        starts = index.asi8 / 1e9
+        ring = cls(capacity, bar_seconds, anchor=float(starts[-1]))
+        for start, row in zip(starts, tail.itertuples()):
+            ring._append(float(start), row.Open, row.High, row.Low, row.Close, row.Volume)
+        return ring
+
+    def _append(self, start: float, open_: float, high: float, low: float, close: float, volume: float):
+        self.head = (self.head + 1) % self.capacity
+        self.starts[self.head] = start
+        self.open[self.head], self.high[self.head], self.low[self.head] = open_, high, low
+        self.close[self.head], self.volume[self.head] = close, volume
+        self.count = min(self.count + 1, self.capacity)
+
+    def bar_start(self, timestamp: float) -> float:
+        return self.anchor + (timestamp - self.anchor) // self.bar_seconds * self.bar_seconds
+
+    def update(self, quote: Quote) -> Optional[str]:
+        """Fold a quote in: "push" (new bar), "amend" (close moved), "bar" (only high/low/volume moved) or None"""
+        start = self.bar_start(quote.timestamp)
+        if self.count and start < self.starts[self.head]:
+            return None  # Late quote for a bar that is already closed
+
+        # Pollers resend recent sub-bars; only the volume added since the last sighting counts
+        volume = quote.volume - self.quote_volumes.get(quote.timestamp, 0.0)
+        self.quote_volumes[quote.timestamp] = quote.volume
+        if len(self.quote_volumes) > QUOTE_VOLUME_MEMORY:
+            del self.quote_volumes[next(iter(self.quote_volumes))]
+        high = quote.high if quote.high is not None else quote.price
+        low = quote.low if quote.low is not None else quote.price
+
+        newest = quote.timestamp >= self.last_quote_ts
+        self.last_quote_ts = max(self.last_quote_ts, quote.timestamp)
+
+        if not self.count or start > self.starts[self.head]:
+            self._append(start, quote.price, high, low, quote.price, volume)
+            return "push"
+
+        h = self.head
+        before = (self.high[h], self.low[h], self.close[h], self.volume[h])
+        self.high[h] = max(self.high[h], high)
+        self.low[h] = min(self.low[h], low)
+        if volume:
+            self.volume[h] = (0.0 if np.isnan(self.volume[h]) else self.volume[h]) + volume
+        if newest and quote.price != self.close[h]:
+            self.close[h] = quote.price  # A resent older sub-bar never overrides the close
+            return "amend"
+        return "bar" if (self.high[h], self.low[h], self.close[h], self.volume[h]) != before else None
+
+    def tail_index(self, n: int) -> np.ndarray:
+        """Ring positions of the newest n bars, oldest first"""
+        n = min(n, self.count)
+        return (self.head - np.arange(n)[::-1]) % self.capacity
+
+
+class SignalStream:
+    """Incrementally re-scored SignalResults for a universe fed by a quote source"""
+
+    def __init__(self, analyzer, source, interval: str = DAILY_INTERVAL, capacity: int = STREAM_BUFFER_BARS):
+        self.analyzer = analyzer
+        self.source = source
+        self.interval = interval
+        self.capacity = capacity
+        self.rings: Dict[str, BarRing] = {}
+        self.states: Dict[str, IndicatorState] = {}
+        self.table = SignalTable()  # Latest re-scored result per symbol
+        self.updates = 0
+        self.last_tick: Optional[float] = None
+        self.on_update: Optional[Callable[[List[str]], None]] = None
+        self._lock = threading.RLock()  # on_update runs under it and may call snapshot()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- seeding ----------
+
+    def seed(self, results: List):
+        """Start from a full analysis run: its bars, sentiment and market context"""
+        window = INTERVALS[self.interval]["window"]
+        bar_seconds = INTERVAL_SECONDS[self.interval]
+        periods_per_year = INTERVALS[self.interval]["bars_per_year"]
+        # The run that produced `results` has just refreshed the store, read it as is
+        store = self.analyzer.price_store.for_interval(self.interval)
+        rings, states, seeded = {}, {}, []
+        for result in results:
+            if result.error:
+                continue
+            try:
+                hist = slice_period(store.read(result.symbol), window)
+            except Exception as e:
+                print(f"❌ Stream seed failed for {result.symbol}: {e}")
+                continue
+            if hist is None or hist.empty:
+                continue
+            rings[result.symbol] = BarRing.from_history(hist, self.capacity, bar_seconds)
+            states[result.symbol] = IndicatorState.from_prices(
+                hist["Close"].to_numpy(dtype=float), periods_per_year=periods_per_year
+            )
+            seeded.append(result)
+
+        table = SignalTable.from_results(seeded)
+        with self._lock:
+            self.rings, self.states, self.table = rings, states, table
+        print(f"📡 Stream seeded with {len(rings)} symbols ({self.interval} bars)")
+
+    # ---------- ingestion ----------
+
+    def ingest(self, quotes: List[Quote]) -> List[str]:
+        """Fold quotes into the rings and re-score only the symbols whose bars changed"""
+        changed = []
+        with self._lock:
+            for quote in quotes:
+                ring = self.rings.get(quote.symbol)
+                if ring is None:
+                    continue
+                update = ring.update(quote)
+                if update is None:
+                    continue
+                if update != "bar":
+                    getattr(self.states[quote.symbol], update)(quote.price)
+                if quote.symbol not in changed:
+                    changed.append(quote.symbol)
+            if changed:
+                self._rescore(changed)
+                self.updates += 1
+                self.last_tick = time.time()
+                if self.on_update:
+                    self.on_update(changed)  # Still locked, so it never sees a half-written row
+        return changed
+
+    def _rescore(self, symbols: List[str]):
+        # Window statistics for all changed symbols in one small right-aligned matrix
+        width = STREAM_TAIL_BARS
+        shape = (len(symbols), width)
+        close, high, low, volume = (np.full(shape, np.nan) for _ in range(4))
+        lengths = np.zeros(len(symbols), dtype=int)
+        for row, symbol in enumerate(symbols):
+            ring = self.rings[symbol]
+            positions = ring.tail_index(width)
+            n = len(positions)
+            lengths[row] = n
+            close[row, width - n:] = ring.close[positions]
+            high[row, width - n:] = ring.high[positions]
+            low[row, width - n:] = ring.low[positions]
+            volume[row, width - n:] = ring.volume[positions]
+
+        volume_ratios = volume_ratio(volume, lengths)
+        supports, resistances = support_resistance(close, high, low, lengths)
+        momenta = momentum(close, lengths)
+
+        for row, symbol in enumerate(symbols):
+            state = self.states[symbol]
+            try:
+                macd, macd_signal, _ = state.macd.value()
+                _, _, _, bb_position = state.bollinger.value()
+                technical_signals = TechnicalSignals(
+                    rsi=state.rsi.value(),
+                    macd=macd,
+                    macd_signal=macd_signal,
+                    bb_position=bb_position,
+                    volume_ratio=float(volume_ratios[row]),
+                    price_momentum=float(momenta[row]),
+                    volatility=state.volatility.value(),
+                    support_level=float(supports[row]),
+                    resistance_level=float(resistances[row]),
+                )
+            except ZeroDivisionError:
+                technical_signals = self.analyzer._default_technical_signals()  # Flat band, as get_technical_signals
+            self.table.set(self._rebuild(self.table.view(symbol), state.last_price, technical_signals))
+
+    def _rebuild(self, base, price: float, technical_signals):
+        """The base result re-scored for a new price and technicals, keeping its sentiment and context"""
+        inputs = {
+            "price": price,
+            "technical_signals": technical_signals,
+            "headlines": base.headlines,
+            "market_context": base.market_context,
+            "backtest_metrics": base.backtest_metrics,
+        }
+        result = self.analyzer._build_signal_result(base.symbol, inputs, base.analysis, base.sentiment_score / 100)
+        result.interval = base.interval
+        return result
+
+    def snapshot(self) -> List:
+        """Row views of the latest results (SignalResult attributes, no copies)"""
+        with self._lock:
+            return list(self.table.views())
+
+    # ---------- polling loop ----------
+
+    def poll_once(self) -> List[str]:
+        return self.ingest(self.source.poll())
+
+    def start(self, poll_seconds: float = 15.0):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            print(f"📡 Quote stream started, polling every {poll_seconds}s")
+            while not self._stop.is_set():
+                try:
+                    self.poll_once()
+                except Exception as e:
+                    print(f"❌ Quote stream poll failed: {e}")
+                self._stop.wait(poll_seconds)
+            print("📡 Quote stream stopped")
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
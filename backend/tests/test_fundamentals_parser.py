@@ -0,0 +1,58 @@
+"""The lxml screener parser (fundamentals_parser.ScreenerPage) must return exactly what the
+BeautifulSoup extractors in fundamentals.py return, field for field.
+
+Pages: tests/fixtures/screener/*.html, plus synthetic pages from benchmarks.synthetic.
+Set SCREENER_PAGES_DIR to a PAGE_CACHE_DIR to also check saved screener.in pages.
+"""
+import glob
+import os
+
+import pytest
+
+from benchmarks import synthetic
+from fundamentals import read_screener_page
+from page_cache import CachedPage, PageCache
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "screener")
+FIELDS = ["company", "income_statement", "balance_sheet", "cash_flow", "shareholding_pattern", "overview"]
+SYNTHETIC_SECTORS = ["Oil & Gas", "IT Services & Consulting", "Banking & Financial Services", "Pharmaceuticals"]
+
+
+def _pages():
+    pages = [(os.path.basename(path), open(path, "rb").read())
+             for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html")))]
+    pages += [(f"synthetic-{i}", synthetic.screener_page(f"SYN{i}", sector=sector))
+              for i, sector in enumerate(SYNTHETIC_SECTORS)]
+    saved_dir = os.getenv("SCREENER_PAGES_DIR")
+    if saved_dir:
+        pages += [(page.url, page.content) for page in PageCache(saved_dir).stored("https://www.screener.in/company/")]
+    return pages
+
+
+PAGES = _pages()
+
+
+@pytest.fixture(scope="module", params=PAGES, ids=[name for name, _ in PAGES])
+def parsed(request):
+    name, content = request.param
+    bs4 = read_screener_page(CachedPage(name, content), engine="bs4")
+    lxml = read_screener_page(CachedPage(name, content), engine="lxml")
+    return bs4, lxml
+
+
+@pytest.mark.parametrize("field", FIELDS)
+def test_engines_agree(parsed, field):
+    bs4, lxml = parsed
+    assert lxml[field] == bs4[field]
+
+
+def test_fixtures_exercise_the_extractors():
+    """Guard against fixtures that agree only because both engines find nothing"""
+    results = [read_screener_page(CachedPage(path, open(path, "rb").read()), engine="lxml")
+               for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html")))]
+    assert results
+    assert all(result["income_statement"] and result["balance_sheet"] for result in results)
+    assert any(result["cash_flow"] for result in results)
+    assert any(result["shareholding_pattern"] for result in results)
+    for key in ["sector", "market_cap", "pe", "roce", "roe"]:
+        assert any(result["overview"][key] != "N/A" for result in results), key
@@ -0,0 +1,97 @@
+"""PriceStore delta refreshes: re-based (split/dividend adjusted) history, per-date bulk requests"""
+import pandas as pd
+import pytest
+
+from benchmarks import synthetic
+from data_providers import get_data_provider, set_data_provider
+from price_store import PriceStore
+
+
+class FrameProvider:
+    """history() served from in-memory frames, like yf.Ticker.history(start=...|period=...)"""
+    mode = "test"
+    offline = True
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.calls = []
+
+    def slice(self, symbol, start=None, period=None, **kwargs):
+        frame = self.frames[symbol]
+        if start is not None:
+            return frame[frame.index >= pd.Timestamp(start, tz=frame.index.tz)]
+        return frame
+
+    def history(self, symbol, session=None, **kwargs):
+        self.calls.append((symbol, kwargs))
+        return self.slice(symbol, **kwargs)
+
+    def bulk(self, symbols, **kwargs):
+        self.calls.append((tuple(symbols), kwargs))
+        return {symbol: self.slice(symbol, **kwargs) for symbol in symbols}
+
+
+@pytest.fixture
+def provider():
+    previous = get_data_provider()
+    frames = {symbol: synthetic.ohlcv_frame(symbol, 300) for symbol in ["AAA", "BBB", "CCC"]}
+    provider = FrameProvider(frames)
+    set_data_provider(provider)
+    yield provider
+    set_data_provider(previous)
+
+
+def _seed(store, provider, symbol, bars):
+    """Store the first `bars` bars of the symbol's frame"""
+    store.merge(symbol, provider.frames[symbol].iloc[:bars])
+
+
+def test_tail_refresh_appends_new_bars(tmp_path, provider):
+    store = PriceStore(str(tmp_path), max_age=0)
+    _seed(store, provider, "AAA", 250)
+    store.refresh("AAA")
+    stored = store.read("AAA")
+    assert len(stored) == 300
+    assert stored["Close"].to_numpy() == pytest.approx(provider.frames["AAA"]["Close"].to_numpy())
+    # Only the tail was asked for, starting at the (complete) bar before the last stored one
+    symbol, kwargs = provider.calls[-1]
+    assert kwargs["start"] == provider.frames["AAA"].index[248].strftime("%Y-%m-%d")
+
+
+def test_split_reloads_the_whole_window(tmp_path, provider):
+    store = PriceStore(str(tmp_path), max_age=0)
+    _seed(store, provider, "AAA", 250)
+    # A 2:1 split: upstream now serves the whole adjusted history at half the price
+    for column in ["Open", "High", "Low", "Close"]:
+        provider.frames["AAA"][column] /= 2
+    store.refresh("AAA")
+    stored = store.read("AAA")["Close"]
+    assert stored.to_numpy() == pytest.approx(provider.frames["AAA"]["Close"].to_numpy())
+    assert stored.pct_change().min() > -0.2  # No fake -50% bar where the tail was joined
+    assert "period" in provider.calls[-1][1]
+
+
+def test_refresh_many_groups_symbols_by_start_date(tmp_path, provider):
+    store = PriceStore(str(tmp_path), max_age=0)
+    _seed(store, provider, "AAA", 295)
+    _seed(store, provider, "BBB", 295)
+    _seed(store, provider, "CCC", 200)  # Lagging far behind
+    store.refresh_many(["AAA", "BBB", "CCC"], provider.bulk)
+    requests = {symbols: kwargs["start"] for symbols, kwargs in provider.calls}
+    assert requests == {
+        ("AAA", "BBB"): provider.frames["AAA"].index[293].strftime("%Y-%m-%d"),
+        ("CCC",): provider.frames["CCC"].index[198].strftime("%Y-%m-%d"),
+    }
+    for symbol in ["AAA", "BBB", "CCC"]:
+        assert len(store.read(symbol)) == 300
+
+
+def test_refresh_many_reloads_rebased_symbols(tmp_path, provider):
+    store = PriceStore(str(tmp_path), max_age=0)
+    _seed(store, provider, "AAA", 295)
+    _seed(store, provider, "BBB", 295)
+    provider.frames["BBB"]["Close"] *= 0.97  # Dividend adjustment
+    store.refresh_many(["AAA", "BBB"], provider.bulk)
+    assert provider.calls[-1] == (("BBB",), {"period": store.initial_period})
+    assert store.read("BBB")["Close"].to_numpy() == pytest.approx(provider.frames["BBB"]["Close"].to_numpy())
+    assert len(store.read("AAA")) == 300
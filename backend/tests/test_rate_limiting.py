@@ -0,0 +1,90 @@
+"""Sliding-window rate limits: window rollover, Retry-After, route + global counting, key sweeping"""
+import asyncio
+
+import pytest
+
+from rate_limiting import LocalRedis, MemoryBackend, RateLimiter, RedisBackend, _decide
+
+WINDOW = 60
+START = 30_000_000 * WINDOW  # Start of a fixed window, near the wall clock (the sweep timer runs on it)
+
+
+@pytest.fixture(params=["memory", "local-redis"])
+def backend(request):
+    return MemoryBackend() if request.param == "memory" else RedisBackend(LocalRedis())
+
+
+def check(limiter, path="/stocks", now=0.0, client="1.2.3.4"):
+    return asyncio.run(limiter.check(client, path, now=now))
+
+
+def test_limit_carries_over_a_window_rollover(backend):
+    limiter = RateLimiter(backend, limit=2, window=WINDOW, routes={})
+    assert [check(limiter, now=START + i).allowed for i in range(3)] == [True, True, False]
+    # Just after the rollover the previous window still weighs in fully
+    assert not check(limiter, now=START + WINDOW + 1).allowed
+    # Halfway through the next window it counts for half: one more fits
+    assert check(limiter, now=START + WINDOW + WINDOW / 2 + 1).allowed
+    assert not check(limiter, now=START + WINDOW + WINDOW / 2 + 2).allowed
+    # Two windows on, nothing is left of the burst
+    assert check(limiter, now=START + 3 * WINDOW).remaining == 1
+
+
+def test_retry_after_shrinks_as_the_previous_window_decays():
+    limit, previous = 10, 20
+    retries = []
+    for elapsed in [0, 5, 10, 15]:
+        decision = _decide(previous, 0, limit, WINDOW, START + elapsed)
+        assert not decision.allowed
+        retries.append(decision.retry_after)
+        # Coming back after Retry-After is admitted
+        assert _decide(previous, 0, limit, WINDOW, START + elapsed + decision.retry_after).allowed
+    assert retries == sorted(retries, reverse=True) and retries[0] > retries[-1]
+
+
+def test_retry_after_is_the_reset_when_the_current_window_is_full():
+    decision = _decide(0, 5, 5, WINDOW, START + 20)
+    assert not decision.allowed
+    assert decision.retry_after == decision.reset_after == WINDOW - 20
+
+
+def test_only_admitted_requests_are_counted(backend):
+    limiter = RateLimiter(backend, limit=3, window=WINDOW, routes={"/analyze/batch": (1, WINDOW)})
+    now = START
+    assert check(limiter, "/analyze/batch", now).allowed
+    # Refused by the route limit: must not use up the global allowance
+    assert not check(limiter, "/analyze/batch", now).allowed
+    assert not check(limiter, "/analyze/batch", now).allowed
+    assert [check(limiter, "/stocks", now).allowed for _ in range(3)] == [True, True, False]
+    # Refused by the global limit: must not count against the route either
+    counts = asyncio.run(backend.counts([("1.2.3.4|/analyze/batch", WINDOW), ("1.2.3.4", WINDOW)], now))
+    assert counts == [(0, 1), (0, 3)]
+    assert limiter.counts["rejected"] == 3
+
+
+def test_tighter_limit_sets_the_headers(backend):
+    limiter = RateLimiter(backend, limit=100, window=WINDOW, routes={"/fundamentals": (5, WINDOW)})
+    decision = check(limiter, "/fundamentals/AAPL", now=START)
+    assert (decision.limit, decision.remaining) == (5, 4)
+
+
+def test_sweep_bounds_the_number_of_keys():
+    backend = MemoryBackend(max_keys=10, sweep_seconds=0)
+    limiter = RateLimiter(backend, limit=5, window=WINDOW, routes={})
+    now = START
+    for i in range(50):
+        assert check(limiter, now=now, client=f"10.0.0.{i}").allowed
+        assert backend.stats()["keys"] <= 10
+    assert backend.stats()["evicted"] == 40
+    # The most recently seen clients are the ones kept
+    assert list(backend._keys) == [f"10.0.0.{i}" for i in range(40, 50)]
+
+
+def test_sweep_drops_idle_keys():
+    backend = MemoryBackend(max_keys=100, sweep_seconds=0)
+    limiter = RateLimiter(backend, limit=5, window=WINDOW, routes={})
+    now = START
+    for i in range(5):
+        check(limiter, now=now, client=f"10.0.0.{i}")
+    check(limiter, now=now + 2 * WINDOW + 1, client="10.0.0.99")
+    assert list(backend._keys) == ["10.0.0.99"]
@@ -0,0 +1,160 @@
+"""ResultCache: single-flight loads, failed refreshes, the byte bound and the disk tier"""
+import pickle
+import threading
+
+import pytest
+
+from result_cache import ResultCache
+
+
+def make_cache(tmp_path=None, max_bytes=1 << 20, ttl=60, error_ttl=5):
+    return ResultCache("test", ttl=ttl, error_ttl=error_ttl, max_bytes=max_bytes,
+                       disk_dir=str(tmp_path) if tmp_path else None)
+
+
+def size_of(value):
+    return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def run_waiters(cache, key, loader, waiters):
+    """Start a leader blocked inside loader, then `waiters` callers for the same key"""
+    release, started = threading.Event(), threading.Event()
+    results = [None] * (waiters + 1)
+
+    def blocking_loader():
+        started.set()
+        release.wait(5)
+        return loader()
+
+    def call(i):
+        try:
+            results[i] = ("value", cache.get_or_load(key, blocking_loader))
+        except Exception as e:
+            results[i] = ("error", e)
+
+    threads = [threading.Thread(target=call, args=(0,))]
+    threads[0].start()
+    assert started.wait(5)
+    threads += [threading.Thread(target=call, args=(i,)) for i in range(1, waiters + 1)]
+    for thread in threads[1:]:
+        thread.start()
+    while cache.stats()["coalesced"] < waiters:
+        threading.Event().wait(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_waiters_share_the_leaders_value():
+    cache, calls = make_cache(), []
+
+    def loader():
+        calls.append(1)
+        return {"symbol": "AAA", "pe": 12.5}
+
+    results = run_waiters(cache, "AAA", loader, waiters=4)
+    assert results == [("value", {"symbol": "AAA", "pe": 12.5})] * 5
+    assert len(calls) == 1
+    assert cache.stats()["loads"] == 1 and cache.stats()["coalesced"] == 4
+
+
+def test_waiters_share_the_leaders_exception():
+    cache = make_cache()
+    boom = RuntimeError("upstream down")
+
+    def loader():
+        raise boom
+
+    results = run_waiters(cache, "AAA", loader, waiters=3)
+    assert results == [("error", boom)] * 4
+    assert cache.stats()["load_exceptions"] == 1
+    assert cache.get("AAA") is None
+    # Nothing left in flight: the next caller loads again
+    assert cache.get_or_load("AAA", lambda: {"pe": 1.0}) == {"pe": 1.0}
+
+
+def test_failed_refresh_keeps_the_previous_value():
+    cache = make_cache()
+    good = {"symbol": "AAA", "pe": 12.5}
+    cache.put("AAA", good)
+
+    assert cache.refresh("AAA", lambda: {"error": "rate limited"}) == good
+    assert cache.get("AAA") == good
+    assert cache.expires_in("AAA") > 5  # Still on the success TTL, not the error TTL
+
+
+def test_failed_refresh_of_a_failure_is_stored():
+    cache = make_cache()
+    cache.put("AAA", {"error": "first"})
+    assert cache.refresh("AAA", lambda: {"error": "second"}) == {"error": "second"}
+    assert cache.get("AAA") == {"error": "second"}
+
+
+def test_successful_refresh_replaces_the_value():
+    cache = make_cache()
+    cache.put("AAA", {"pe": 1.0})
+    assert cache.refresh("AAA", lambda: {"pe": 2.0}) == {"pe": 2.0}
+    assert cache.get("AAA") == {"pe": 2.0}
+
+
+def test_lru_eviction_by_bytes():
+    value = {"blob": "x" * 1000}
+    cache = make_cache(max_bytes=3 * size_of(value))
+    for key in ["A", "B", "C"]:
+        cache.put(key, value)
+    assert len(cache) == 3
+
+    cache.get("A")  # A becomes most recently used, B is now the oldest
+    cache.put("D", value)
+
+    assert cache.get("B") is None
+    assert [cache.get(key) is not None for key in ["A", "C", "D"]] == [True, True, True]
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] == 3 * size_of(value) <= stats["max_bytes"]
+
+
+def test_value_larger_than_the_budget_is_not_kept_in_memory():
+    cache = make_cache(max_bytes=100)
+    cache.put("small", {"pe": 1.0})
+    cache.put("big", {"blob": "x" * 1000})
+    assert cache.get("big") is None
+    assert cache.get("small") == {"pe": 1.0}
+    assert cache.stats()["bytes"] == size_of({"pe": 1.0})
+
+
+def test_disk_round_trip(tmp_path):
+    value = {"symbol": "RELIANCE.NS", "pe": 24.1, "history": [1, 2, 3]}
+    make_cache(tmp_path).put("RELIANCE.NS", value)
+
+    restarted = make_cache(tmp_path)
+    assert restarted.get_or_load("RELIANCE.NS", lambda: pytest.fail("loaded despite the disk entry")) == value
+    assert restarted.stats()["disk_hits"] == 1
+    assert 0 < restarted.expires_in("RELIANCE.NS") <= 60
+
+
+def test_failed_results_stay_off_disk(tmp_path):
+    make_cache(tmp_path).put("AAA", {"error": "rate limited"})
+    assert make_cache(tmp_path).get("AAA") is None
+
+
+def test_disk_key_collision(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache._path("BRK/B") == cache._path("BRK_B")  # Same file name after sanitizing
+
+    cache.put("BRK/B", {"symbol": "BRK/B"})
+    cache.put("BRK_B", {"symbol": "BRK_B"})  # Overwrites the shared file
+
+    restarted = make_cache(tmp_path)
+    assert restarted.get("BRK_B") == {"symbol": "BRK_B"}
+    assert restarted.get("BRK/B") is None  # Never served the other key's value
+    assert restarted.get_or_load("BRK/B", lambda: {"symbol": "reloaded"}) == {"symbol": "reloaded"}
+
+
+def test_expired_disk_entries_are_pruned(tmp_path):
+    make_cache(tmp_path, ttl=0.01).put("AAA", {"pe": 1.0})
+    threading.Event().wait(0.02)
+    restarted = make_cache(tmp_path)
+    assert restarted.get("AAA") is None
+    assert list((tmp_path / "test").iterdir()) == []
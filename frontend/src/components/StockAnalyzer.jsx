@@ -41,14 +41,23 @@ const StockAnalyzer = ({ symbol, setSymbol, data, setData, allSymbols }) => {
           const marketData = { ...result.data };
           delete marketData.metadata; // Remove metadata from market data
 
+          // The age is worked out here, so the response stays cacheable until the data changes
+          const cacheAge = metadata.last_updated
+            ? Math.round((Date.now() - new Date(metadata.last_updated).getTime()) / 360000) / 10
+            : 0;
+
           setMarketData(marketData);
           setAnalysisStatus({
             analyzing: metadata.is_analyzing || false,
             progress: metadata.analysis_progress || 100,
-            message: metadata.message || "Data loaded successfully",
+            message: metadata.is_analyzing
+              ? `Analysis in progress (${metadata.analysis_progress}%), showing cached data`
+              : cacheAge > 1
+              ? `Data is ${cacheAge}h old`
+              : "Fresh data",
             estimatedTime: metadata.is_analyzing ? "2-3 minutes" : "",
             lastUpdated: metadata.last_updated || new Date().toISOString(),
-            cacheAge: metadata.cache_age_hours || 0,
+            cacheAge,
             status: metadata.status || "ready",
           });
 